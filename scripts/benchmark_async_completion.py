@@ -0,0 +1,109 @@
+"""
+Benchmark stage 2/3 of AsyncCrawler against a local stub of the `/infer` server.
+
+The stub answers every request after a fixed delay, so with a truly asynchronous
+completion path the wall time of a stage should shrink roughly linearly with
+MAX_CONCURRENT_PROCESSES.
+
+Usage:
+    python scripts/benchmark_async_completion.py --items 40 --delay 0.2
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.async_crawler import _END_OF_STREAM, AsyncCrawler
+
+
+STUB_ANSWER = "<TITLE>Stub title</TITLE><CONTENT>Stub content</CONTENT><SCORE>90</SCORE>"
+
+
+def start_stub_server(delay: float, per_instance: float = 0.0, slots: int = 0) -> ThreadingHTTPServer:
+    """
+    Args:
+        delay: Fixed latency of every request in seconds
+        per_instance: Additional latency per conversation in the request
+        slots: Number of requests served at the same time, 0 means unlimited
+    """
+    slot_semaphore = threading.BoundedSemaphore(slots) if slots else None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            instances = json.loads(self.rfile.read(length))["instances"]
+            if slot_semaphore is None:
+                time.sleep(delay + per_instance * len(instances))
+            else:
+                with slot_semaphore:
+                    time.sleep(delay + per_instance * len(instances))
+            body = json.dumps([STUB_ANSWER] * len(instances)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 128
+
+    server = Server(("localhost", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_stage(crawler: AsyncCrawler, handler, items, workers: int) -> float:
+    """Wall time of one pipeline stage processing `items` with `workers` consumers."""
+    input_queue, output_queue = asyncio.Queue(), asyncio.Queue()
+    for item in items:
+        input_queue.put_nowait(item)
+    input_queue.put_nowait(_END_OF_STREAM)
+    start = time.perf_counter()
+    await crawler._pipeline_stage(handler, input_queue, output_queue, workers, "Benchmark stage completed")
+    return time.perf_counter() - start
+
+
+async def run_stages(crawler: AsyncCrawler, items: int, workers: int):
+    # The stub answers are too short to be kept, so stage 3 gets its own refined items
+    pages = [
+        {"topic": "benchmark", "url": f"https://example.com/{i}", "raw_content": "x" * 500, "error": False}
+        for i in range(items)
+    ]
+    refined = [dict(page, title="Stub title", filtered="x" * 500) for page in pages]
+    stage2 = await run_stage(crawler, crawler._process_filter_and_title, pages, workers)
+    stage3 = await run_stage(crawler, crawler._process_similarity_score, refined, workers)
+    return stage2, stage3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--delay", type=float, default=0.2, help="Stub server latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 5, 10, 20])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+
+    server = start_stub_server(args.delay)
+    port = server.server_address[1]
+
+    print(f"{'concurrency':>12} {'stage2 (s)':>12} {'stage3 (s)':>12}")
+    for concurrency in args.concurrency:
+        crawler = AsyncCrawler(model="stub", infer_type="local", port=port)
+        stage2, stage3 = asyncio.run(run_stages(crawler, args.items, concurrency))
+        print(f"{concurrency:>12} {stage2:>12.2f} {stage3:>12.2f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark MinHash/LSH near-duplicate clustering on synthetic documents.
+
+Every base document gets a few variants with a small fraction of words substituted, which
+mimics the same paper crawled from its abstract page, PDF and mirrors. Reports clustering time,
+the number of candidate comparisons versus all pairs, and pair-level precision/recall
+against the known duplicate groups.
+
+Usage:
+    python scripts/benchmark_dedup.py --docs 1000 --variants 2 --edit-rate 0.01
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from itertools import combinations
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.dedup import LSHIndex, MinHasher, NearDuplicateDetector
+
+
+def make_corpus(docs: int, variants: int, words: int, edit_rate: float, seed: int):
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(20000)]
+    texts, groups = [], []
+    for group in range(docs):
+        base = rng.choices(vocab, k=words)
+        texts.append(" ".join(base))
+        groups.append(group)
+        for _ in range(variants):
+            variant = list(base)
+            for i in rng.sample(range(words), int(words * edit_rate)):
+                variant[i] = rng.choice(vocab)
+            texts.append(" ".join(variant))
+            groups.append(group)
+    return texts, groups
+
+
+def pairs_of(clusters):
+    return {pair for cluster in clusters for pair in combinations(sorted(cluster), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=1000, help="Number of distinct base documents")
+    parser.add_argument("--variants", type=int, default=2, help="Near-duplicates per base document")
+    parser.add_argument("--words", type=int, default=500)
+    parser.add_argument("--edit-rate", type=float, default=0.01)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--num-perm", type=int, default=128)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    texts, groups = make_corpus(args.docs, args.variants, args.words, args.edit_rate, args.seed)
+    detector = NearDuplicateDetector(threshold=args.threshold, num_perm=args.num_perm)
+
+    start = time.perf_counter()
+    signatures = [detector.signature(text) for text in texts]
+    signature_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = LSHIndex(num_perm=args.num_perm, threshold=args.threshold)
+    comparisons = 0
+    for i, signature in enumerate(signatures):
+        candidates = index.query(signature)
+        comparisons += len(candidates)
+        for j in candidates:
+            MinHasher.jaccard(signature, signatures[j])
+        index.insert(i, signature)
+    lsh_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    clusters = detector.cluster(texts)
+    cluster_seconds = time.perf_counter() - start
+
+    truth = {}
+    for i, group in enumerate(groups):
+        truth.setdefault(group, []).append(i)
+    expected, found = pairs_of(truth.values()), pairs_of(clusters)
+    all_pairs = len(texts) * (len(texts) - 1) // 2
+
+    print(f"documents={len(texts)}, bands={index.bands}, rows={index.rows}")
+    print(f"signatures: {signature_seconds:.2f}s ({signature_seconds / len(texts) * 1000:.2f} ms/doc)")
+    print(f"LSH candidate comparisons: {comparisons} vs {all_pairs} all pairs ({comparisons / all_pairs:.4%}), {lsh_seconds:.2f}s")
+    print(f"cluster(): {cluster_seconds:.2f}s, clusters={len(clusters)} (expected {len(truth)})")
+    print(
+        f"pair precision={len(found & expected) / max(len(found), 1):.4f}, "
+        f"pair recall={len(found & expected) / max(len(expected), 1):.4f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
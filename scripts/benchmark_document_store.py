@@ -0,0 +1,125 @@
+"""
+Benchmark recall and latency of the DocumentStore FAISS indexes.
+
+Synthetic clustered unit vectors stand in for chunk embeddings, so no embedding model is
+needed. Every index type is built over the same corpus and compared with exact flat search:
+recall@k is the fraction of the exact top-k found by the approximate index. Also reports
+build time, incremental add throughput and per-query latency percentiles.
+
+Optionally indexes a real crawl output file with the default embedding model and reports
+chunking/embedding throughput and query latency.
+
+Usage:
+    python scripts/benchmark_document_store.py --vectors 200000 --dim 384 --k 10 --ef-search 64 128 256
+    python scripts/benchmark_document_store.py --corpus output.jsonl --query "diffusion models"
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.document_store import DocumentStore, build_index, search_parameters
+
+
+def make_vectors(count: int, dim: int, clusters: int, noise: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + noise * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def percentiles(latencies):
+    return "/".join(f"{np.percentile(latencies, q) * 1000:.2f}" for q in (50, 90, 99))
+
+
+def bench_index(kind, corpus, queries, truth, k, args):
+    start = time.perf_counter()
+    base = len(corpus) - args.incremental
+    index = build_index(kind, corpus.shape[1], corpus[:base] if kind == "ivf" else None, hnsw_m=args.hnsw_m)
+    index.add(corpus[:base])
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for begin in range(base, len(corpus), args.add_batch):
+        index.add(corpus[begin:begin + args.add_batch])
+    add_seconds = time.perf_counter() - start
+
+    add_rate = args.incremental / add_seconds if add_seconds else float("inf")
+    print(f"{kind}: build={build_seconds:.2f}s, incremental add={add_rate:.0f} vectors/s")
+
+    # 每种索引只扫描与之相关的搜索参数
+    sweep = {"flat": [{}], "hnsw": [{"ef_search": v} for v in args.ef_search], "ivf": [{"nprobe": v} for v in args.nprobe]}
+    for setting in sweep[kind]:
+        params = search_parameters(index, **setting)
+        latencies, found = [], []
+        for query in queries:
+            start = time.perf_counter()
+            _, rows = index.search(query[None, :], k, params=params)
+            latencies.append(time.perf_counter() - start)
+            found.append(rows[0])
+        recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+        label = ", ".join(f"{name}={value}" for name, value in setting.items()) or "exact"
+        print(f"  {label:<16} recall@{k}={recall:.4f}, latency p50/p90/p99={percentiles(latencies)} ms")
+
+
+def bench_corpus(args):
+    with tempfile.TemporaryDirectory() as directory:
+        store = DocumentStore(directory)
+        start = time.perf_counter()
+        added = store.add_jsonl(args.corpus)
+        seconds = time.perf_counter() - start
+        print(f"indexed {added} chunks in {seconds:.2f}s ({added / max(seconds, 1e-9):.1f} chunks/s)")
+
+        latencies = []
+        for _ in range(args.queries):
+            start = time.perf_counter()
+            hits = store.search(args.query, args.k)
+            latencies.append(time.perf_counter() - start)
+        print(f"query latency p50/p90/p99={percentiles(latencies)} ms (including query embedding)")
+        for hit in hits:
+            print(f"  {hit['score']:.3f} {hit['title'][:60]} #{hit['chunk']} {hit['url']}")
+        store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--incremental", type=int, default=10000, help="Vectors added after the index is built")
+    parser.add_argument("--add-batch", type=int, default=256)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[64, 128, 256])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--noise", type=float, default=0.5, help="Spread of the vectors around their cluster center")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus", help="Crawl output JSONL to index with the real embedding model")
+    parser.add_argument("--query", default="survey")
+    args = parser.parse_args()
+
+    if args.corpus:
+        bench_corpus(args)
+        return
+
+    args.incremental = min(args.incremental, args.vectors // 2)
+    corpus = make_vectors(args.vectors, args.dim, args.clusters, args.noise, args.seed)
+    queries = make_vectors(args.queries, args.dim, args.clusters, args.noise, args.seed + 1)
+    exact = build_index("flat", args.dim)
+    exact.add(corpus)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"vectors={args.vectors}, dim={args.dim}, queries={args.queries}, incremental={args.incremental}")
+    for kind in ("flat", "hnsw", "ivf"):
+        bench_index(kind, corpus, queries, truth, args.k, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Crawl URLs spread over several local HTTP servers, one per port, which the crawler treats as
+separate hosts, with and without per-host politeness, through the `run` pipeline. The LLM
+stages are answered by a stub server without delay, so the reported time is that of the crawl stage.
+
+The first host holds most of the URLs and rate-limits like a publisher: it answers 429 with a
+`Retry-After` header while more than `--host-limit` of its requests are in flight. Every page
+takes a fixed delay. Reports the wall time, the peak concurrency and smallest spacing seen by
+every host (measured at the server, so it includes client-side jitter), and the throttled,
+requeued and failed URLs. Without per-host limits most workers go to the dominant host and
+collect its 429s.
+
+Usage:
+    python scripts/benchmark_host_scheduler.py --hosts 4 --urls 120 --dominant-share 0.7 --delay 0.2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.async_crawler import AsyncCrawler
+from src.rag.domain_health import DomainHealth
+
+from benchmark_async_completion import start_stub_server
+
+PAGE = "<html><body><h1>Paper {path}</h1>" + "<p>Static paper text with enough words to be usable.</p>" * 30 + "</body></html>"
+
+
+class HostState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.peak = 0
+        self.served = 0
+        self.throttled = 0
+        self.starts = []
+
+
+def start_host(delay: float, limit: int, retry_after: float):
+    """A host answering 429 while more than `limit` requests are in flight, 0 means no limit."""
+    state = HostState()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with state.lock:
+                state.inflight += 1
+                state.peak = max(state.peak, state.inflight)
+                state.starts.append(time.perf_counter())
+                throttle = 0 < limit < state.inflight
+            try:
+                if throttle:
+                    with state.lock:
+                        state.throttled += 1
+                    self.send_response(429)
+                    self.send_header("Retry-After", str(retry_after))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                time.sleep(delay)
+                body = PAGE.format(path=self.path).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with state.lock:
+                    state.served += 1
+            finally:
+                with state.lock:
+                    state.inflight -= 1
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("localhost", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def make_urls(ports, urls: int, dominant_share: float):
+    dominant = int(urls * dominant_share)
+    url_list = [f"http://localhost:{ports[0]}/paper/{i}" for i in range(dominant)]
+    for i in range(urls - dominant):
+        port = ports[1 + i % (len(ports) - 1)]
+        url_list.append(f"http://localhost:{port}/paper/{i}")
+    return url_list
+
+
+def run(label: str, args, llm_port: int, per_host_concurrency: int, min_interval: float):
+    hosts = [start_host(args.delay, args.host_limit if i == 0 else 0, args.retry_after) for i in range(args.hosts)]
+    ports = [server.server_address[1] for server, _ in hosts]
+    crawler = AsyncCrawler(
+        model="stub",
+        infer_type="local",
+        port=llm_port,
+        pdf_extraction=False,
+        domain_health=DomainHealth(path=None),
+        per_host_concurrency=per_host_concurrency,
+        host_min_interval=min_interval,
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(
+            crawler.run(
+                "benchmark",
+                make_urls(ports, args.urls, args.dominant_share),
+                os.path.join(directory, "crawl.jsonl"),
+                crawl_workers=args.workers,
+                deduplicate=False,
+            )
+        )
+    for server, _ in hosts:
+        server.shutdown()
+
+    print(
+        f"{label}: crawl={crawler.stage_timings['crawl']:.2f}s, pages={crawler.crawl_stats['fetched']}, "
+        f"failed={args.urls - crawler.crawl_stats['fetched']}, {crawler.host_stats.summary()}"
+    )
+    for i, (_, state) in enumerate(hosts):
+        gaps = [b - a for a, b in zip(state.starts, state.starts[1:])]
+        print(
+            f"  host {i}{' (rate-limited)' if i == 0 else ''}: served={state.served}, 429s={state.throttled}, "
+            f"peak in flight={state.peak}, smallest spacing={min(gaps, default=0.0):.3f}s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--urls", type=int, default=120)
+    parser.add_argument("--dominant-share", type=float, default=0.7, help="Share of the URLs on the first host")
+    parser.add_argument("--delay", type=float, default=0.2, help="Latency of every page in seconds")
+    parser.add_argument("--workers", type=int, default=10)
+    parser.add_argument("--host-limit", type=int, default=2, help="Requests in flight the first host tolerates")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of the 429 responses in seconds")
+    parser.add_argument("--per-host", type=int, default=2)
+    parser.add_argument("--min-interval", type=float, default=0.05)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+
+    llm_server = start_stub_server(0.0)
+    llm_port = llm_server.server_address[1]
+    run("no host limits", args, llm_port, per_host_concurrency=args.workers, min_interval=0.0)
+    run("host-aware", args, llm_port, per_host_concurrency=args.per_host, min_interval=args.min_interval)
+    llm_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
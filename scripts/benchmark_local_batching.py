@@ -0,0 +1,77 @@
+"""
+Benchmark batched inference of LocalRequest against a local stub of the `/infer` server.
+
+The stub charges a fixed overhead per HTTP request plus a small cost per conversation,
+like a local model server that pads and runs a whole batch per forward pass, and serves
+at most `--slots` requests at a time like a single GPU worker. Compares:
+- sequential single calls
+- concurrent single calls from a thread pool
+- RequestWrapper.batch_completion
+- concurrent single calls coalesced by the micro-batching dispatcher
+
+Usage:
+    python scripts/benchmark_local_batching.py --items 200 --overhead 0.05 --per-item 0.002
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmark_async_completion import start_stub_server
+from src.request import RequestWrapper
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def concurrent_singles(wrapper: RequestWrapper, prompts, workers: int):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(wrapper.completion, prompts))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--overhead", type=float, default=0.05, help="Stub latency per request in seconds")
+    parser.add_argument("--per-item", type=float, default=0.002, help="Stub latency per conversation in seconds")
+    parser.add_argument("--slots", type=int, default=1, help="Requests the stub serves at once, 0 for unlimited")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--window", type=float, default=0.01, help="Micro-batching window in seconds")
+    parser.add_argument("--workers", type=int, default=20)
+    args = parser.parse_args()
+
+    server = start_stub_server(args.overhead, args.per_item, args.slots)
+    port = server.server_address[1]
+    prompts = [f"prompt {i}" for i in range(args.items)]
+
+    single = RequestWrapper(model="stub", infer_type="local", port=port, connection=args.workers,
+                            max_batch_size=args.batch_size)
+    batched = RequestWrapper(model="stub-micro", infer_type="local", port=port, connection=args.workers,
+                             max_batch_size=args.batch_size, batch_window=args.window)
+
+    rows = [
+        ("sequential singles", timed(lambda: [single.completion(p) for p in prompts])),
+        (f"{args.workers} concurrent singles", timed(lambda: concurrent_singles(single, prompts, args.workers))),
+        ("batch_completion", timed(lambda: single.batch_completion(prompts))),
+        (f"{args.workers} concurrent micro-batched",
+         timed(lambda: concurrent_singles(batched, prompts, args.workers))),
+    ]
+    stats = batched.request_pool.dispatcher.stats()
+    batched.request_pool.close()
+    single.request_pool.close()
+    server.shutdown()
+
+    print(f"items={args.items}, overhead={args.overhead}s/request, per_item={args.per_item}s, slots={args.slots}")
+    for name, seconds in rows:
+        print(f"{name:<32} {seconds:>8.2f}s {args.items / seconds:>10.1f} items/s")
+    print(f"micro-batching: {stats['batches']} requests, mean batch size {stats['mean_batch_size']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Measure the throughput of MarkdownCleaner and the token reduction per page.
+
+The golden pages of `tests/markdown_cleaner_golden` and synthetic pages are cleaned `--rounds`
+times to report pages per second on one core. The cleaned output itself is checked against the
+golden files by `tests/test_markdown_cleaner.py`.
+
+Usage:
+    python scripts/benchmark_markdown_cleaner.py
+    python scripts/benchmark_markdown_cleaner.py --pages 1000 --rounds 5
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.chunking import TokenChunker
+from src.rag.markdown_cleaner import MarkdownCleaner
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "markdown_cleaner_golden")
+
+
+def synthetic_page(rng: random.Random, paragraphs: int) -> str:
+    vocab = [f"term{i}" for i in range(3000)]
+    nav = "\n".join(f"* [Section {i}](/section/{i})" for i in range(rng.randint(5, 15)))
+    body = "\n\n".join(
+        " ".join(rng.choices(vocab, k=rng.randint(40, 120)))
+        + f" [{rng.choice(vocab)}](https://example.com/{rng.randint(0, 10**6)}) ![figure](/img/{rng.randint(0, 99)}.png)"
+        for _ in range(paragraphs)
+    )
+    footer = "Share this article\nSubscribe to our newsletter\n© 2024 Example. All rights reserved."
+    return f"We use cookies on this site. [Accept all](#)\n\n{nav}\n\n# Title\n\n{body}\n\n{footer}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500, help="Synthetic pages of the throughput run")
+    parser.add_argument("--paragraphs", type=int, default=20, help="Paragraphs of every synthetic page")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cleaner = MarkdownCleaner()
+
+    chunker = TokenChunker()
+    pages = []
+    for input_path in sorted(glob.glob(os.path.join(GOLDEN_DIR, "*.input.md"))):
+        with open(input_path, encoding="utf-8") as f:
+            pages.append((os.path.basename(input_path), f.read()))
+    rng = random.Random(args.seed)
+    synthetic = [synthetic_page(rng, args.paragraphs) for _ in range(args.pages)]
+
+    for name, page in pages + [("synthetic (first page)", synthetic[0])]:
+        before, after = chunker.count(page), chunker.count(cleaner.clean(page))
+        print(f"{name}: tokens {before} -> {after} ({(before - after) / max(before, 1):.0%} removed)")
+    before = sum(chunker.count(page) for page in synthetic)
+    after = sum(chunker.count(cleaner.clean(page)) for page in synthetic)
+    print(f"synthetic total: tokens {before} -> {after} ({(before - after) / max(before, 1):.0%} removed)")
+
+    corpus = [page for _, page in pages] + synthetic
+    size = sum(len(page) for page in corpus)
+    best = float("inf")
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        for page in corpus:
+            cleaner.clean(page)
+        best = min(best, time.perf_counter() - start)
+    print(
+        f"throughput: {len(corpus) / best:.0f} pages/s, {size / best / 1e6:.1f} MB/s "
+        f"(mean page {size / len(corpus) / 1000:.1f} KB, best of {args.rounds} rounds)"
+    )
+
+
+if __name__ == "__main__":
+    main()
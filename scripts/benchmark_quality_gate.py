@@ -0,0 +1,53 @@
+"""
+Measure the throughput of PageQualityGate on the labelled pages of `tests/quality_gate_examples.jsonl`.
+
+Pages are cleaned with MarkdownCleaner first, like the crawler does. The verdicts themselves
+are checked by `tests/test_quality_gate.py`.
+
+Usage:
+    python scripts/benchmark_quality_gate.py
+    python scripts/benchmark_quality_gate.py --rounds 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.markdown_cleaner import MarkdownCleaner
+from src.rag.quality_gate import PageQualityGate
+
+EXAMPLES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "tests", "quality_gate_examples.jsonl"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--examples", default=EXAMPLES_PATH)
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds of the throughput run")
+    args = parser.parse_args()
+
+    with open(args.examples, encoding="utf-8") as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+    cleaner = MarkdownCleaner()
+    gate = PageQualityGate()
+    pages = [(example, cleaner.clean(example["text"])) for example in examples]
+
+    size = sum(len(text) for _, text in pages)
+    best = float("inf")
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        for example, text in pages:
+            gate.check(text, example["text"])
+        best = min(best, time.perf_counter() - start)
+    print(
+        f"throughput: {len(pages) / best:.0f} pages/s, {size / best / 1e6:.1f} MB/s "
+        f"(mean page {size / len(pages) / 1000:.1f} KB, best of {args.rounds} rounds)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare the embedding relevance prefilter with the all-LLM similarity scores.
+
+Reads a crawl output file written by AsyncCrawler.run from an all-LLM run
+(every paper carries the LLM `similarity`) and reports, per topic and overall:
+- how many SIMILARITY_PROMPT calls the prefilter would have saved
+- accept/reject agreement on the confidently scored papers
+- Spearman rank correlation between cosine and LLM similarity
+- overlap of the top-n papers
+
+Usage:
+    python scripts/benchmark_relevance_prefilter.py crawl_output.jsonl --low 0.25 --high 0.55
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.relevance import EmbeddingRelevanceScorer
+
+
+def spearman(x: np.ndarray, y: np.ndarray) -> float:
+    if len(x) < 2:
+        return float("nan")
+    rank_x = np.argsort(np.argsort(x))
+    rank_y = np.argsort(np.argsort(y))
+    return float(np.corrcoef(rank_x, rank_y)[0, 1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("crawl_output", help="JSONL written by AsyncCrawler.run")
+    parser.add_argument("--model", default=EmbeddingRelevanceScorer.DEFAULT_MODEL)
+    parser.add_argument("--low", type=float, default=0.25)
+    parser.add_argument("--high", type=float, default=0.55)
+    parser.add_argument("--threshold", type=int, default=80)
+    parser.add_argument("--top-n", type=int, default=20)
+    args = parser.parse_args()
+
+    scorer = EmbeddingRelevanceScorer(
+        model_name=args.model, low=args.low, high=args.high, similarity_threshold=args.threshold
+    )
+
+    total = saved = agreed = 0
+    embed_seconds = 0.0
+    with open(args.crawl_output, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            topic, papers = record["title"], record["papers"]
+            if not papers:
+                continue
+
+            start = time.perf_counter()
+            scores = scorer.score(
+                [topic] * len(papers), [f"{p['title']}\n{p['txt']}" for p in papers]
+            )
+            embed_seconds += time.perf_counter() - start
+
+            llm = np.array([p["similarity"] for p in papers], dtype=np.float32)
+            cosine = np.array([c for c, _ in scores], dtype=np.float32)
+            decided = [(i, s) for i, (_, s) in enumerate(scores) if s is not None]
+            topic_agreed = sum(
+                (s >= args.threshold) == (llm[i] >= args.threshold) for i, s in decided
+            )
+            top_llm = set(np.argsort(-llm)[: args.top_n])
+            top_embed = set(np.argsort(-cosine)[: args.top_n])
+
+            print(
+                f"{topic[:40]:<40} papers={len(papers):>4} saved={len(decided):>4} "
+                f"agreement={topic_agreed / max(len(decided), 1):.2%} "
+                f"spearman={spearman(cosine, llm):.3f} "
+                f"top{args.top_n}_overlap={len(top_llm & top_embed) / max(len(top_llm), 1):.2%}"
+            )
+            total += len(papers)
+            saved += len(decided)
+            agreed += topic_agreed
+
+    print(
+        f"\nTotal papers={total}, LLM calls saved={saved} ({saved / max(total, 1):.2%}), "
+        f"decision agreement={agreed / max(saved, 1):.2%}, embedding time={embed_seconds:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Run SurveyGenerator end-to-end against a local stub of the `/infer` server.
+
+The stub answers the survey prompts with `survey_answer` of tests/test_survey_generator.py,
+which checks the token budget, the overlap of the map calls and the streamed sections. Every request takes a fixed delay, so the reported wall
+time against the serial time shows how well the map and reduce calls overlap. Also reports the
+peak number of requests in flight, calls and prompt tokens per stage, and the largest prompt
+against the token budget.
+
+Usage:
+    python scripts/benchmark_survey_generation.py --topics 2 --papers 60 --delay 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.survey_generator import SurveyGenerator
+from tests.test_survey_generator import survey_answer
+
+
+def start_stub_server(delay: float, notes_words: int):
+    state = {"inflight": 0, "peak": 0, "requests": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            instances = json.loads(self.rfile.read(length))["instances"]
+            with lock:
+                state["inflight"] += 1
+                state["requests"] += 1
+                state["peak"] = max(state["peak"], state["inflight"])
+            time.sleep(delay)
+            with lock:
+                state["inflight"] -= 1
+            body = json.dumps([survey_answer(messages[-1]["content"], notes_words) for messages in instances]).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 128
+
+    server = Server(("localhost", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def make_crawl_output(path: str, topics: int, papers: int, words: int, seed: int):
+    rng = random.Random(seed)
+    vocab = [f"term{i}" for i in range(5000)]
+    with open(path, "w", encoding="utf-8") as f:
+        for t in range(topics):
+            records = [
+                {
+                    "title": f"Paper {p} on topic {t}",
+                    "url": f"https://example.com/{t}/{p}",
+                    "txt": " ".join(rng.choices(vocab, k=rng.randint(words // 2, words * 2))),
+                    "similarity": rng.randint(80, 100),
+                }
+                for p in range(papers)
+            ]
+            f.write(json.dumps({"title": f"Synthetic topic {t}", "papers": records}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topics", type=int, default=2)
+    parser.add_argument("--papers", type=int, default=60, help="Papers per topic")
+    parser.add_argument("--words", type=int, default=3000, help="Mean words per paper")
+    parser.add_argument("--notes-words", type=int, default=150, help="Words of every stub note, larger notes need condensing")
+    parser.add_argument("--delay", type=float, default=0.1, help="Latency of every stub request in seconds")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--max-prompt-tokens", type=int, default=4000)
+    parser.add_argument("--map-chunk-tokens", type=int, default=2000)
+    parser.add_argument("--output-dir", help="Keep the generated surveys in this directory")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server, state = start_stub_server(args.delay, args.notes_words)
+    with tempfile.TemporaryDirectory() as directory:
+        crawl_output = os.path.join(directory, "crawl_output.jsonl")
+        make_crawl_output(crawl_output, args.topics, args.papers, args.words, args.seed)
+        generator = SurveyGenerator(
+            model="stub",
+            infer_type="local",
+            port=server.server_address[1],
+            max_concurrency=args.concurrency,
+            max_prompt_tokens=args.max_prompt_tokens,
+            map_chunk_tokens=args.map_chunk_tokens,
+        )
+
+        start = time.perf_counter()
+        summaries = asyncio.run(generator.generate(crawl_output, args.output_dir or os.path.join(directory, "surveys")))
+        seconds = time.perf_counter() - start
+        server.shutdown()
+
+        for topic, summary in summaries.items():
+            timings = ", ".join(f"{phase}={value:.2f}s" for phase, value in summary["timings"].items())
+            print(
+                f"{topic}: papers={summary['papers']}, notes={summary['notes']}, "
+                f"sections={summary['written_sections']}/{summary['sections']}, {timings}"
+            )
+        for stage, stats in generator.call_stats.items():
+            print(
+                f"  {stage:<9} calls={stats['calls']}, failed={stats['failed']}, prompt tokens={stats['prompt_tokens']}, "
+                f"largest prompt={stats['max_prompt_tokens']} (budget {args.max_prompt_tokens})"
+            )
+        print(
+            f"requests={state['requests']}, peak in flight={state['peak']}, wall={seconds:.2f}s, "
+            f"serial={state['requests'] * args.delay:.2f}s, speedup={state['requests'] * args.delay / seconds:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
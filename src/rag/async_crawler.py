@@ -5,8 +5,22 @@ import time
 from crawl4ai import AsyncWebCrawler, CacheMode, CrawlerRunConfig
 import re
 
-from src.request import RequestWrapper
-from typing import List
+from src.request import CompletionCache, RequestWrapper
+from src.request.token_counter import usage_stage
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from src.rag.browser_pool import CrawlerPool
+from src.rag.chunking import TokenChunker, stitch_chunks
+from src.rag.crawl_cache import CrawlCache, CrawlCacheMode
+from src.rag.dedup import NearDuplicateDetector
+from src.rag.domain_health import DomainCircuitOpen, DomainHealth
+from src.rag.fair_queue import FairQueue
+from src.rag.host_scheduler import THROTTLE_STATUS, HostScheduler, HostThrottled, parse_retry_after
+from src.rag.http_fetcher import FetchTierStats, HttpFetcher
+from src.rag.pdf_extractor import PdfExtractor, PdfTooLarge, arxiv_pdf_url, looks_like_pdf_url, pdf_support_available
+from src.rag.journal import STATE_KEY, RunJournal, state_rank
+from src.rag.markdown_cleaner import MarkdownCleaner
+from src.rag.quality_gate import PageQualityGate
+from src.rag.relevance import EmbeddingRelevanceScorer
 from src.rag.prompts.crawler_prompt_en import PAGE_REFINE_PROMPT, SIMILARITY_PROMPT
 import logging
 
@@ -14,26 +28,121 @@ logger = logging.getLogger(__name__)
 # Enable nested event loops (suitable for Jupyter or IPython environments)
 nest_asyncio.apply()
 
+# Marker closing a stage queue, forwarded downstream once the stage is drained
+_END_OF_STREAM = object()
+
 
 class AsyncCrawler:
     # Configuration constants
     MAX_CONCURRENT_CRAWLS = 10
+    MAX_CRAWLS_PER_HOST = 2
+    HOST_MIN_INTERVAL = 0.5  # seconds between the starts of two requests to the same host
     MAX_CONCURRENT_PROCESSES = 10
+    MAX_PAGES_PER_BROWSER = 50
+    PIPELINE_QUEUE_SIZE = 20
+    RELEVANCE_BATCH_SIZE = 32
 
     # Document processing constants
     DEFAULT_SIMILARITY_THRESHOLD = 80
     DEFAULT_MIN_LENGTH = 350
     DEFAULT_MAX_LENGTH = 20000
+    DEDUP_THRESHOLD = 0.8  # estimated Jaccard similarity above which two pages are near-duplicates
+
+    # Token budget constants of PAGE_REFINE_PROMPT
+    MAX_REFINE_TOKENS = 12000  # pages above this are refined in overlapping chunks
+    REFINE_CHUNK_OVERLAP_TOKENS = 200
+    MAX_PAGE_TOKENS = 60000  # pages above this are dropped before any LLM call
 
-    def __init__(self, model="gemini-2.0-flash-thinking-exp-01-21", infer_type="OpenAI"):
+    def __init__(
+        self,
+        model="gemini-2.0-flash-thinking-exp-01-21",
+        infer_type="OpenAI",
+        port: Optional[int] = None,
+        browser_pool_size: Optional[int] = None,
+        max_pages_per_browser: int = MAX_PAGES_PER_BROWSER,
+        completion_cache: Optional[CompletionCache] = None,
+        crawl_cache: Optional[CrawlCache] = None,
+        domain_health: Optional[DomainHealth] = None,
+        relevance_scorer: Optional[EmbeddingRelevanceScorer] = None,
+        http_fast_path: bool = True,
+        pdf_extraction: bool = True,
+        per_host_concurrency: int = MAX_CRAWLS_PER_HOST,
+        host_min_interval: float = HOST_MIN_INTERVAL,
+        clean_markdown: bool = True,
+        quality_gate: bool = True,
+    ):
         """
         Initialize the AsyncCrawler.
 
         Args:
             model (str): Model identifier for text processing
             infer_type (str): Inference type, e.g., "OpenAI"
+            port (int, optional): Port of the local inference server when infer_type is "local"
+            browser_pool_size (int, optional): Number of browsers shared by the crawl consumers.
+                Defaults to MAX_CONCURRENT_CRAWLS
+            max_pages_per_browser (int): Pages served by one browser before it is recycled
+            completion_cache (CompletionCache, optional): Persistent cache for the refine and similarity
+                LLM calls, so reruns over the same topic and pages do not pay for them again
+            crawl_cache (CrawlCache, optional): Persistent cache of crawled pages keyed by normalized URL
+            domain_health (DomainHealth, optional): Per-domain render times and failures, which set the page
+                timeouts and skip domains that keep failing. Defaults to a history persisted in
+                `.cache/domain_health.sqlite`, carried over between runs. Pass `DomainHealth(path=None)` to keep
+                it in memory for the lifetime of the crawler only
+            relevance_scorer (EmbeddingRelevanceScorer, optional): Embedding prefilter of stage 3. Only documents
+                it cannot decide confidently are scored with SIMILARITY_PROMPT
+            http_fast_path (bool): Fetch pages with a plain HTTP GET and convert them to markdown in process
+                first, and only render them in a browser when the result is not usable
+            pdf_extraction (bool): Download known PDF links (see `pdf_urls` of `run`), arXiv abstract pages
+                and PDF responses as PDFs and extract their text instead of rendering them. The text is cut
+                to DEFAULT_MAX_LENGTH characters, the longest paper kept in the output. Requires pypdf
+            per_host_concurrency (int): Crawls in flight at most per host, see `HostScheduler`
+            host_min_interval (float): Minimum seconds between the starts of two crawls of the same host
+            clean_markdown (bool): Strip navigation, banners, link markup and other boilerplate from the
+                raw markdown with `MarkdownCleaner` before PAGE_REFINE_PROMPT, instead of paying the LLM for it
+            quality_gate (bool): Drop login walls, captcha and cookie-only pages, pages not in English, binary
+                garbage and pages with too little text right after crawling with `PageQualityGate`, before
+                they cost a refine and a similarity call. To accept other languages, assign a
+                `PageQualityGate` with other `languages` to `quality_gate`
         """
-        self.request_pool = RequestWrapper(model=model, infer_type=infer_type)
+        self.request_pool = RequestWrapper(
+            model=model, infer_type=infer_type, port=port, cache=completion_cache
+        )
+        self.browser_pool_size = browser_pool_size or self.MAX_CONCURRENT_CRAWLS
+        self.max_pages_per_browser = max_pages_per_browser
+        self.crawler_pool: Optional[CrawlerPool] = None
+        self.crawl_cache = crawl_cache
+        self.domain_health = domain_health or DomainHealth()
+        self.crawl_cache_mode = CrawlCacheMode.READ_WRITE
+        self.http_fetcher: Optional[HttpFetcher] = HttpFetcher() if http_fast_path else None
+        self.fetch_stats = FetchTierStats()
+        self.pdf_extractor: Optional[PdfExtractor] = None
+        if pdf_extraction:
+            if pdf_support_available():
+                # Text beyond DEFAULT_MAX_LENGTH would only get the paper discarded after refinement
+                self.pdf_extractor = PdfExtractor(max_chars=self.DEFAULT_MAX_LENGTH)
+            else:
+                logger.warning("pypdf is not installed, PDF links are rendered in the browser instead")
+        self._pdf_urls = {}
+        self.per_host_concurrency = per_host_concurrency
+        self.host_min_interval = host_min_interval
+        self.host_stats = None
+        self.stage_timings = {}
+        self.relevance_scorer = relevance_scorer
+        self.chunker = TokenChunker(model=model)
+        self.markdown_cleaner: Optional[MarkdownCleaner] = MarkdownCleaner() if clean_markdown else None
+        self.quality_gate: Optional[PageQualityGate] = PageQualityGate() if quality_gate else None
+        self.deduplicate = True
+        self._deduplicators = {}  # one near-duplicate index per topic
+        self._signatures = {}  # MinHash signature per URL, shared by the topics of the URL
+        self._superseded_urls = set()  # (topic, url) replaced by a better near-duplicate
+        self._topic_pending = {}
+        self._topic_results = {}
+        self.journal: Optional[RunJournal] = None
+        self._resumed = {}
+        self.crawl_stats = {}
+        self.dedup_stats = {}
+        self.refine_stats = {}
+        self.similarity_stats = {}
 
     async def run(
         self,
@@ -41,11 +150,21 @@ class AsyncCrawler:
         url_list: List[str],
         crawl_output_file_path: str,
         top_n: int = 80,
+        crawl_workers: Optional[int] = None,
+        refine_workers: Optional[int] = None,
+        score_workers: Optional[int] = None,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        crawl_cache_mode: str = CrawlCacheMode.READ_WRITE.value,
+        deduplicate: bool = True,
+        journal_path: Optional[str] = None,
+        resume: bool = False,
+        pdf_urls: Optional[Dict[str, str]] = None,
     ):
         """
         Asynchronously crawls a list of URLs, processes the crawled data, and saves the results.
-        The process is split into four stages:
-        1. URL crawling
+        The process is split into four stages connected by bounded queues, so that a page is
+        refined as soon as it is crawled and scored as soon as it is refined:
+        1. URL crawling and near-duplicate removal
         2. Content filtering and title generation
         3. Similarity scoring
         4. Result processing and saving
@@ -55,51 +174,360 @@ class AsyncCrawler:
             url_list (List[str]): A list of URLs to crawl
             crawl_output_file_path (str): The file path where the final processed results will be saved
             top_n (int, optional): Maximum number of top results to save. Defaults to 80
+            crawl_workers (int, optional): Number of crawl consumers. Defaults to MAX_CONCURRENT_CRAWLS
+            refine_workers (int, optional): Number of filter/title consumers. Defaults to MAX_CONCURRENT_PROCESSES
+            score_workers (int, optional): Number of similarity consumers. Defaults to MAX_CONCURRENT_PROCESSES
+            queue_size (int, optional): Capacity of the queues between stages, which bounds how far
+                a fast stage can run ahead of a slow one. Defaults to PIPELINE_QUEUE_SIZE
+            crawl_cache_mode (str, optional): How the crawl cache is used, one of "read_write",
+                "read_only", "refresh" or "disabled". Ignored without a crawl cache. Defaults to "read_write"
+            deduplicate (bool, optional): Drop near-duplicate pages (MinHash/LSH over the raw markdown)
+                before refinement, keeping the longest page of each cluster. When a longer copy arrives
+                after the shorter one, the shorter one skips the LLM stages it has not reached yet, but
+                the calls it already made are spent twice. Defaults to True
+            journal_path (str, optional): Append-only JSONL journal recording every page once it is
+                crawled, refined and scored, so an interrupted run can be resumed. Defaults to None
+            resume (bool, optional): Reload `journal_path` and skip the work it records as done:
+                journaled pages are not crawled again, and only their missing stages are run. Defaults to False
+            pdf_urls (Dict[str, str], optional): PDF link of a URL, e.g. the "pdfUrl" metadata of search results
+                (see `collect_pdf_urls`). Such URLs are fetched as PDFs first. Defaults to None
+        """
+        await self.run_many(
+            {topic: url_list},
+            crawl_output_file_path,
+            top_n=top_n,
+            crawl_workers=crawl_workers,
+            refine_workers=refine_workers,
+            score_workers=score_workers,
+            queue_size=queue_size,
+            crawl_cache_mode=crawl_cache_mode,
+            deduplicate=deduplicate,
+            journal_path=journal_path,
+            resume=resume,
+            pdf_urls=pdf_urls,
+        )
+
+    async def run_many(
+        self,
+        topic_urls: Dict[str, List[str]],
+        crawl_output_file_path: str,
+        top_n: int = 80,
+        crawl_workers: Optional[int] = None,
+        refine_workers: Optional[int] = None,
+        score_workers: Optional[int] = None,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        crawl_cache_mode: str = CrawlCacheMode.READ_WRITE.value,
+        deduplicate: bool = True,
+        journal_path: Optional[str] = None,
+        resume: bool = False,
+        pdf_urls: Optional[Dict[str, str]] = None,
+    ):
+        """
+        Run the pipeline of `run` for several topics at once on shared browser and request pools.
+
+        A URL listed under several topics is crawled once, then refined and scored once per topic.
+        URLs are crawled round-robin across hosts with per-host concurrency and spacing (see
+        `HostScheduler`), in an order interleaving the topics, and every later queue serves the
+        topics round-robin, so a topic with many URLs cannot starve the others. Near-duplicates are removed within each topic. The output line of a topic is
+        written as soon as all of its pages have been scored, dropped or failed.
+
+        Args:
+            topic_urls (Dict[str, List[str]]): Mapping of topics to the URLs to crawl for them
+            crawl_output_file_path (str): JSONL file receiving one line per topic, in completion order
+            Other arguments are the same as in `run`
         """
         process_start_time = time.time()
-        stage_time = process_start_time
-        logger.info(f"Starting crawling process for {len(url_list)} URLs")
+        self.stage_timings = {}
+        self.crawl_stats = {"resumed": 0, "cache_hits": 0, "fetched": 0, "failed": 0, "skipped": 0}
+        self.fetch_stats = FetchTierStats()
+        self.domain_health.reset_stats()
+        if self.quality_gate is not None:
+            self.quality_gate.reset_stats()
+        self._pdf_urls = dict(pdf_urls or {})
+        self.dedup_stats = {"duplicates": 0, "superseded": 0, "superseded_skipped": 0}
+        self.deduplicate = deduplicate
+        self._deduplicators = {}
+        self._signatures = {}
+        self._superseded_urls = set()
+        self.refine_stats = {
+            "page_tokens": 0, "cleaned_tokens": 0, "chunked_pages": 0, "chunks": 0, "dropped_pages": 0,
+            "tokens_saved": 0, "discarded_pages": 0
+        }
+        self.similarity_stats = {"embedding_scored": 0, "llm_scored": 0}
+        self.crawl_cache_mode = CrawlCacheMode(crawl_cache_mode)
+        self.journal = None
+        self._resumed = {}
+        if journal_path:
+            self.journal = RunJournal(journal_path, resume=resume)
+            if resume:
+                self._resumed = self.journal.load()
+                logger.info(
+                    f"Resuming from journal {journal_path}: {RunJournal.summarize(self._resumed)}"
+                )
 
-        # Stage 1: Concurrent URL crawling
-        results = await self._crawl_urls(topic, url_list)
+        # Topics sharing a URL are crawled together, URLs are interleaved across topics
+        url_topics = {}
+        for topic, url_list in topic_urls.items():
+            for url in url_list:
+                url_topics.setdefault(url, [])
+                if topic not in url_topics[url]:
+                    url_topics[url].append(topic)
+        self._topic_pending = {topic: 0 for topic in topic_urls}
+        for topics in url_topics.values():
+            for topic in topics:
+                self._topic_pending[topic] += 1
+        self._topic_results = {topic: [] for topic in topic_urls}
         logger.info(
-            f"Stage 1 - Crawling completed in {time.time() - stage_time:.2f} seconds, with {len(results)} results"
+            f"Starting crawling process for {len(url_topics)} unique URLs over {len(topic_urls)} topics "
+            f"({sum(self._topic_pending.values())} topic pages)"
         )
-        stage_time = time.time()
 
-        # Stage 2: Concurrent content filtering and title generation
-        results = await self._process_filter_and_titles(results)
-        logger.info(
-            f"Stage 2 - Content filtering and title generation completed in {time.time() - stage_time:.2f} seconds, with {len(results)} results"
-        )
-        stage_time = time.time()
+        crawl_workers = crawl_workers or self.MAX_CONCURRENT_CRAWLS
+        refine_workers = refine_workers or self.MAX_CONCURRENT_PROCESSES
+        score_workers = score_workers or self.MAX_CONCURRENT_PROCESSES
 
-        # Stage 3: Concurrent similarity scoring
-        results = await self._process_similarity_scores(results)
-        logger.info(
-            f"Stage 3 - Similarity scoring completed in {time.time() - stage_time:.2f} seconds, with {len(results)} results"
-        )
-        stage_time = time.time()
+        def by_topic(data):
+            return data["topic"]
+
+        url_queue = self._host_scheduler()
+        dedup_queue = FairQueue(by_topic, _END_OF_STREAM, maxsize=queue_size)
+        refine_queue = FairQueue(by_topic, _END_OF_STREAM, maxsize=queue_size)
+        score_queue = FairQueue(by_topic, _END_OF_STREAM, maxsize=queue_size)
+        result_queue = FairQueue(by_topic, _END_OF_STREAM, maxsize=queue_size)
+        # Topics are interleaved within every host queue, hosts are interleaved by the scheduler.
+        # Journal and crawl cache hits make no request, so they skip the per-host politeness
+        topic_order = FairQueue(lambda item: item[1][0], _END_OF_STREAM)
+        for url, topics in url_topics.items():
+            topic_order.put_nowait((url, topics))
+        topic_order.put_nowait(_END_OF_STREAM)
+        local_urls = await self._local_urls(url_topics)
+        while (item := topic_order.get_nowait()) is not _END_OF_STREAM:
+            if item[0] in local_urls:
+                url_queue.put_local(item)
+            else:
+                url_queue.put_nowait(item)
+        url_queue.put_nowait(_END_OF_STREAM)
+
+        def resolve_skipped(data):
+            self._resolve_topic_page(data["topic"], None, outfile, top_n)
+
+        async def crawl_stage():
+            # Stage 1: Concurrent URL crawling over a shared browser pool
+            self.crawler_pool = CrawlerPool(
+                size=min(self.browser_pool_size, crawl_workers, max(len(url_topics), 1)),
+                max_pages_per_browser=self.max_pages_per_browser,
+            )
+            try:
+                # With a readable crawl cache or the HTTP fast path, browsers are only started once a page needs one
+                await self.crawler_pool.start(
+                    prestart=not self._crawl_cache_readable() and self.http_fetcher is None
+                )
+                self.stage_timings["browser_startup"] = time.time() - process_start_time
+                count = await self._pipeline_stage(
+                    self._host_scheduled(url_queue, lambda item: self._crawl_for_topics(*item)),
+                    url_queue,
+                    dedup_queue if self.deduplicate else refine_queue,
+                    crawl_workers,
+                    "URL crawling completed",
+                    on_skip=resolve_skipped,
+                )
+            finally:
+                await self.crawler_pool.close()
+                pool_stats = self.crawler_pool.stats
+                self.crawler_pool = None
+                if self.http_fetcher is not None:
+                    await self.http_fetcher.aclose()
+                if self.pdf_extractor is not None:
+                    await self.pdf_extractor.aclose()
+                await self.domain_health.aflush()
+            self.stage_timings["crawl"] = time.time() - process_start_time
+            logger.info(
+                f"Stage 1 - Crawling completed after {self.stage_timings['crawl']:.2f} seconds, with {count} results "
+                f"(resumed={self.crawl_stats['resumed']}, cache hits={self.crawl_stats['cache_hits']}, fetched={self.crawl_stats['fetched']}, "
+                f"failed={self.crawl_stats['failed']}, skipped={self.crawl_stats['skipped']}; {pool_stats.summary()})"
+            )
+            self.host_stats = url_queue.stats
+            logger.info(f"Stage 1 - Host scheduling: {url_queue.stats.summary()}")
+            pdf_truncated = f", PDFs truncated={self.pdf_extractor.truncated}" if self.pdf_extractor is not None else ""
+            logger.info(f"Stage 1 - Fetch tiers: {self.fetch_stats.summary()}{pdf_truncated}")
+            logger.info(f"Stage 1 - Domain health: {self.domain_health.stats.summary()}")
+            if self.quality_gate is not None:
+                logger.info(f"Stage 1 - Quality gate: {self.quality_gate.stats.summary()}")
+
+        async def dedup_stage():
+            # Stage 1b: Near-duplicate removal, a single consumer owns the LSH indexes
+            count = await self._pipeline_stage(
+                self._deduplicate_page,
+                dedup_queue,
+                refine_queue,
+                1,
+                "Near-duplicate check completed",
+                on_skip=resolve_skipped,
+            )
+            logger.info(
+                f"Stage 1b - Near-duplicate removal completed after {time.time() - process_start_time:.2f} seconds, "
+                f"with {count} results (dropped={self.dedup_stats['duplicates']})"
+            )
+
+        async def refine_stage():
+            # Stage 2: Concurrent content filtering and title generation
+            count = await self._pipeline_stage(
+                self._unless_superseded(
+                    self._journaled(self._process_filter_and_title, "refined", ("title", "filtered"))
+                ),
+                refine_queue,
+                score_queue,
+                refine_workers,
+                "Title and filter processing completed",
+                on_skip=resolve_skipped,
+            )
+            self.stage_timings["filter_and_title"] = time.time() - process_start_time
+            logger.info(
+                f"Stage 2 - Content filtering and title generation completed after {self.stage_timings['filter_and_title']:.2f} seconds, with {count} results "
+                f"(page tokens={self.refine_stats['page_tokens']}, boilerplate tokens removed={self.refine_stats['cleaned_tokens']}, "
+                f"chunked pages={self.refine_stats['chunked_pages']}, "
+                f"chunks={self.refine_stats['chunks']}, dropped pages={self.refine_stats['dropped_pages']}, "
+                f"tokens saved={self.refine_stats['tokens_saved']}, discarded after refinement={self.refine_stats['discarded_pages']})"
+            )
+
+        async def score_stage():
+            # Stage 3: Optional embedding prefilter, then concurrent LLM similarity scoring
+            llm_queue = score_queue
+            prefilter = []
+            if self.relevance_scorer is not None:
+                llm_queue = FairQueue(by_topic, _END_OF_STREAM, maxsize=queue_size)
+                prefilter.append(
+                    self._batched_pipeline_stage(
+                        self._prefilter_similarity_batch,
+                        score_queue,
+                        llm_queue,
+                        self.RELEVANCE_BATCH_SIZE,
+                        "Embedding relevance prefilter completed",
+                        on_skip=resolve_skipped,
+                    )
+                )
+            count, *_ = await asyncio.gather(
+                self._pipeline_stage(
+                    self._unless_superseded(
+                        self._journaled(self._process_similarity_score, "scored", ("similarity", "embedding_cosine"))
+                    ),
+                    llm_queue,
+                    result_queue,
+                    score_workers,
+                    "Processed similarity score",
+                    on_skip=resolve_skipped,
+                ),
+                *prefilter,
+            )
+            self.stage_timings["similarity"] = time.time() - process_start_time
+            logger.info(
+                f"Stage 3 - Similarity scoring completed after {self.stage_timings['similarity']:.2f} seconds, with {count} results "
+                f"(embedding scored={self.similarity_stats['embedding_scored']}, LLM scored={self.similarity_stats['llm_scored']})"
+            )
+
+        self.stage_timings["results"] = 0.0
+        outfile = open(crawl_output_file_path, "w", encoding="utf-8")
+        try:
+            # Stage 4: Each topic is filtered and saved as soon as all of its pages are resolved
+            for topic, pending in list(self._topic_pending.items()):
+                if pending == 0:
+                    self._write_topic(outfile, topic, top_n)
+
+            collector = asyncio.create_task(
+                self._collect_results(
+                    result_queue,
+                    process_start_time,
+                    on_result=lambda data: self._resolve_topic_page(data["topic"], data, outfile, top_n),
+                )
+            )
+            tasks = [
+                asyncio.create_task(crawl_stage()),
+                asyncio.create_task(refine_stage()),
+                asyncio.create_task(score_stage()),
+                collector,
+            ]
+            if self.deduplicate:
+                tasks.append(asyncio.create_task(dedup_stage()))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
+                if self.journal is not None:
+                    await self.journal.aclose()
+            results = collector.result()
+        finally:
+            outfile.close()
 
-        # Stage 4: Result processing and saving
-        self._process_results(results, crawl_output_file_path, top_n=top_n)
+        if self._superseded_urls:
+            logger.info(
+                f"Dropped {self.dedup_stats['superseded']} results superseded by a better near-duplicate, "
+                f"{self.dedup_stats['superseded_skipped']} of them before refinement or scoring"
+            )
+        unfinished = [topic for topic, pending in self._topic_pending.items() if pending > 0]
+        if unfinished:
+            logger.warning(f"{len(unfinished)} topics did not resolve all their pages and were not saved: {unfinished}")
+        self.stage_timings["total"] = time.time() - process_start_time
         logger.info(
-            f"Stage 4 - Results processing completed in {time.time() - stage_time:.2f} seconds, with {len(results)} results"
+            f"Stage 4 - Results saved to {crawl_output_file_path} for {len(topic_urls) - len(unfinished)} topics "
+            f"in {self.stage_timings['results']:.2f} seconds, with {len(results)} results"
         )
         logger.info(
             f"Total processing completed in {time.time() - process_start_time:.2f} seconds"
         )
+        if self.request_pool.cache is not None:
+            await asyncio.to_thread(self.request_pool.cache.flush)
+            logger.info(f"Completion cache stats: {self.request_pool.cache.stats()}")
+        logger.info(f"Request limiter metrics: {self.request_pool.limiter_metrics()}")
+        logger.info(f"Completion usage:\n{self.request_pool.usage_summary()}")
+
+    def _resolve_topic_page(self, topic: str, data: Optional[dict], outfile, top_n: int):
+        """
+        Account for one page of a topic leaving the pipeline, either as a scored result (`data`)
+        or dropped/failed (None). The topic is saved once its last page is resolved.
+        """
+        if data is not None:
+            self._topic_results[topic].append(data)
+        self._topic_pending[topic] -= 1
+        if self._topic_pending[topic] == 0:
+            self._write_topic(outfile, topic, top_n)
+
+    def _write_topic(self, outfile, topic: str, top_n: int):
+        stage_time = time.time()
+        results = [
+            data for data in self._topic_results.pop(topic, [])
+            if (topic, data["url"]) not in self._superseded_urls
+        ]
+        papers = self._filter_papers(
+            self._paper_data(results),
+            self.DEFAULT_SIMILARITY_THRESHOLD,
+            self.DEFAULT_MIN_LENGTH,
+            self.DEFAULT_MAX_LENGTH,
+            top_n,
+        )
+        json.dump({"title": topic, "papers": papers}, outfile, ensure_ascii=False)
+        outfile.write("\n")
+        outfile.flush()
+        self.stage_timings["results"] = self.stage_timings.get("results", 0.0) + time.time() - stage_time
+        logger.info(f"Topic completed with {len(papers)}/{len(results)} papers saved: {topic}")
 
     async def _process_similarity_score(self, data):
         """
         Calculate similarity score for a single piece of data.
+        Data already scored confidently by the embedding prefilter is returned unchanged.
         """
+        if data.get("similarity") is not None:
+            return data
+
+        self.similarity_stats["llm_scored"] = self.similarity_stats.get("llm_scored", 0) + 1
         try:
             # Calculate similarity score using SIMILARITY_PROMPT
             prompt = SIMILARITY_PROMPT.format(
                 topic=data["topic"], content=data["filtered"]
             )
-            res = self.request_pool.completion(prompt)
+            with usage_stage("similarity"):
+                res = await self.request_pool.acompletion(prompt)
 
             score = re.search(r"<SCORE>(\d+)</SCORE>", res)
             if not score:
@@ -113,24 +541,77 @@ class AsyncCrawler:
             data["similarity"] = -1
         return data
 
+    async def _prefilter_similarity_batch(self, batch: List[dict]) -> List[dict]:
+        """
+        Score a batch of filtered data with the embedding relevance scorer.
+        Data whose cosine lies in the scorer's uncertain band keeps no similarity and is left to the LLM.
+        """
+        # Data resumed with a similarity is not scored again
+        pending = [data for data in batch if data.get("similarity") is None]
+        if not pending:
+            return batch
+        try:
+            scores = await asyncio.to_thread(
+                self.relevance_scorer.score,
+                [data["topic"] for data in pending],
+                [f"{data['title']}\n{data['filtered']}" for data in pending],
+            )
+        except Exception as e:
+            logger.warning(f"Embedding relevance prefilter failed, falling back to LLM scoring: {e}")
+            return batch
+
+        for data, (cosine, similarity) in zip(pending, scores):
+            data["embedding_cosine"] = cosine
+            if similarity is not None:
+                data["similarity"] = similarity
+                self.similarity_stats["embedding_scored"] = self.similarity_stats.get("embedding_scored", 0) + 1
+        return batch
+
     async def _process_filter_and_title(self, data):
         """
         Process title generation and content filtering for a single piece of data.
+        Boilerplate is stripped from the page by `markdown_cleaner` first, unless the quality
+        gate already did, the raw content itself is kept unchanged.
+        PAGE_REFINE_PROMPT removes noise but does not summarize, so a page shorter than
+        DEFAULT_MIN_LENGTH or above MAX_PAGE_TOKENS is dropped without any LLM call. Longer pages
+        are still refined, since links, ads and images often make up most of them, and the refined
+        text is dropped before scoring when it falls outside [DEFAULT_MIN_LENGTH, DEFAULT_MAX_LENGTH],
+        the papers `_filter_papers` keeps. Pages above MAX_REFINE_TOKENS are refined as overlapping
+        chunks in parallel and stitched back together.
         """
         try:
-            # Generate title and filter content using PAGE_REFINE_PROMPT
-            prompt = PAGE_REFINE_PROMPT.format(
-                topic=data["topic"], raw_content=data["raw_content"]
-            )
-            res = self.request_pool.completion(prompt)
-            title = re.search(r"<TITLE>(.*?)</TITLE>", res, re.DOTALL)
-            content = re.search(r"<CONTENT>(.*?)</CONTENT>", res, re.DOTALL)
+            raw_content = data["raw_content"]
+            if self.markdown_cleaner is not None:
+                raw_content = await self._clean_markdown(raw_content, data.get("url", "N/A"), data.pop("cleaned", None))
+            page_tokens = self.chunker.count(raw_content)
+            if not self._refinable(raw_content, page_tokens):
+                self._count_refine("dropped_pages")
+                self._count_refine("tokens_saved", page_tokens)
+                raise ValueError(
+                    f"Page of {len(raw_content)} characters and {page_tokens} tokens is shorter than "
+                    f"{self.DEFAULT_MIN_LENGTH} characters or above {self.MAX_PAGE_TOKENS} tokens, dropped before refinement"
+                )
+            self._count_refine("page_tokens", page_tokens)
 
-            if not title or not content:
-                raise ValueError(f"Invalid response format, response: {res}")
+            if page_tokens <= self.MAX_REFINE_TOKENS:
+                title, filtered = await self._refine_content(data["topic"], raw_content)
+            else:
+                chunks = self.chunker.split(
+                    raw_content, self.MAX_REFINE_TOKENS, self.REFINE_CHUNK_OVERLAP_TOKENS
+                )
+                self._count_refine("chunked_pages")
+                self._count_refine("chunks", len(chunks))
+                logger.info(f"Refining {page_tokens} tokens in {len(chunks)} chunks, URL: {data.get('url', 'N/A')}")
+                title, filtered = await self._refine_chunks(data["topic"], chunks)
 
-            data["title"] = title.group(1).strip()
-            data["filtered"] = content.group(1).strip()
+            data["title"] = title
+            data["filtered"] = filtered
+            if not self._keepable_length(filtered):
+                self._count_refine("discarded_pages")
+                raise ValueError(
+                    f"Refined length {len(filtered)} outside [{self.DEFAULT_MIN_LENGTH}, {self.DEFAULT_MAX_LENGTH}], "
+                    f"dropped before scoring"
+                )
         except Exception as e:
             logger.error(f"Failed to process filter and title: {e}")
             data["title"] = "Error in filtering"
@@ -138,146 +619,341 @@ class AsyncCrawler:
             data["error"] = True
         return data
 
-    async def _process_similarity_scores(self, results: List[dict]) -> List[dict]:
+    def _keepable_length(self, text: str) -> bool:
+        return self.DEFAULT_MIN_LENGTH <= len(text) <= self.DEFAULT_MAX_LENGTH
+
+    def _refinable(self, text: str, page_tokens: int) -> bool:
+        return len(text) >= self.DEFAULT_MIN_LENGTH and page_tokens <= self.MAX_PAGE_TOKENS
+
+    async def _clean_markdown(self, raw_content: str, url: str, cleaned: Optional[str] = None) -> str:
         """
-        Calculate similarity scores for filtered results using pure producer-consumer pattern.
+        Strip boilerplate from a page and log the token reduction.
+        `cleaned` is the page already cleaned by the quality gate, if any.
         """
-        input_queue = asyncio.Queue()
-        output_queue = asyncio.Queue()
-        total_items = len(results)
+        if cleaned is None:
+            cleaned = await asyncio.to_thread(self.markdown_cleaner.clean, raw_content)
+        raw_tokens = self.chunker.count(raw_content)
+        removed = raw_tokens - self.chunker.count(cleaned)
+        self._count_refine("cleaned_tokens", removed)
+        logger.info(
+            f"Boilerplate removed: {removed}/{raw_tokens} tokens ({removed / max(raw_tokens, 1):.0%}), URL: {url}"
+        )
+        return cleaned
 
-        # Producer: Add tasks to queue
-        for data in results:
-            await input_queue.put(data)
+    async def _refine_content(self, topic: str, raw_content: str):
+        """
+        Generate title and filter content using PAGE_REFINE_PROMPT.
 
-        async def consumer():
-            while True:
-                try:
-                    data = input_queue.get_nowait()
-                    try:
-                        result = await self._process_similarity_score(data)
-                        await output_queue.put(result)
-                        logger.info(
-                            f"Processed similarity score, remaining: {input_queue.qsize()}/{total_items}, URL: {data.get('url', 'N/A')}"
-                        )
-                    finally:
-                        input_queue.task_done()
-                except asyncio.QueueEmpty:
-                    break
+        Returns:
+            tuple: (title, filtered content)
+        """
+        prompt = PAGE_REFINE_PROMPT.format(topic=topic, raw_content=raw_content)
+        with usage_stage("refine"):
+            res = await self.request_pool.acompletion(prompt)
+        title = re.search(r"<TITLE>(.*?)</TITLE>", res, re.DOTALL)
+        content = re.search(r"<CONTENT>(.*?)</CONTENT>", res, re.DOTALL)
 
-        # Create and start consumers
-        consumers = [
-            asyncio.create_task(consumer())
-            for _ in range(self.MAX_CONCURRENT_PROCESSES)
-        ]
+        if not title or not content:
+            raise ValueError(f"Invalid response format, response: {res}")
+        return title.group(1).strip(), content.group(1).strip()
 
-        # Wait for all tasks to be processed
-        await input_queue.join()
+    async def _refine_chunks(self, topic: str, chunks: List[str]):
+        """
+        Refine the chunks of one page in parallel. Failed chunks are skipped as long as
+        at least one chunk succeeds; the title comes from the first successful chunk.
+        """
+        refined = await asyncio.gather(
+            *(self._refine_content(topic, chunk) for chunk in chunks), return_exceptions=True
+        )
+        succeeded = [r for r in refined if not isinstance(r, BaseException)]
+        if not succeeded:
+            raise refined[0]
+        if len(succeeded) < len(refined):
+            logger.warning(f"{len(refined) - len(succeeded)}/{len(refined)} chunks failed to refine, skipped")
+        return succeeded[0][0], stitch_chunks([content for _, content in succeeded])
 
-        # Collect results
-        results = []
-        while not output_queue.empty():
-            data = await output_queue.get()
-            if data["error"]:
-                logger.error(f"Error in processing data, skip: {data}")
-            else:
-                results.append(data)
+    def _count_refine(self, key: str, value: int = 1):
+        self.refine_stats[key] = self.refine_stats.get(key, 0) + value
 
-        return results
+    def _host_scheduler(self) -> HostScheduler:
+        return HostScheduler(
+            lambda item: item[0],
+            _END_OF_STREAM,
+            per_host_concurrency=self.per_host_concurrency,
+            min_interval=self.host_min_interval,
+        )
 
-    async def _process_filter_and_titles(self, results: List[dict]) -> List[dict]:
+    def _host_scheduled(
+        self,
+        scheduler: HostScheduler,
+        handler: Callable[[Any], Awaitable[Any]],
+    ) -> Callable[[Any], Awaitable[Any]]:
         """
-        Process title generation and content filtering using pure producer-consumer pattern.
+        Wrap a crawl handler so that every item is released to `scheduler` once crawled.
+        An item whose host throttled the crawl is requeued by the scheduler and forwards
+        nothing, until it runs out of retries and its failure is forwarded.
         """
-        input_queue = asyncio.Queue()
-        output_queue = asyncio.Queue()
-        total_items = len(results)
+        async def run_handler(item: Any) -> Any:
+            throttled = None
+            try:
+                result = await handler(item)
+                for data in result if isinstance(result, list) else [result]:
+                    throttled = throttled or data.get("throttled")
+            finally:
+                requeued = scheduler.release(item, throttled)
+            return [] if requeued else result
 
-        # Producer: Add tasks to queue
-        for data in results:
-            await input_queue.put(data)
+        return run_handler
+
+    async def _pipeline_stage(
+        self,
+        handler: Callable[[Any], Awaitable[dict]],
+        input_queue: asyncio.Queue,
+        output_queue: asyncio.Queue,
+        workers: int,
+        progress_message: str,
+        on_skip: Optional[Callable[[Any], None]] = None,
+    ) -> int:
+        """
+        Apply `handler` to every item of `input_queue` with `workers` concurrent consumers and
+        forward the successful results to `output_queue`, until the end-of-stream marker arrives.
+        A handler may return a list to forward several results for one item.
+        Items for which the handler returns None are dropped.
+        `on_skip` is called with every dropped item and every failed result.
+        The marker is forwarded downstream once every consumer has stopped.
+
+        Returns:
+            int: Number of results forwarded downstream
+        """
+        forwarded = 0
 
         async def consumer():
+            nonlocal forwarded
             while True:
-                try:
-                    data = input_queue.get_nowait()
-                    try:
-                        result = await self._process_filter_and_title(data)
-                        await output_queue.put(result)
-                        logger.info(
-                            f"Title and filter processing completed, remaining: {input_queue.qsize()}/{total_items}, URL: {data.get('url', 'N/A')}"
-                        )
-                    finally:
-                        input_queue.task_done()
-                except asyncio.QueueEmpty:
+                item = await input_queue.get()
+                if item is _END_OF_STREAM:
+                    # Hand the marker over to the sibling consumers
+                    await input_queue.put(_END_OF_STREAM)
                     break
 
-        # Create and start consumers
-        consumers = [
-            asyncio.create_task(consumer())
-            for _ in range(self.MAX_CONCURRENT_PROCESSES)
-        ]
+                result = await handler(item)
+                if result is None:
+                    # Dropped on purpose by the handler
+                    if on_skip is not None:
+                        on_skip(item)
+                    continue
 
-        # Wait for all tasks to be processed
-        await input_queue.join()
+                for data in result if isinstance(result, list) else [result]:
+                    if data["error"]:
+                        logger.error(f"Error in processing data, skip: {data}")
+                        if on_skip is not None:
+                            on_skip(data)
+                        continue
 
-        # Collect results
-        results = []
-        while not output_queue.empty():
-            data = await output_queue.get()
-            if data["error"]:
-                logger.error(f"Error in processing data, skip: {data}")
-            else:
-                results.append(data)
+                    # Blocks while the downstream queue is full (backpressure)
+                    await output_queue.put(data)
+                    forwarded += 1
+                    logger.info(
+                        f"{progress_message}, forwarded: {forwarded}, URL: {data.get('url', 'N/A')}"
+                    )
 
-        return results
+        await asyncio.gather(*(consumer() for _ in range(workers)))
+        await output_queue.put(_END_OF_STREAM)
+        return forwarded
 
-    async def _crawl_urls(self, topic: str, url_list: List[str]) -> List[dict]:
-        """
-        Crawl URLs using pure producer-consumer pattern.
+    async def _batched_pipeline_stage(
+        self,
+        batch_handler: Callable[[List[Any]], Awaitable[List[dict]]],
+        input_queue: asyncio.Queue,
+        output_queue: asyncio.Queue,
+        batch_size: int,
+        progress_message: str,
+        on_skip: Optional[Callable[[Any], None]] = None,
+    ) -> int:
         """
-        input_queue = asyncio.Queue()
-        output_queue = asyncio.Queue()
-        total_items = len(url_list)
-
-        # Producer: Add URLs to queue
-        for url in url_list:
-            await input_queue.put((url, topic))
+        Like `_pipeline_stage`, but a single consumer hands whatever is queued (up to `batch_size`
+        items) to `batch_handler` at once, which suits vectorized work such as embedding.
 
-        async def consumer():
-            while True:
-                try:
-                    url, topic = input_queue.get_nowait()
-                    try:
-                        result = await self._crawl_and_collect(url, topic)
-                        await output_queue.put(result)
-                        logger.info(
-                            f"URL crawling completed, remaining: {input_queue.qsize()}/{total_items}, URL: {url}"
-                        )
-                    finally:
-                        input_queue.task_done()
-                except asyncio.QueueEmpty:
+        Returns:
+            int: Number of results forwarded downstream
+        """
+        forwarded = 0
+        finished = False
+        while not finished:
+            batch = []
+            item = await input_queue.get()
+            while item is not _END_OF_STREAM:
+                batch.append(item)
+                if len(batch) >= batch_size or input_queue.empty():
                     break
+                item = input_queue.get_nowait()
+            finished = item is _END_OF_STREAM
 
-        # Create and start consumers
-        consumers = [
-            asyncio.create_task(consumer()) for _ in range(self.MAX_CONCURRENT_CRAWLS)
-        ]
+            if not batch:
+                continue
+            for data in await batch_handler(batch):
+                if data["error"]:
+                    logger.error(f"Error in processing data, skip: {data}")
+                    if on_skip is not None:
+                        on_skip(data)
+                    continue
+                await output_queue.put(data)
+                forwarded += 1
+            logger.info(f"{progress_message}, batch size: {len(batch)}, forwarded: {forwarded}")
 
-        # Wait for all tasks to be processed
-        await input_queue.join()
+        await output_queue.put(_END_OF_STREAM)
+        return forwarded
 
-        # Collect results
+    async def _collect_results(
+        self,
+        result_queue: asyncio.Queue,
+        start_time: float,
+        on_result: Optional[Callable[[dict], None]] = None,
+    ) -> List[dict]:
+        """
+        Consume the stream of scored results until the end-of-stream marker arrives,
+        calling `on_result` with each of them.
+        """
         results = []
-        while not output_queue.empty():
-            data = await output_queue.get()
-            if data["error"]:
-                logger.error(f"Error in processing data, skip: {data}")
+        while (data := await result_queue.get()) is not _END_OF_STREAM:
+            if not results:
+                self.stage_timings["first_result"] = time.time() - start_time
+                logger.info(
+                    f"First result available after {self.stage_timings['first_result']:.2f} seconds, URL: {data.get('url', 'N/A')}"
+                )
+            results.append(data)
+            if on_result is not None:
+                on_result(data)
+        return results
+
+    async def _deduplicate_page(self, data: dict) -> Optional[dict]:
+        """
+        Check a crawled page against the pages of the same topic seen so far in this run.
+
+        Returns:
+            None when a longer near-duplicate was already seen, otherwise the data. When this page is
+            longer than the representative of its cluster, the representative is marked as superseded
+            and removed from the final results. A superseded page still queued for refinement or
+            scoring is dropped there (see `_unless_superseded`), one that already went through them
+            has paid for calls the longer page pays for again.
+        """
+        deduplicator = self._deduplicators.get(data["topic"])
+        if deduplicator is None:
+            deduplicator = self._deduplicators[data["topic"]] = NearDuplicateDetector(threshold=self.DEDUP_THRESHOLD)
+        signature = self._signatures.get(data["url"])
+        if signature is None:
+            signature = await asyncio.to_thread(deduplicator.signature, data["raw_content"])
+            self._signatures[data["url"]] = signature
+        duplicate_of, superseded = deduplicator.add(
+            data["url"], quality=len(data["raw_content"]), signature=signature
+        )
+        if duplicate_of is not None:
+            self.dedup_stats["duplicates"] += 1
+            logger.info(f"Near-duplicate of {duplicate_of} dropped, URL: {data['url']}")
+            return None
+        if superseded is not None:
+            self.dedup_stats["superseded"] += 1
+            self._superseded_urls.add((data["topic"], superseded))
+            logger.info(f"URL {data['url']} supersedes its near-duplicate {superseded}")
+        return data
+
+    async def _crawl_for_topics(self, url: str, topics: List[str]) -> List[dict]:
+        """
+        Produce the data of a URL for every topic listing it. Topics resuming from the journal
+        reuse their journaled data, the URL is crawled once for all the other topics and the
+        result is journaled per topic.
+        """
+        results, missing = [], []
+        for topic in topics:
+            resumed = self._resumed.get((topic, url))
+            if resumed is not None:
+                self._count_crawl("resumed")
+                logger.info(f"Resumed from journal at state {resumed.get(STATE_KEY)}, URL={url}")
+                results.append(dict(resumed))
             else:
-                results.append(data)
+                missing.append(topic)
+        if not missing:
+            return results
 
+        crawled = await self._crawl_and_collect(url, missing[0])
+        if not crawled["error"] and self.quality_gate is not None:
+            crawled = await self._check_quality(crawled, len(missing))
+        for topic in missing:
+            data = dict(crawled, topic=topic)
+            if not data["error"] and self.journal is not None:
+                self.journal.record(data, "crawled", ("raw_content",))
+                data[STATE_KEY] = "crawled"
+            results.append(data)
         return results
 
+    async def _check_quality(self, data: dict, topics: int) -> dict:
+        """
+        Run the quality gate on crawled data. A page that passes keeps its cleaned text in
+        "cleaned", which refinement reuses. A rejected page becomes error data, which skips
+        refinement and scoring for all `topics` listing it, and the LLM calls it would have
+        cost are estimated per topic: one refine call per chunk and one similarity call, none
+        for pages refinement drops anyway.
+        """
+        raw_content = data["raw_content"]
+        text = raw_content
+        if self.markdown_cleaner is not None:
+            text = await asyncio.to_thread(self.markdown_cleaner.clean, raw_content)
+        reason, flags = await asyncio.to_thread(self.quality_gate.check, text, raw_content)
+        if reason is None:
+            if flags:
+                logger.info(f"Quality gate flagged {', '.join(flags)} on a long page, kept, URL: {data['url']}")
+                data["quality_flags"] = flags
+            if self.markdown_cleaner is not None:
+                data["cleaned"] = text
+            return data
+
+        page_tokens = self.chunker.count(text)
+        if self._refinable(text, page_tokens):
+            refine_calls = 1
+            if page_tokens > self.MAX_REFINE_TOKENS:
+                step = self.MAX_REFINE_TOKENS - self.REFINE_CHUNK_OVERLAP_TOKENS
+                refine_calls = -(-(page_tokens - self.REFINE_CHUNK_OVERLAP_TOKENS) // step)
+            self.quality_gate.stats.llm_calls_saved += (refine_calls + 1) * topics
+        logger.warning(f"Quality gate rejected the page ({reason}), URL: {data['url']}")
+        return dict(data, raw_content=f"Error: Rejected by quality gate({reason})", error=True)
+
+    def _unless_superseded(
+        self, handler: Callable[[dict], Awaitable[Optional[dict]]]
+    ) -> Callable[[dict], Awaitable[Optional[dict]]]:
+        """
+        Wrap an LLM stage handler so that a page superseded by a longer near-duplicate
+        since it left the near-duplicate check is dropped instead of processed.
+        """
+        async def run_handler(data: dict) -> Optional[dict]:
+            if (data["topic"], data["url"]) in self._superseded_urls:
+                self.dedup_stats["superseded_skipped"] += 1
+                logger.info(f"Superseded by a near-duplicate, skipped before LLM calls, URL: {data['url']}")
+                return None
+            return await handler(data)
+
+        return run_handler
+
+    def _journaled(
+        self,
+        handler: Callable[[dict], Awaitable[Optional[dict]]],
+        state: str,
+        fields: tuple,
+    ) -> Callable[[dict], Awaitable[Optional[dict]]]:
+        """
+        Wrap a stage handler so that data already journaled at `state` or later skips it,
+        and data completing it is journaled with the given fields.
+        """
+        async def run_handler(data: dict) -> Optional[dict]:
+            if state_rank(data.get(STATE_KEY)) >= state_rank(state):
+                return data
+            result = await handler(data)
+            if result is not None and not result["error"] and self.journal is not None:
+                self.journal.record(result, state, fields)
+                result[STATE_KEY] = state
+            return result
+
+        return run_handler
+
     async def _crawl_and_collect(self, url: str, topic: str) -> dict:
         """
         Crawl a single URL and collect its content.
@@ -290,15 +966,42 @@ class AsyncCrawler:
             dict: Dictionary containing crawled data and metadata
         """
         try:
-            raw_content = await self._simple_crawl(url)
+            raw_content = await self._read_crawl_cache(url)
+            if raw_content is not None:
+                self._count_crawl("cache_hits")
+                logger.info(f"Crawl cache hit, content length={len(raw_content)} for URL={url}")
+            else:
+                raw_content = await self._simple_crawl(url)
+                self._count_crawl("fetched")
+                await self._write_crawl_cache(url, raw_content)
             data = {
                 "topic": topic,
                 "url": url,
                 "raw_content": raw_content,
                 "error": False,
             }
+        except HostThrottled as e:
+            # Not counted as a failure, the host scheduler decides whether the URL is retried
+            logger.warning(f"Crawling throttled for URL={url}: {e}")
+            data = {
+                "topic": topic,
+                "url": url,
+                "raw_content": f"Error: Crawling failed({e})",
+                "error": True,
+                "throttled": e,
+            }
+        except DomainCircuitOpen as e:
+            logger.warning(f"Crawling skipped for URL={url}: {e}")
+            self._count_crawl("skipped")
+            data = {
+                "topic": topic,
+                "url": url,
+                "raw_content": f"Error: Crawling skipped({e})",
+                "error": True,
+            }
         except Exception as e:
             logger.error(f"Crawling failed for URL={url}: {e}")
+            self._count_crawl("failed")
             data = {
                 "topic": topic,
                 "url": url,
@@ -308,84 +1011,203 @@ class AsyncCrawler:
 
         return data
 
+    async def _local_urls(self, url_topics: Dict[str, List[str]]) -> set:
+        """The URLs `_crawl_for_topics` can serve from the journal or the crawl cache."""
+        local = {
+            url for url, topics in url_topics.items()
+            if all((topic, url) in self._resumed for topic in topics)
+        }
+        if not self._crawl_cache_readable():
+            return local
+        try:
+            # One blocking SQLite pass over all URLs, off the event loop
+            cached = await asyncio.to_thread(
+                self.crawl_cache.fresh_urls, [url for url in url_topics if url not in local]
+            )
+        except Exception as e:
+            logger.warning(f"Failed to read crawl cache: {e}")
+            return local
+        return local | cached
+
+    def _crawl_cache_readable(self) -> bool:
+        return self.crawl_cache is not None and self.crawl_cache_mode.readable
+
+    async def _read_crawl_cache(self, url: str) -> Optional[str]:
+        if not self._crawl_cache_readable():
+            return None
+        try:
+            return await asyncio.to_thread(self.crawl_cache.get, url)
+        except Exception as e:
+            logger.warning(f"Failed to read crawl cache for URL={url}: {e}")
+            return None
+
+    async def _write_crawl_cache(self, url: str, raw_content: str):
+        if self.crawl_cache is None or not self.crawl_cache_mode.writable or not raw_content:
+            return
+        try:
+            await asyncio.to_thread(self.crawl_cache.put, url, raw_content)
+        except Exception as e:
+            logger.warning(f"Failed to write crawl cache for URL={url}: {e}")
+
+    def _count_crawl(self, key: str):
+        self.crawl_stats[key] = self.crawl_stats.get(key, 0) + 1
+
     async def _simple_crawl(self, url: str) -> str:
+        """
+        Fetch a URL as markdown through `_tiered_crawl`, unless the circuit breaker of its domain
+        is open, and record the outcome in the domain health.
+
+        Raises:
+            DomainCircuitOpen: The domain keeps failing and the URL is skipped
+        """
+        self.domain_health.check(url)
+        start = time.perf_counter()
+        try:
+            raw_markdown = await self._tiered_crawl(url)
+        except HostThrottled:
+            self.domain_health.release(url)
+            raise
+        except Exception as e:
+            self.domain_health.record_failure(url, time.perf_counter() - start, timed_out=isinstance(e, TimeoutError))
+            await self._flush_domain_health()
+            raise
+        self.domain_health.record_success(url)
+        await self._flush_domain_health()
+        return raw_markdown
+
+    async def _flush_domain_health(self):
+        # The domain health is persisted in batches, off the event loop
+        if self.domain_health.flush_due:
+            await self.domain_health.aflush()
+
+    async def _tiered_crawl(self, url: str) -> str:
+        """
+        Fetch a URL as markdown through the cheapest tier that yields usable content.
+        URLs with a known PDF link are extracted from the PDF first. With the HTTP fast path
+        enabled, the page is then fetched without a browser, PDF responses are extracted, and
+        only pages `HttpFetcher` judges unusable are escalated to `_browser_crawl`.
+
+        Args:
+            url (str): URL to crawl
+
+        Returns:
+            str: Raw markdown content from the webpage
+        """
+        pdf_url = self._pdf_urls.get(url) or arxiv_pdf_url(url) or (url if looks_like_pdf_url(url) else None)
+        if pdf_url is not None:
+            text = await self._pdf_crawl(pdf_url)
+            if text is not None:
+                return text
+
+        if self.http_fetcher is not None:
+            start = time.perf_counter()
+            try:
+                markdown, reason = await self.http_fetcher.fetch(url)
+            except HostThrottled as e:
+                self.fetch_stats.record("http", time.perf_counter() - start, False, f"status_{e.status}")
+                raise
+            self.fetch_stats.record("http", time.perf_counter() - start, markdown is not None, reason)
+            if markdown is not None:
+                logger.info(f"Content length={len(markdown)} for URL={url} (http)")
+                return markdown
+            if reason == "pdf" and pdf_url != url:
+                text = await self._pdf_crawl(url)
+                if text is not None:
+                    return text
+            logger.info(f"Escalating to browser ({reason}), URL={url}")
+
+        start = time.perf_counter()
+        try:
+            raw_markdown = await self._browser_crawl(url)
+        except Exception:
+            self.fetch_stats.record("browser", time.perf_counter() - start, False)
+            raise
+        self.fetch_stats.record("browser", time.perf_counter() - start, True)
+        return raw_markdown
+
+    async def _pdf_crawl(self, pdf_url: str) -> Optional[str]:
+        """
+        Extract the text of a PDF, or None when PDF extraction is disabled or fails,
+        in which case the caller falls back to the HTML tiers.
+        """
+        if self.pdf_extractor is None:
+            return None
+        start = time.perf_counter()
+        try:
+            text = await self.pdf_extractor.fetch(pdf_url)
+        except Exception as e:
+            reason = "pdf_too_large" if isinstance(e, PdfTooLarge) else "pdf_error"
+            self.fetch_stats.record("pdf", time.perf_counter() - start, False, reason)
+            logger.info(f"PDF extraction failed ({e}), falling back to the page, URL={pdf_url}")
+            return None
+        if not text.strip():
+            # 扫描版PDF没有文本层
+            self.fetch_stats.record("pdf", time.perf_counter() - start, False, "pdf_no_text")
+            return None
+        self.fetch_stats.record("pdf", time.perf_counter() - start, True)
+        logger.info(f"Content length={len(text)} for URL={pdf_url} (pdf)")
+        return text
+
+    async def _browser_crawl(self, url: str) -> str:
         """
         Perform a simple crawl of a URL using AsyncWebCrawler.
+        A browser is borrowed from the shared crawler pool while `run()` is active,
+        otherwise a short-lived browser is opened for this URL only.
+        The page timeout is derived from the past render times of the domain, and a successful
+        render time is recorded, counted from the moment a browser is available.
 
         Args:
             url (str): URL to crawl
 
         Returns:
             str: Raw markdown content from the webpage
+
+        Raises:
+            TimeoutError: The page did not load within its timeout
         """
+        timeout = self.domain_health.timeout(url)
         crawler_run_config = CrawlerRunConfig(
-            page_timeout=180000, cache_mode=CacheMode.BYPASS  # 180s timeout
+            page_timeout=int(timeout * 1000), cache_mode=CacheMode.BYPASS
         )
 
-        async with AsyncWebCrawler() as crawler:
+        browser = self.crawler_pool.acquire() if self.crawler_pool is not None else AsyncWebCrawler()
+        async with browser as crawler:
+            # 等待空闲浏览器或启动浏览器的时间不算作该域名的渲染时间
+            start = time.perf_counter()
             result = await crawler.arun(url=url, config=crawler_run_config)
-            raw_markdown = result.markdown.raw_markdown
-            logger.info(f"Content length={len(raw_markdown)} for URL={url}")
-            return raw_markdown
+            render_seconds = time.perf_counter() - start
 
-    def _process_results(
-        self,
-        results,
-        output_path,
-        top_n=5,
-        similarity_threshold=DEFAULT_SIMILARITY_THRESHOLD,
-        min_length=DEFAULT_MIN_LENGTH,
-        max_length=DEFAULT_MAX_LENGTH,
-    ):
-        """
-        Process crawling results and save to file.
+        if result.status_code in THROTTLE_STATUS:
+            headers = {name.lower(): value for name, value in (result.response_headers or {}).items()}
+            retry_after = parse_retry_after(headers.get("retry-after"))
+            raise HostThrottled(url, result.status_code, retry_after)
+        if not result.success:
+            # crawl4ai把导航超时等异常转成失败结果返回
+            if "timeout" in (result.error_message or "").lower():
+                raise TimeoutError(f"Page did not load within {timeout:.0f}s: {result.error_message}")
+            raise RuntimeError(result.error_message or "Browser crawl failed")
+        self.domain_health.record_render(url, render_seconds)
+        raw_markdown = result.markdown.raw_markdown
+        logger.info(f"Content length={len(raw_markdown)} for URL={url}")
+        return raw_markdown
 
-        Args:
-            results: Raw crawling results
-            output_path: Output file path
-            top_n: Maximum number of documents to keep for each topic
-            similarity_threshold: Similarity threshold
-            min_length: Minimum document length
-            max_length: Maximum document length
-            minimal_length: Allowed minimum document length
+    def _paper_data(self, results: List[dict]) -> List[dict]:
+        """
+        Convert processed results into the paper records saved for a topic.
         """
-        # Step 1: Process each paper data serially
-        processed_data = []
+        papers = []
         for data in results:
             try:
-                # Build paper data
-                paper_data = {
+                papers.append({
                     "title": data["title"],
                     "url": data["url"],
                     "txt": data["filtered"],
                     "similarity": data.get("similarity", 0),
-                }
-                processed_data.append((data["topic"], paper_data))
+                })
             except Exception as e:
                 logger.error(f"Failed to process paper data: {e}")
                 continue
-
-        # Step 2: Organize data by topic
-        topics = {}
-        for topic, paper_data in processed_data:
-            topics.setdefault(topic, []).append(paper_data)
-
-        # Step 3: Write to file
-        with open(output_path, "w", encoding="utf-8") as outfile:
-            for topic, papers in topics.items():
-                filtered_papers = self._filter_papers(
-                    papers,
-                    similarity_threshold,
-                    min_length,
-                    max_length,
-                    top_n,
-                )
-
-                output_data = {"title": topic, "papers": filtered_papers}
-                json.dump(output_data, outfile, ensure_ascii=False)
-                outfile.write("\n")
-
-        logger.info(f"Processed data has been saved to {output_path}")
+        return papers
 
     def _filter_papers(
         self,
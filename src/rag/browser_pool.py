@@ -0,0 +1,175 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from typing import Callable, List, Optional
+
+from crawl4ai import AsyncWebCrawler
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CrawlerPoolStats:
+    """Timing and lifecycle counters of a CrawlerPool."""
+
+    browser_starts: int = 0
+    browser_recycles: int = 0
+    browser_crashes: int = 0
+    pages_served: int = 0
+    startup_seconds: float = 0.0
+    shutdown_seconds: float = 0.0
+    crawl_seconds: float = 0.0
+    wait_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        return (
+            f"browsers started={self.browser_starts} (startup {self.startup_seconds:.2f}s), "
+            f"recycled={self.browser_recycles}, crashed={self.browser_crashes}, "
+            f"pages={self.pages_served}, crawl={self.crawl_seconds:.2f}s, "
+            f"wait={self.wait_seconds:.2f}s, shutdown={self.shutdown_seconds:.2f}s"
+        )
+
+
+class _PooledCrawler:
+    """A pool slot holding one (possibly not yet started) browser."""
+
+    def __init__(self, slot_id: int):
+        self.slot_id = slot_id
+        self.crawler: Optional[AsyncWebCrawler] = None
+        self.pages = 0
+
+
+class CrawlerPool:
+    """
+    A fixed-size pool of long-lived AsyncWebCrawler browsers.
+
+    Browsers are started once and handed out to crawl consumers through `acquire()`.
+    A browser is recycled (closed and lazily restarted) after serving
+    `max_pages_per_browser` pages, or immediately when a crawl raises inside it.
+    """
+
+    def __init__(
+        self,
+        size: int = 10,
+        max_pages_per_browser: int = 50,
+        crawler_factory: Callable[[], AsyncWebCrawler] = AsyncWebCrawler,
+    ):
+        """
+        Initialize the CrawlerPool.
+
+        Args:
+            size (int): Number of browsers kept in the pool
+            max_pages_per_browser (int): Pages served by one browser before it is recycled
+            crawler_factory (Callable): Factory creating a new, not yet started crawler
+        """
+        if size <= 0:
+            raise ValueError(f"size must be a positive integer, got {size}")
+        self.size = size
+        self.max_pages_per_browser = max_pages_per_browser
+        self.crawler_factory = crawler_factory
+        self.stats = CrawlerPoolStats()
+
+        self._slots: List[_PooledCrawler] = [_PooledCrawler(i) for i in range(size)]
+        self._idle: Optional[asyncio.Queue] = None
+        self._closed = False
+
+    async def start(self, prestart: bool = True):
+        """
+        Start every browser of the pool concurrently.
+
+        Args:
+            prestart (bool): When False, browsers are only started on their first acquire,
+                so a run that never needs a browser never pays the startup cost
+        """
+        self._idle = asyncio.Queue()
+        self._closed = False
+        if not prestart:
+            for slot in self._slots:
+                self._idle.put_nowait(slot)
+            return
+        outcomes = await asyncio.gather(
+            *(self._start_slot(slot) for slot in self._slots), return_exceptions=True
+        )
+        for slot, outcome in zip(self._slots, outcomes):
+            if isinstance(outcome, Exception):
+                # The slot stays empty and is started lazily on first acquire
+                logger.warning(f"Failed to start browser {slot.slot_id}: {outcome}")
+            self._idle.put_nowait(slot)
+        logger.info(f"Crawler pool started: {self.stats.summary()}")
+
+    async def close(self):
+        """Close every browser of the pool."""
+        self._closed = True
+        await asyncio.gather(*(self._close_slot(slot) for slot in self._slots))
+        logger.info(f"Crawler pool closed: {self.stats.summary()}")
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        Borrow a started browser from the pool.
+
+        Yields:
+            AsyncWebCrawler: A ready to use crawler, returned to the pool on exit
+        """
+        if self._idle is None or self._closed:
+            raise RuntimeError("CrawlerPool is not started")
+
+        wait_start = time.perf_counter()
+        slot = await self._idle.get()
+        self.stats.wait_seconds += time.perf_counter() - wait_start
+        try:
+            if slot.crawler is None:
+                await self._start_slot(slot)
+
+            crawl_start = time.perf_counter()
+            try:
+                yield slot.crawler
+            except BaseException:
+                self.stats.browser_crashes += 1
+                logger.warning(f"Browser {slot.slot_id} failed during crawl, recycling it")
+                await self._close_slot(slot)
+                raise
+            finally:
+                self.stats.crawl_seconds += time.perf_counter() - crawl_start
+
+            slot.pages += 1
+            self.stats.pages_served += 1
+            if slot.pages >= self.max_pages_per_browser:
+                self.stats.browser_recycles += 1
+                logger.debug(f"Browser {slot.slot_id} served {slot.pages} pages, recycling it")
+                await self._close_slot(slot)
+        finally:
+            self._idle.put_nowait(slot)
+
+    async def _start_slot(self, slot: _PooledCrawler):
+        start = time.perf_counter()
+        crawler = self.crawler_factory()
+        await crawler.start()
+        slot.crawler = crawler
+        slot.pages = 0
+        self.stats.browser_starts += 1
+        self.stats.startup_seconds += time.perf_counter() - start
+
+    async def _close_slot(self, slot: _PooledCrawler):
+        crawler, slot.crawler, slot.pages = slot.crawler, None, 0
+        if crawler is None:
+            return
+        start = time.perf_counter()
+        try:
+            await crawler.close()
+        except Exception as e:
+            logger.warning(f"Failed to close browser {slot.slot_id}: {e}")
+        finally:
+            self.stats.shutdown_seconds += time.perf_counter() - start
@@ -0,0 +1,128 @@
+import re
+from typing import List, Optional
+
+import tiktoken
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _ApproximateEncoding:
+    """
+    Offline stand-in for a tiktoken encoding, used when the BPE files cannot be loaded.
+    Pieces of up to 4 characters (with their leading whitespace) count as one token,
+    which roughly matches the average token length of English text.
+    """
+
+    _PIECE = re.compile(r"\s*\S{1,4}|\s+")
+
+    def encode(self, text: str, disallowed_special=()) -> List[str]:
+        return self._PIECE.findall(text)
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+
+class TokenChunker:
+    """
+    Token-aware measuring and splitting of text with tiktoken.
+    """
+
+    DEFAULT_ENCODING = "cl100k_base"
+
+    def __init__(self, model: Optional[str] = None, encoding_name: str = DEFAULT_ENCODING):
+        """
+        Args:
+            model (str, optional): Model whose tokenizer should be used when tiktoken knows it
+            encoding_name (str): Fallback encoding for models unknown to tiktoken
+        """
+        encoding = None
+        if model:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                logger.debug(f"No tiktoken encoding for model {model}, using {encoding_name}")
+            except Exception as e:
+                logger.debug(f"Failed to load tiktoken encoding for model {model}: {e}")
+        if encoding is None:
+            try:
+                encoding = tiktoken.get_encoding(encoding_name)
+            except Exception as e:
+                # tiktoken downloads its BPE files on first use, which fails offline
+                logger.warning(f"Failed to load tiktoken encoding {encoding_name}, counting tokens approximately: {e}")
+                encoding = _ApproximateEncoding()
+        self.encoding = encoding
+        self._line_break_tokens = {}
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def split(self, text: str, chunk_tokens: int, overlap_tokens: int = 0) -> List[str]:
+        """
+        Split text into windows of at most `chunk_tokens` tokens, where consecutive windows
+        share `overlap_tokens` tokens. Window ends are moved back to the last line break
+        when one exists in the second half of the window, to avoid cutting lines in half.
+
+        Returns:
+            List[str]: Chunks in document order, a single chunk when the text already fits
+        """
+        if chunk_tokens <= overlap_tokens:
+            raise ValueError("chunk_tokens must be larger than overlap_tokens")
+
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= chunk_tokens:
+            return [text]
+
+        chunks = []
+        start = 0
+        while start < len(tokens):
+            end = min(start + chunk_tokens, len(tokens))
+            if end < len(tokens):
+                end = self._snap_to_line_break(tokens, start, end)
+            chunks.append(self.encoding.decode(tokens[start:end]))
+            if end >= len(tokens):
+                break
+            overlap_start = max(end - overlap_tokens, start + 1)
+            start = self._first_line_break(tokens, overlap_start, end) or overlap_start
+        return chunks
+
+    def _snap_to_line_break(self, tokens: List[int], start: int, end: int) -> int:
+        lower = start + (end - start) // 2
+        for i in range(end - 1, lower, -1):
+            offset = self._line_break_offset(tokens[i])
+            if offset is not None:
+                return i + offset
+        return end
+
+    def _first_line_break(self, tokens: List[int], start: int, end: int) -> Optional[int]:
+        for i in range(start, end):
+            offset = self._line_break_offset(tokens[i])
+            if offset is not None and start < i + offset < end:
+                return i + offset
+        return None
+
+    def _line_break_offset(self, token) -> Optional[int]:
+        # Cut after a token ending a line, or before a token starting a new one
+        if token not in self._line_break_tokens:
+            piece = self.encoding.decode([token])
+            self._line_break_tokens[token] = (
+                1 if piece.endswith("\n") else 0 if "\n" in piece else None
+            )
+        return self._line_break_tokens[token]
+
+
+def stitch_chunks(parts: List[str], max_overlap_lines: int = 50) -> str:
+    """
+    Join the refined text of overlapping chunks, dropping the lines at the start of a part
+    that repeat the end of the previous part.
+    """
+    lines: List[str] = []
+    for part in parts:
+        part_lines = part.strip().splitlines()
+        overlap = 0
+        for size in range(min(max_overlap_lines, len(lines), len(part_lines)), 0, -1):
+            if [l.strip() for l in lines[-size:]] == [l.strip() for l in part_lines[:size]]:
+                overlap = size
+                break
+        lines.extend(part_lines[overlap:])
+    return "\n".join(lines).strip()
@@ -14,15 +14,21 @@ class SearchEngineType(Enum):
 class BaseEngineConfig:
     """基础搜索引擎配置类"""
     max_results: int = 10
-    timeout: int = 30  
+    timeout: int = 30  # 单次HTTP请求的超时时间(秒)
+    search_timeout: float = 300.0  # 一次搜索(包括所有分页请求)的总时间预算(秒), CompositeSearchEngine按它等待各引擎
     api_key: Optional[str] = None
+    cache_ttl: Optional[float] = 24 * 3600  # 搜索结果缓存的有效期(秒), None表示永不过期
 
 
 @dataclass
 class ArxivConfig(BaseEngineConfig):
     """Arxiv搜索引擎特定配置"""
-    base_url: str = "http://export.arxiv.org/api/query"
+    base_url: str = "https://export.arxiv.org/api/query"
     sort_by: Optional[str] = None
+    page_size: int = 100  # 每次API请求返回的结果数
+    delay_seconds: float = 3.0  # 相邻两次API请求的最小间隔, arXiv要求不低于3秒
+    num_retries: int = 3  # 单页请求失败后的重试次数
+    id_batch_size: int = 100  # 按id批量查询时每次请求包含的id数量
 
 
 @dataclass
@@ -32,6 +38,10 @@ class GoogleScholarConfig(BaseEngineConfig):
     hl: str = "en"
     as_sdt: str = "0,5"
     as_vis: str = "1"
+    max_concurrent_pages: int = 5  # 并发请求的最大页数
+    requests_per_second: float = 5.0  # 进程内所有实例共享的令牌桶速率
+    burst: int = 5  # 令牌桶容量
+    cache_ttl: Optional[float] = 7 * 24 * 3600  # 按次计费, 结果缓存更久
     
   
 @dataclass
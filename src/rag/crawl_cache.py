@@ -0,0 +1,142 @@
+import hashlib
+import time
+from enum import Enum
+from typing import Iterable, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.utils.sqlite_store import SQLiteDatabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that never change the content of a page
+_TRACKING_PARAMS = {"fbclid", "gclid", "ref", "ref_src"}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class CrawlCacheMode(Enum):
+    """How AsyncCrawler uses the crawl cache during a run"""
+    READ_WRITE = "read_write"  # serve fresh hits, store new fetches
+    READ_ONLY = "read_only"  # serve fresh hits, never store
+    REFRESH = "refresh"  # ignore stored pages, store new fetches
+    DISABLED = "disabled"
+
+    @property
+    def readable(self) -> bool:
+        return self in (CrawlCacheMode.READ_WRITE, CrawlCacheMode.READ_ONLY)
+
+    @property
+    def writable(self) -> bool:
+        return self in (CrawlCacheMode.READ_WRITE, CrawlCacheMode.REFRESH)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL into a cache key.
+
+    The scheme and host are lowercased, http and https are treated as the same page,
+    default ports, fragments, trailing slashes and tracking parameters are dropped,
+    and the remaining query parameters are sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key not in _TRACKING_PARAMS and not key.startswith("utm_")
+        )
+    )
+    if scheme == "https":
+        scheme = "http"
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class CrawlCache:
+    """
+    Persistent cache of crawled raw markdown, keyed by normalized URL.
+
+    Every entry keeps the fetch timestamp and a sha256 of the content. Entries older than
+    `max_age` seconds are stale and treated as misses. SQLite runs in WAL mode, so the
+    cache file can be shared by concurrent crawls.
+    """
+
+    def __init__(self, path: str = ".cache/crawl_cache.sqlite", max_age: Optional[float] = 7 * 24 * 3600):
+        """
+        Args:
+            path (str): SQLite file path
+            max_age (float, optional): Maximum age of a usable entry in seconds, None means never stale
+        """
+        self.path = path
+        self.max_age = max_age
+        self._db = SQLiteDatabase(path)
+
+        with self._db.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    url_key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    raw_markdown TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get(self, url: str, max_age: Optional[float] = None) -> Optional[str]:
+        """
+        Return the cached raw markdown of `url`, or None when missing or stale.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        row = self._db.connect().execute(
+            "SELECT raw_markdown, fetched_at FROM pages WHERE url_key = ?",
+            (normalize_url(url),),
+        ).fetchone()
+        if row is None:
+            return None
+        if max_age is not None and time.time() - row[1] > max_age:
+            logger.debug(f"Stale crawl cache entry for URL={url}")
+            return None
+        return row[0]
+
+    def contains(self, url: str, max_age: Optional[float] = None) -> bool:
+        """
+        Whether `get` would return a page for `url`, without loading it.
+        """
+        return url in self.fresh_urls([url], max_age)
+
+    def fresh_urls(self, urls: Iterable[str], max_age: Optional[float] = None) -> Set[str]:
+        """
+        The URLs of `urls` for which `get` would return a page, without loading the pages.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        now = time.time()
+        conn = self._db.connect()
+        fresh = set()
+        for url in urls:
+            row = conn.execute(
+                "SELECT fetched_at FROM pages WHERE url_key = ?", (normalize_url(url),)
+            ).fetchone()
+            if row is not None and (max_age is None or now - row[0] <= max_age):
+                fresh.add(url)
+        return fresh
+
+    def put(self, url: str, raw_markdown: str):
+        content_hash = hashlib.sha256(raw_markdown.encode("utf-8")).hexdigest()
+        with self._db.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (url_key, url, raw_markdown, content_hash, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (normalize_url(url), url, raw_markdown, content_hash, time.time()),
+            )
+
+    def content_hash(self, url: str) -> Optional[str]:
+        row = self._db.connect().execute(
+            "SELECT content_hash FROM pages WHERE url_key = ?", (normalize_url(url),)
+        ).fetchone()
+        return row[0] if row else None
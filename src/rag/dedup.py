@@ -0,0 +1,222 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SHIFT = np.uint64(32)
+_SHINGLE_BASE = np.uint64(1000003)
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = 5) -> np.ndarray:
+    """
+    Hash the word `size`-grams of a text into unique 64-bit integers.
+    Texts shorter than `size` words yield a single shingle of all their words.
+    """
+    words = _WORD.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    word_hashes = np.fromiter(
+        (zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64, count=len(words)
+    )
+    size = min(size, len(words))
+    count = len(words) - size + 1
+    # Polynomial rolling hash of consecutive word hashes, computed for all windows at once
+    hashed = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(size):
+            hashed = hashed * _SHINGLE_BASE + word_hashes[offset:offset + count]
+    return np.unique(hashed)
+
+
+class MinHasher:
+    """MinHash signatures over multiply-shift hash permutations ((a * x + b) mod 2^64) >> 32."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        # Multipliers must be odd for the multiply-shift family
+        self._a = rng.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+        self._b = rng.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: uint64 signature of length num_perm, all values are _MAX_HASH for empty texts
+        """
+        values = shingles(text, self.shingle_size)
+        if values.size == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            hashed = (np.outer(values, self._a) + self._b) >> _SHIFT
+        return hashed.min(axis=0)
+
+    @staticmethod
+    def jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """Estimate Jaccard similarity from two signatures."""
+        return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Choose (bands, rows) with bands * rows <= num_perm whose LSH S-curve
+    1 - (1 - s^rows)^bands crosses 0.5 closest to `threshold`.
+    """
+    best, best_error = (1, num_perm), float("inf")
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        midpoint = (1 - 0.5 ** (1 / bands)) ** (1 / rows)
+        error = abs(midpoint - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class LSHIndex:
+    """Banded LSH index over MinHash signatures."""
+
+    def __init__(self, num_perm: int = 128, threshold: float = 0.8):
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [defaultdict(list) for _ in range(self.bands)]
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def insert(self, key: Hashable, signature: np.ndarray):
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band][band_key].append(key)
+
+    def query(self, signature: np.ndarray) -> Set[Hashable]:
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(band_key, ()))
+        return candidates
+
+
+class NearDuplicateDetector:
+    """
+    Clusters near-duplicate texts whose estimated Jaccard similarity reaches `threshold`.
+
+    Texts are shingled into word k-grams and summarized by MinHash signatures. LSH banding
+    means a text is only compared with the few texts sharing one of its bands, so clustering
+    stays sub-quadratic.
+
+    `cluster` groups a whole corpus at once. `add` is the online variant used by streaming
+    pipelines: every text is compared with the clusters seen so far, and the cluster keeps
+    the representative with the highest quality.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size, seed=seed)
+        self.index = LSHIndex(num_perm=num_perm, threshold=threshold)
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self._cluster_of: Dict[Hashable, Hashable] = {}
+        self._representative: Dict[Hashable, Tuple[Hashable, float]] = {}
+
+    def signature(self, text: str) -> np.ndarray:
+        return self.hasher.signature(text)
+
+    def find_duplicate(self, signature: np.ndarray) -> Optional[Hashable]:
+        """Return the key of the most similar indexed text above the threshold, if any."""
+        best_key, best_score = None, self.threshold
+        for key in self.index.query(signature):
+            score = MinHasher.jaccard(signature, self._signatures[key])
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def add(
+        self,
+        key: Hashable,
+        text: Optional[str] = None,
+        quality: float = 0.0,
+        signature: Optional[np.ndarray] = None,
+    ) -> Tuple[Optional[Hashable], Optional[Hashable]]:
+        """
+        Add a text to the index and resolve its cluster.
+
+        Args:
+            key: Unique identifier of the text
+            text: Text to add, may be omitted when `signature` is given
+            quality: Representative quality, the highest quality text of a cluster wins
+            signature: Precomputed MinHash signature of the text
+
+        Returns:
+            (duplicate_of, superseded): `duplicate_of` is the representative that beats this text,
+            or None when this text is kept. `superseded` is the previous representative that this
+            text replaces, or None.
+        """
+        if signature is None:
+            signature = self.signature(text)
+        match = self.find_duplicate(signature)
+
+        self._signatures[key] = signature
+        self.index.insert(key, signature)
+
+        if match is None:
+            self._cluster_of[key] = key
+            self._representative[key] = (key, quality)
+            return None, None
+
+        cluster = self._cluster_of[match]
+        self._cluster_of[key] = cluster
+        representative, best_quality = self._representative[cluster]
+        if quality > best_quality:
+            self._representative[cluster] = (key, quality)
+            return None, representative
+        return representative, None
+
+    def cluster(self, texts: Sequence[str]) -> List[List[int]]:
+        """
+        Group a corpus into clusters of near-duplicates with union-find over LSH candidates.
+
+        Returns:
+            List of clusters, each a sorted list of text indices
+        """
+        signatures = [self.signature(text) for text in texts]
+        index = LSHIndex(num_perm=self.hasher.num_perm, threshold=self.threshold)
+        parent = list(range(len(texts)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, signature in enumerate(signatures):
+            for j in index.query(signature):
+                if MinHasher.jaccard(signature, signatures[j]) >= self.threshold:
+                    parent[find(i)] = find(j)
+            index.insert(i, signature)
+
+        clusters: Dict[int, List[int]] = defaultdict(list)
+        for i in range(len(texts)):
+            clusters[find(i)].append(i)
+        return list(clusters.values())
+
+
+def select_representatives(
+    items: Sequence[Any],
+    text: Callable[[Any], str],
+    quality: Callable[[Any], float],
+    threshold: float = 0.8,
+    num_perm: int = 128,
+) -> Tuple[List[Any], int]:
+    """
+    Keep the highest quality item of every near-duplicate cluster.
+
+    Returns:
+        (kept items in input order, number of dropped duplicates)
+    """
+    detector = NearDuplicateDetector(threshold=threshold, num_perm=num_perm)
+    keep = set()
+    for cluster in detector.cluster([text(item) for item in items]):
+        keep.add(max(cluster, key=lambda i: quality(items[i])))
+    kept = [item for i, item in enumerate(items) if i in keep]
+    return kept, len(items) - len(kept)
@@ -0,0 +1,405 @@
+import json
+import math
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import logging
+
+from src.rag.chunking import TokenChunker
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("auto", "flat", "hnsw", "ivf")
+
+
+def build_index(
+    kind: str,
+    dim: int,
+    training_vectors: Optional[np.ndarray] = None,
+    hnsw_m: int = 32,
+    ef_construction: int = 80,
+    nlist: Optional[int] = None,
+):
+    """
+    Create an empty inner-product FAISS index of the given kind.
+
+    Args:
+        kind: "flat" for exact search, "hnsw" or "ivf" for approximate search
+        dim: Vector dimension
+        training_vectors: Sample used to train the IVF coarse quantizer, required for "ivf"
+        hnsw_m: Neighbours per node of the HNSW graph
+        ef_construction: Candidate list size while building the HNSW graph
+        nlist: Number of IVF cells, defaults to 4 * sqrt(len(training_vectors))
+    """
+    import faiss
+
+    if kind == "flat":
+        return faiss.IndexFlatIP(dim)
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = ef_construction
+        return index
+    if kind == "ivf":
+        if training_vectors is None or len(training_vectors) == 0:
+            raise ValueError("An IVF index needs training vectors")
+        nlist = nlist or max(1, int(4 * math.sqrt(len(training_vectors))))
+        nlist = min(nlist, len(training_vectors))
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(np.ascontiguousarray(training_vectors, dtype=np.float32))
+        return index
+    raise ValueError(f"Unknown index type {kind}, expected one of {INDEX_TYPES}")
+
+
+def search_parameters(index, ids: Optional[np.ndarray] = None, nprobe: int = 16, ef_search: int = 128):
+    """
+    Search parameters of an index, restricted to the given vector ids when provided.
+    """
+    import faiss
+
+    selector = faiss.IDSelectorBatch(ids) if ids is not None else None
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+    return faiss.SearchParameters(sel=selector)
+
+
+class DocumentStore:
+    """
+    Persistent chunk-level vector store over the papers written by AsyncCrawler.
+
+    Every paper `txt` is split into overlapping token windows with TokenChunker, and each
+    chunk is embedded together with the paper title. Chunks are stored in a directory:
+
+        vectors.h5     L2-normalized float32 embeddings, row i is chunk i
+        chunks.jsonl   metadata and text of chunk i on line i
+        index.faiss    inner-product FAISS index whose ids are the row numbers
+
+    The HDF5 file is the source of truth: the index is saved on `save`/`close` and, if it is
+    missing or behind after a crash, caught up from the stored vectors on open instead of
+    re-embedding anything. Additions append to all three, so the store grows without
+    rebuilding. With `index_type="auto"` the index is exact (flat) up to `flat_max` chunks and
+    migrated to IVF beyond that, which trains its coarse quantizer on the vectors present at
+    migration time and then keeps adding to the trained cells. Once the store has grown so much
+    that it would get IVF_REBALANCE_FACTOR times as many cells, the IVF index is retrained on the
+    current vectors, so the cells do not keep filling up; with 4 * sqrt(n) cells this happens
+    each time the store quadruples. "hnsw" needs no training but reaches a lower recall at the
+    same latency in scripts/benchmark_document_store.py.
+    """
+
+    VECTORS_FILE = "vectors.h5"
+    CHUNKS_FILE = "chunks.jsonl"
+    INDEX_FILE = "index.faiss"
+    IVF_TRAINING_SAMPLE = 100000
+    IVF_REBALANCE_FACTOR = 2
+
+    def __init__(
+        self,
+        directory: str,
+        embedder=None,
+        chunk_tokens: int = 256,
+        overlap_tokens: int = 32,
+        index_type: str = "auto",
+        flat_max: int = 50000,
+        embed_batch_size: int = 256,
+        nprobe: int = 16,
+        ef_search: int = 128,
+    ):
+        """
+        Args:
+            directory (str): Store directory, created when missing
+            embedder: Object whose `embed(texts)` returns L2-normalized float32 vectors,
+                defaults to the sentence-transformers model of EmbeddingRelevanceScorer
+            chunk_tokens (int): Maximum tokens per chunk
+            overlap_tokens (int): Tokens shared by consecutive chunks of a paper
+            index_type (str): One of "auto", "flat", "hnsw" or "ivf"
+            flat_max (int): Number of chunks above which "auto" switches from flat to IVF
+            embed_batch_size (int): Number of chunks embedded and written at once
+            nprobe (int): IVF cells visited per query
+            ef_search (int): HNSW candidate list size per query
+        """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {index_type}, expected one of {INDEX_TYPES}")
+        if embedder is None:
+            from src.rag.relevance import EmbeddingRelevanceScorer
+
+            embedder = EmbeddingRelevanceScorer(batch_size=64)
+        self.directory = directory
+        self.embedder = embedder
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.index_type = index_type
+        self.flat_max = flat_max
+        self.embed_batch_size = embed_batch_size
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.chunker = TokenChunker()
+
+        self.index = None
+        self.dim: Optional[int] = None
+        self._lock = threading.RLock()
+        self._offsets: List[int] = []
+        self._topic_ids: Dict[str, List[int]] = {}
+        self._documents: Set[Tuple[str, str]] = set()
+        self._index_dirty = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, self.VECTORS_FILE)
+        self._chunks_path = os.path.join(directory, self.CHUNKS_FILE)
+        self._index_path = os.path.join(directory, self.INDEX_FILE)
+        self._open()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        """Whether the (topic, url) paper is already stored."""
+        return key in self._documents
+
+    def add_papers(self, topic: str, papers: Iterable[dict]) -> int:
+        """
+        Chunk, embed and append papers of a topic, skipping papers already stored.
+
+        Args:
+            topic (str): Topic the papers were collected for
+            papers: Paper records with "title", "url" and "txt", as written by AsyncCrawler
+
+        Returns:
+            int: Number of chunks added
+        """
+        pending: List[dict] = []
+        seen: Set[Tuple[str, str]] = set()
+        added = 0
+        with self._lock:
+            for paper in papers:
+                key = (topic, paper.get("url", ""))
+                if key in self._documents or key in seen or not paper.get("txt"):
+                    continue
+                seen.add(key)
+                chunks = self.chunker.split(paper["txt"], self.chunk_tokens, self.overlap_tokens)
+                for number, text in enumerate(chunks):
+                    pending.append({
+                        "topic": topic,
+                        "url": paper.get("url", ""),
+                        "title": paper.get("title", ""),
+                        "similarity": paper.get("similarity"),
+                        "chunk": number,
+                        "text": text,
+                    })
+                if len(pending) >= self.embed_batch_size:
+                    added += self._append(pending)
+                    pending = []
+            if pending:
+                added += self._append(pending)
+        return added
+
+    def add_jsonl(self, path: str) -> int:
+        """
+        Add every topic of a crawl output file, one JSON object with "title" and "papers" per line.
+
+        Returns:
+            int: Number of chunks added
+        """
+        added = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                added += self.add_papers(record["title"], record.get("papers", []))
+        self.save()
+        logger.info(f"Indexed {added} new chunks from {path}, {len(self)} chunks in store")
+        return added
+
+    def search(self, query: str, k: int = 5, topic: Optional[str] = None) -> List[dict]:
+        """
+        Top-k chunks for a query.
+
+        Args:
+            query (str): Query text
+            k (int): Number of chunks to return
+            topic (str, optional): Only return chunks of papers collected for this topic
+
+        Returns:
+            List[dict]: Chunk metadata and text with its cosine "score", best first
+        """
+        return self.search_batch([query], k, topic)[0]
+
+    def search_batch(self, queries: List[str], k: int = 5, topic: Optional[str] = None) -> List[List[dict]]:
+        """Batched `search`, embedding all queries at once."""
+        if not queries:
+            return []
+        vectors = np.asarray(self.embedder.embed(list(queries)), dtype=np.float32)
+        with self._lock:
+            if self.index is None or self.index.ntotal == 0:
+                return [[] for _ in queries]
+            ids = None
+            if topic is not None:
+                topic_ids = self._topic_ids.get(topic)
+                if not topic_ids:
+                    return [[] for _ in queries]
+                ids = np.asarray(topic_ids, dtype=np.int64)
+            params = search_parameters(self.index, ids, self.nprobe, self.ef_search)
+            scores, rows = self.index.search(vectors, k, params=params)
+            return [
+                [
+                    dict(self._read_chunk(int(row)), score=float(score))
+                    for score, row in zip(query_scores, query_rows)
+                    if row >= 0
+                ]
+                for query_scores, query_rows in zip(scores, rows)
+            ]
+
+    def save(self):
+        """Write the FAISS index next to the vectors when it changed."""
+        import faiss
+
+        with self._lock:
+            if self.index is None or not self._index_dirty:
+                return
+            faiss.write_index(self.index, self._index_path + ".tmp")
+            os.replace(self._index_path + ".tmp", self._index_path)
+            self._index_dirty = False
+
+    def close(self):
+        with self._lock:
+            self.save()
+            self._chunks_file.close()
+            self._vectors_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open(self):
+        import faiss
+        import h5py
+
+        self._vectors_file = h5py.File(self._vectors_path, "a")
+        vectors = self._vectors_file.get("vectors")
+        if vectors is not None:
+            self.dim = vectors.shape[1]
+
+        # 元数据和向量分两次写入, 崩溃后以两者中较短的一方为准
+        valid_end = 0
+        if os.path.exists(self._chunks_path):
+            with open(self._chunks_path, "rb") as f:
+                offset = 0
+                for line in f:
+                    if not line.endswith(b"\n") or (vectors is not None and len(self._offsets) >= len(vectors)):
+                        break
+                    try:
+                        chunk = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    row = len(self._offsets)
+                    self._offsets.append(offset)
+                    self._topic_ids.setdefault(chunk["topic"], []).append(row)
+                    self._documents.add((chunk["topic"], chunk["url"]))
+                    offset += len(line)
+                valid_end = offset
+            if vectors is None:
+                self._offsets, self._topic_ids, self._documents, valid_end = [], {}, set(), 0
+        self._chunks_file = open(self._chunks_path, "ab+")
+        self._chunks_file.truncate(valid_end)
+        if vectors is not None and len(vectors) > len(self._offsets):
+            vectors.resize(len(self._offsets), axis=0)
+
+        if os.path.exists(self._index_path):
+            index = faiss.read_index(self._index_path)
+            if index.ntotal <= len(self) and (self.dim is None or index.d == self.dim):
+                self.index = index
+            else:
+                logger.warning(f"FAISS index {self._index_path} does not match the stored vectors, rebuilding it")
+        if self.index is None and len(self) > 0:
+            self._rebuild_index(self._target_index_type(len(self)))
+        elif self.index is not None and self.index.ntotal < len(self):
+            logger.info(f"Catching up FAISS index with {len(self) - self.index.ntotal} stored vectors")
+            self._add_stored_vectors(self.index.ntotal)
+        logger.info(f"Opened document store {self.directory} with {len(self)} chunks")
+
+    def _append(self, chunks: List[dict]) -> int:
+        embedded = [f"{chunk['title']}\n{chunk['text']}" for chunk in chunks]
+        vectors = np.asarray(self.embedder.embed(embedded), dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the store dimension {self.dim}")
+
+        start = len(self)
+        offset = self._chunks_file.seek(0, os.SEEK_END)
+        for row, chunk in enumerate(chunks, start):
+            line = (json.dumps(chunk, ensure_ascii=False) + "\n").encode("utf-8")
+            self._chunks_file.write(line)
+            self._offsets.append(offset)
+            self._topic_ids.setdefault(chunk["topic"], []).append(row)
+            self._documents.add((chunk["topic"], chunk["url"]))
+            offset += len(line)
+        self._chunks_file.flush()
+
+        dataset = self._vectors_file.get("vectors")
+        if dataset is None:
+            dataset = self._vectors_file.create_dataset(
+                "vectors", shape=(0, self.dim), maxshape=(None, self.dim),
+                dtype="float32", chunks=(min(1024, max(len(vectors), 1)), self.dim),
+            )
+        dataset.resize(start + len(vectors), axis=0)
+        dataset[start:] = vectors
+        self._vectors_file.flush()
+
+        target = self._target_index_type(len(self))
+        if self.index is None or (self.index_type == "auto" and target != self._index_kind()) or self._ivf_outgrown():
+            self._rebuild_index(target)
+        else:
+            self.index.add(vectors)
+            self._index_dirty = True
+        return len(chunks)
+
+    def _target_index_type(self, size: int) -> str:
+        if self.index_type == "auto":
+            return "flat" if size <= self.flat_max else "ivf"
+        return self.index_type
+
+    def _index_kind(self) -> str:
+        import faiss
+
+        if isinstance(self.index, faiss.IndexIVF):
+            return "ivf"
+        if isinstance(self.index, faiss.IndexHNSW):
+            return "hnsw"
+        return "flat"
+
+    def _ivf_outgrown(self) -> bool:
+        """Whether the IVF index was trained on so few vectors that it should be retrained."""
+        import faiss
+
+        if not isinstance(self.index, faiss.IndexIVF):
+            return False
+        wanted = max(1, int(4 * math.sqrt(min(len(self), self.IVF_TRAINING_SAMPLE))))
+        return wanted >= self.IVF_REBALANCE_FACTOR * self.index.nlist
+
+    def _rebuild_index(self, kind: str):
+        dataset = self._vectors_file["vectors"]
+        training = None
+        if kind == "ivf":
+            # 训练样本上限避免把整个向量文件读入内存
+            sample = min(len(dataset), self.IVF_TRAINING_SAMPLE)
+            training = dataset[:sample]
+        logger.info(f"Building {kind} FAISS index over {len(dataset)} chunks")
+        self.index = build_index(kind, self.dim, training)
+        self._add_stored_vectors(0)
+
+    def _add_stored_vectors(self, start: int, block: int = 65536):
+        dataset = self._vectors_file["vectors"]
+        for begin in range(start, len(self), block):
+            self.index.add(np.ascontiguousarray(dataset[begin:min(begin + block, len(self))]))
+        self._index_dirty = True
+
+    def _read_chunk(self, row: int) -> dict:
+        self._chunks_file.seek(self._offsets[row])
+        return json.loads(self._chunks_file.readline())
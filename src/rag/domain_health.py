@@ -0,0 +1,295 @@
+import asyncio
+import json
+import math
+import sqlite3
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Deque, Dict, List, Optional, Set
+
+from src.rag.host_scheduler import url_host
+from src.utils.sqlite_store import SQLiteDatabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DomainCircuitOpen(Exception):
+    """The circuit breaker of the domain is open, the URL is skipped without being crawled."""
+
+    def __init__(self, url: str, retry_in: float):
+        super().__init__(f"Domain {url_host(url)} keeps failing, skipped for another {retry_in:.0f}s")
+        self.url = url
+        self.retry_in = retry_in
+
+
+@dataclass
+class DomainHealthStats:
+    """Worker time saved by a DomainHealth during a run."""
+
+    skipped: int = 0
+    skipped_seconds: float = 0.0  # estimated cost of the skipped crawls
+    timeouts: int = 0
+    timeout_seconds_saved: float = 0.0  # adaptive timeouts against the fixed `max_timeout`
+    circuits_opened: int = 0
+
+    @property
+    def seconds_saved(self) -> float:
+        return self.skipped_seconds + self.timeout_seconds_saved
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        return (
+            f"worker time saved={self.seconds_saved:.1f}s (circuit breaker skipped {self.skipped} pages, "
+            f"~{self.skipped_seconds:.1f}s; adaptive timeouts on {self.timeouts} pages, "
+            f"{self.timeout_seconds_saved:.1f}s), circuits opened={self.circuits_opened}"
+        )
+
+
+class _DomainState:
+    def __init__(self, window: int):
+        self.latencies: Deque[float] = deque(maxlen=window)  # seconds of successful renders
+        self.failure_seconds: Deque[float] = deque(maxlen=window)  # seconds spent on failed crawls
+        self.consecutive_failures = 0
+        self.open_until = 0.0  # wall-clock time until which the circuit is open
+
+
+class DomainHealth:
+    """
+    Per-domain latency and failure history of the crawler, optionally persisted in SQLite
+    so that it carries over between runs.
+
+    The page timeout of a domain is `timeout_multiplier` times the `timeout_percentile`
+    percentile of its last `window` successful render times, clamped to
+    [`min_timeout`, `max_timeout`]. Domains with fewer than `min_samples` renders get
+    `max_timeout`. After `failure_threshold` consecutive failed crawls the circuit of a domain
+    opens and its URLs are skipped for `cooldown` seconds. Afterwards a single probe crawl is
+    let through: a success closes the circuit, a failure opens it again.
+
+    Changes are persisted in batches: the changed domains are written by `flush`, or by
+    `aflush` in a worker thread, which callers run when `flush_due` or at the end of a crawl.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = ".cache/domain_health.sqlite",
+        window: int = 50,
+        min_samples: int = 5,
+        timeout_percentile: float = 95,
+        timeout_multiplier: float = 3.0,
+        min_timeout: float = 15.0,
+        max_timeout: float = 180.0,
+        failure_threshold: int = 3,
+        cooldown: float = 6 * 3600,
+        max_age: float = 30 * 24 * 3600,
+        flush_every: int = 32,
+        flush_interval: float = 10.0,
+    ):
+        """
+        Args:
+            path (str, optional): SQLite file path, None keeps the history in memory for the
+                lifetime of this object only
+            window (int): Render times and failures kept per domain
+            min_samples (int): Render times needed before the timeout adapts
+            timeout_percentile (float): Percentile of the render times the timeout is derived from
+            timeout_multiplier (float): Factor applied to that percentile
+            min_timeout (float): Shortest page timeout in seconds
+            max_timeout (float): Longest page timeout in seconds, also used for unknown domains
+            failure_threshold (int): Consecutive failures opening the circuit of a domain
+            cooldown (float): Seconds a circuit stays open before a probe crawl is let through
+            max_age (float): Persisted domains not updated for this many seconds are forgotten
+            flush_every (int): Changed domains after which `flush_due` is set
+            flush_interval (float): Seconds after the last flush after which `flush_due` is set
+        """
+        self.path = path
+        self.window = window
+        self.min_samples = min_samples
+        self.timeout_percentile = timeout_percentile
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_age = max_age
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.stats = DomainHealthStats()
+        self._domains: Dict[str, _DomainState] = {}
+        self._probing: Set[str] = set()
+        self._dirty: Set[str] = set()
+        self._flushed_at = time.monotonic()
+        self._db = SQLiteDatabase(path) if path is not None else None
+
+        if self._db is not None:
+            with self._db.connect() as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS domains (
+                        domain TEXT PRIMARY KEY,
+                        latencies TEXT NOT NULL,
+                        failure_seconds TEXT NOT NULL,
+                        consecutive_failures INTEGER NOT NULL,
+                        open_until REAL NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                    """
+                )
+            self._load()
+
+    def reset_stats(self):
+        self.stats = DomainHealthStats()
+
+    def timeout(self, url: str) -> float:
+        """Page timeout in seconds for a URL, derived from the render times of its domain."""
+        state = self._domains.get(url_host(url))
+        if state is None or len(state.latencies) < self.min_samples:
+            return self.max_timeout
+        latencies = sorted(state.latencies)
+        index = min(math.ceil(self.timeout_percentile / 100 * len(latencies)) - 1, len(latencies) - 1)
+        timeout = latencies[max(index, 0)] * self.timeout_multiplier
+        return min(max(timeout, self.min_timeout), self.max_timeout)
+
+    def check(self, url: str):
+        """
+        Raises:
+            DomainCircuitOpen: The circuit of the domain is open, or another probe is in flight
+        """
+        domain = url_host(url)
+        state = self._domains.get(domain)
+        if state is None or state.consecutive_failures < self.failure_threshold:
+            return
+        retry_in = state.open_until - time.time()
+        if retry_in <= 0 and domain not in self._probing:
+            # 半开状态: 只放行一个探测请求
+            self._probing.add(domain)
+            logger.info(f"Probing domain {domain} after its circuit breaker cooldown")
+            return
+        self.stats.skipped += 1
+        self.stats.skipped_seconds += self._failure_cost(state, url)
+        raise DomainCircuitOpen(url, max(retry_in, 0.0))
+
+    def record_render(self, url: str, seconds: float):
+        """Record the time a browser took to render a page of the domain."""
+        domain = url_host(url)
+        self._state(domain).latencies.append(seconds)
+        self._dirty.add(domain)
+
+    def record_success(self, url: str):
+        domain = url_host(url)
+        state = self._state(domain)
+        self._probing.discard(domain)
+        if state.consecutive_failures >= self.failure_threshold:
+            logger.info(f"Circuit breaker of domain {domain} closed")
+        state.consecutive_failures = 0
+        state.open_until = 0.0
+        self._dirty.add(domain)
+
+    def release(self, url: str):
+        """A crawl of the domain ended without telling whether it is healthy, e.g. it was throttled."""
+        self._probing.discard(url_host(url))
+
+    def record_failure(self, url: str, seconds: float, timed_out: bool = False):
+        """
+        Record a failed crawl of the domain that took `seconds`.
+
+        Args:
+            timed_out (bool): The crawl hit the page timeout of the domain
+        """
+        domain = url_host(url)
+        state = self._state(domain)
+        self._probing.discard(domain)
+        state.failure_seconds.append(seconds)
+        state.consecutive_failures += 1
+        if timed_out:
+            self.stats.timeouts += 1
+            self.stats.timeout_seconds_saved += max(self.max_timeout - seconds, 0.0)
+        # 熔断已打开时, 同一域名上仍在进行的请求失败不再重复计数
+        if state.consecutive_failures >= self.failure_threshold and state.open_until <= time.time():
+            state.open_until = time.time() + self.cooldown
+            self.stats.circuits_opened += 1
+            logger.warning(
+                f"Circuit breaker of domain {domain} opened after {state.consecutive_failures} consecutive "
+                f"failures, skipping it for {self.cooldown:.0f}s"
+            )
+        self._dirty.add(domain)
+
+    @property
+    def flush_due(self) -> bool:
+        """Whether enough domains changed, or enough time passed, to persist the changes."""
+        if self._db is None or not self._dirty:
+            return False
+        return len(self._dirty) >= self.flush_every or time.monotonic() - self._flushed_at >= self.flush_interval
+
+    def flush(self):
+        """Write the domains changed since the last flush to SQLite, in one transaction."""
+        self._write(self._take_dirty())
+
+    async def aflush(self):
+        """
+        `flush` with the SQLite write in a worker thread. The rows are taken on the calling
+        thread, so the history can keep changing while they are written.
+        """
+        rows = self._take_dirty()
+        if rows:
+            await asyncio.to_thread(self._write, rows)
+
+    def _failure_cost(self, state: _DomainState, url: str) -> float:
+        # 被跳过的页面按该域名失败耗时的中位数估算
+        if not state.failure_seconds:
+            return self.timeout(url)
+        return sorted(state.failure_seconds)[len(state.failure_seconds) // 2]
+
+    def _state(self, domain: str) -> _DomainState:
+        state = self._domains.get(domain)
+        if state is None:
+            state = self._domains[domain] = _DomainState(self.window)
+        return state
+
+    def _load(self):
+        rows = self._db.connect().execute(
+            "SELECT domain, latencies, failure_seconds, consecutive_failures, open_until FROM domains "
+            "WHERE updated_at >= ?",
+            (time.time() - self.max_age,),
+        ).fetchall()
+        for domain, latencies, failure_seconds, consecutive_failures, open_until in rows:
+            state = self._state(domain)
+            state.latencies.extend(json.loads(latencies))
+            state.failure_seconds.extend(json.loads(failure_seconds))
+            state.consecutive_failures = consecutive_failures
+            state.open_until = open_until
+        logger.info(f"Loaded the health history of {len(rows)} domains from {self.path}")
+
+    def _take_dirty(self) -> List[tuple]:
+        self._flushed_at = time.monotonic()
+        if self._db is None or not self._dirty:
+            self._dirty.clear()
+            return []
+        now = time.time()
+        rows = []
+        for domain in self._dirty:
+            state = self._domains[domain]
+            rows.append((
+                domain,
+                json.dumps([round(value, 3) for value in state.latencies]),
+                json.dumps([round(value, 3) for value in state.failure_seconds]),
+                state.consecutive_failures,
+                state.open_until,
+                now,
+            ))
+        self._dirty.clear()
+        return rows
+
+    def _write(self, rows: List[tuple]):
+        if not rows:
+            return
+        try:
+            with self._db.connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO domains (domain, latencies, failure_seconds, consecutive_failures, "
+                    "open_until, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to save the health of {len(rows)} domains: {e}")
@@ -0,0 +1,94 @@
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Hashable, List
+
+
+class FairQueue:
+    """
+    Bounded asyncio queue that serves its items round-robin across keys.
+
+    Items are grouped by `key(item)` (e.g. the topic of a page) and `get` takes one item from
+    each non-empty group in turn, so a group with many queued items cannot starve the others.
+    It supports the subset of the `asyncio.Queue` interface used by the AsyncCrawler pipeline.
+
+    Putting `end_marker` closes the queue instead of enqueuing it: once the queued items are
+    drained, every `get` returns the marker, which also makes re-putting it a no-op.
+    """
+
+    def __init__(self, key: Callable[[Any], Hashable], end_marker: Any, maxsize: int = 0):
+        """
+        Args:
+            key: Function mapping an item to its scheduling group
+            end_marker: Sentinel that closes the queue
+            maxsize: Maximum number of queued items, 0 means unbounded
+        """
+        self._key = key
+        self._end_marker = end_marker
+        self.maxsize = maxsize
+        self._groups: "OrderedDict[Hashable, Deque[Any]]" = OrderedDict()
+        self._size = 0
+        self._closed = False
+        self._getters: List[asyncio.Future] = []
+        self._putters: List[asyncio.Future] = []
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0 and not self._closed
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= self._size
+
+    async def put(self, item: Any):
+        while item is not self._end_marker and self.full():
+            await self._wait(self._putters)
+        self.put_nowait(item)
+
+    def put_nowait(self, item: Any):
+        if item is self._end_marker:
+            self._closed = True
+            self._wake(self._getters)
+            return
+        if self.full():
+            raise asyncio.QueueFull
+        self._groups.setdefault(self._key(item), deque()).append(item)
+        self._size += 1
+        self._wake(self._getters)
+
+    async def get(self) -> Any:
+        while self._size == 0 and not self._closed:
+            await self._wait(self._getters)
+        return self.get_nowait()
+
+    def get_nowait(self) -> Any:
+        if self._size == 0:
+            if self._closed:
+                return self._end_marker
+            raise asyncio.QueueEmpty
+        key, group = next(iter(self._groups.items()))
+        item = group.popleft()
+        # The served group moves to the back of the rotation
+        del self._groups[key]
+        if group:
+            self._groups[key] = group
+        self._size -= 1
+        self._wake(self._putters)
+        return item
+
+    async def _wait(self, waiters: List[asyncio.Future]):
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await waiter
+        finally:
+            if waiter in waiters:
+                waiters.remove(waiter)
+
+    @staticmethod
+    def _wake(waiters: List[asyncio.Future]):
+        # Waiters re-check the queue state, so waking all of them is always safe
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        waiters.clear()
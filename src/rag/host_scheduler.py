@@ -0,0 +1,296 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, asdict
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+from urllib.parse import urlsplit
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 表示站点在限流或封禁爬虫的HTTP状态码
+THROTTLE_STATUS = {403, 429}
+
+
+def url_host(url: str) -> str:
+    """Scheduling key of a URL: its lowercase host and port, without credentials."""
+    return urlsplit(url).netloc.rsplit("@", 1)[-1].lower()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds requested by a `Retry-After` header, which may be seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class HostThrottled(Exception):
+    """A host answered with a throttling status (429 or 403)."""
+
+    def __init__(self, url: str, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"Host {url_host(url)} throttled with status {status}")
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+
+@dataclass
+class HostSchedulerStats:
+    """Counters of a HostScheduler."""
+
+    hosts: int = 0
+    local: int = 0  # items served without a request to their host
+    dispatched: int = 0
+    throttled: int = 0
+    requeued: int = 0
+    gave_up: int = 0
+    parked_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        return (
+            f"hosts={self.hosts}, local={self.local}, dispatched={self.dispatched}, throttled={self.throttled}, "
+            f"requeued={self.requeued}, gave up={self.gave_up}, parked={self.parked_seconds:.1f}s"
+        )
+
+
+class _Host:
+    """Queue and politeness state of one host."""
+
+    def __init__(self, limit: int):
+        self.items: Deque[Any] = deque()
+        self.limit = limit
+        self.in_flight = 0
+        self.ready_at = 0.0  # earliest time of the next request, by spacing or parking
+        self.strikes = 0  # consecutive throttled responses
+
+
+class HostScheduler:
+    """
+    Crawl queue that keeps one FIFO per host and dispatches URLs round-robin across hosts.
+
+    A host is only served while it has fewer than `per_host_concurrency` requests in flight
+    and at least `min_interval` seconds have passed since its previous request, so a URL list
+    dominated by one publisher keeps the other hosts busy instead of hammering that publisher.
+    A host answering 429 or 403 is parked for its `Retry-After` delay or an exponential
+    backoff, its concurrency is halved (and grows back by one per success), and the throttled
+    URL is requeued at the head of the host's queue up to `max_retries` times.
+
+    Items that make no request to their host, such as crawl cache hits, are queued with
+    `put_local` and served first, without per-host limits or spacing.
+
+    It supports the subset of the `asyncio.Queue` interface used by the AsyncCrawler pipeline.
+    Every item returned by `get` must be handed back through `release`. Putting `end_marker`
+    closes the queue: once every host is drained and nothing is in flight any more (a URL in
+    flight may still be requeued), every `get` returns the marker.
+    """
+
+    def __init__(
+        self,
+        key: Callable[[Any], str],
+        end_marker: Any,
+        per_host_concurrency: int = 2,
+        min_interval: float = 0.5,
+        max_retries: int = 2,
+        backoff_base: float = 10.0,
+        backoff_max: float = 300.0,
+    ):
+        """
+        Args:
+            key: Function mapping an item to its URL
+            end_marker: Sentinel that closes the queue
+            per_host_concurrency: Requests in flight at most per host
+            min_interval: Minimum seconds between the starts of two requests to the same host
+            max_retries: Times a throttled item is requeued before it is given up
+            backoff_base: Parking delay after the first throttled response without `Retry-After`,
+                doubled with every consecutive one
+            backoff_max: Longest parking delay, also caps `Retry-After`
+        """
+        if per_host_concurrency <= 0:
+            raise ValueError(f"per_host_concurrency must be a positive integer, got {per_host_concurrency}")
+        self._key = key
+        self._end_marker = end_marker
+        self.per_host_concurrency = per_host_concurrency
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = HostSchedulerStats()
+        self._hosts: Dict[str, _Host] = {}
+        self._rotation: "OrderedDict[str, None]" = OrderedDict()  # hosts with queued items, in serving order
+        self._local: Deque[Any] = deque()
+        self._local_in_flight: Dict[int, int] = {}  # id of a local item in flight -> times it is in flight
+        self._retries: Dict[Hashable, int] = {}
+        self._size = 0
+        self._in_flight = 0
+        self._closed = False
+        self._getters: List[asyncio.Future] = []
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0 and not self._closed
+
+    async def put(self, item: Any):
+        self.put_nowait(item)
+
+    def put_nowait(self, item: Any):
+        if item is self._end_marker:
+            self._closed = True
+            self._wake()
+            return
+        host_key = url_host(self._key(item))
+        self._host(host_key).items.append(item)
+        self._rotation[host_key] = None
+        self._size += 1
+        self._wake()
+
+    def put_local(self, item: Any):
+        """Queue an item whose processing makes no request to its host."""
+        self._local.append(item)
+        self._size += 1
+        self._wake()
+
+    async def get(self) -> Any:
+        while True:
+            now = time.monotonic()
+            item = self._pop_ready(now)
+            if item is not None:
+                return item
+            if self._closed and self._size == 0 and self._in_flight == 0:
+                return self._end_marker
+            await self._wait(self._next_ready_delay(now))
+
+    def release(self, item: Any, throttled: Optional[HostThrottled] = None) -> bool:
+        """
+        Hand back an item returned by `get` once it has been processed.
+
+        Args:
+            item: The item
+            throttled: The throttling response the host answered with, if any
+
+        Returns:
+            bool: True when the item was requeued and will be returned by `get` again
+        """
+        self._in_flight -= 1
+        local = self._local_in_flight.get(id(item))
+        if local is not None:
+            if local > 1:
+                self._local_in_flight[id(item)] = local - 1
+            else:
+                del self._local_in_flight[id(item)]
+            self._wake()
+            return False
+
+        url = self._key(item)
+        host = self._hosts[url_host(url)]
+        host.in_flight -= 1
+        requeued = False
+        if throttled is None:
+            host.strikes = 0
+            host.limit = min(host.limit + 1, self.per_host_concurrency)
+            self._retries.pop(url, None)
+        else:
+            self._park(url_host(url), host, throttled)
+            retries = self._retries.get(url, 0)
+            if retries < self.max_retries:
+                self._retries[url] = retries + 1
+                host.items.appendleft(item)
+                self._rotation[url_host(url)] = None
+                self._size += 1
+                self.stats.requeued += 1
+                requeued = True
+            else:
+                self._retries.pop(url, None)
+                self.stats.gave_up += 1
+                logger.warning(f"Giving up on URL={url} after {retries} retries, host keeps throttling")
+        self._wake()
+        return requeued
+
+    def _park(self, host_key: str, host: _Host, throttled: HostThrottled):
+        host.strikes += 1
+        delay = throttled.retry_after
+        if delay is None:
+            delay = self.backoff_base * 2 ** (host.strikes - 1)
+        delay = min(delay, self.backoff_max)
+        host.limit = max(host.limit // 2, 1)
+        ready_at = time.monotonic() + delay
+        if ready_at > host.ready_at:
+            self.stats.parked_seconds += ready_at - max(host.ready_at, time.monotonic())
+            host.ready_at = ready_at
+        self.stats.throttled += 1
+        logger.info(
+            f"Host {host_key} throttled with status {throttled.status}, parked for {delay:.1f}s "
+            f"at concurrency {host.limit}"
+        )
+
+    def _host(self, host_key: str) -> _Host:
+        host = self._hosts.get(host_key)
+        if host is None:
+            host = self._hosts[host_key] = _Host(self.per_host_concurrency)
+            self.stats.hosts += 1
+        return host
+
+    def _pop_ready(self, now: float) -> Optional[Any]:
+        if self._local:
+            item = self._local.popleft()
+            self._local_in_flight[id(item)] = self._local_in_flight.get(id(item), 0) + 1
+            self._in_flight += 1
+            self._size -= 1
+            self.stats.local += 1
+            return item
+        for host_key in self._rotation:
+            host = self._hosts[host_key]
+            if host.in_flight >= host.limit or host.ready_at > now:
+                continue
+            item = host.items.popleft()
+            # The served host moves to the back of the rotation
+            del self._rotation[host_key]
+            if host.items:
+                self._rotation[host_key] = None
+            host.in_flight += 1
+            host.ready_at = now + self.min_interval
+            self._in_flight += 1
+            self._size -= 1
+            self.stats.dispatched += 1
+            return item
+        return None
+
+    def _next_ready_delay(self, now: float) -> Optional[float]:
+        """Seconds until a host with queued items comes out of spacing or parking, None to wait for a release."""
+        delays = [
+            self._hosts[host_key].ready_at - now
+            for host_key in self._rotation
+            if self._hosts[host_key].in_flight < self._hosts[host_key].limit
+        ]
+        if not delays:
+            return None
+        return max(min(delays), 0.0)
+
+    async def _wait(self, timeout: Optional[float]):
+        waiter = asyncio.get_running_loop().create_future()
+        self._getters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        finally:
+            if waiter in self._getters:
+                self._getters.remove(waiter)
+
+    def _wake(self):
+        # Waiters re-check the queue state, so waking all of them is always safe
+        for waiter in self._getters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._getters.clear()
@@ -0,0 +1,192 @@
+import asyncio
+import re
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+import httpx
+from crawl4ai.content_scraping_strategy import LXMLWebScrapingStrategy
+from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+from src.rag.host_scheduler import HostThrottled, parse_retry_after
+from src.request.token_counter import LogHistogram
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Visible text of pages that only render, or only let a client in, with JavaScript
+_JS_WALL_MARKERS = (
+    "enable javascript",
+    "javascript is disabled",
+    "javascript is required",
+    "requires javascript",
+    "turn on javascript",
+    "you need to enable javascript",
+    "checking your browser",
+    "just a moment...",
+    "verify you are human",
+    "are you a robot",
+)
+_JS_WALL_PATTERN = re.compile("|".join(re.escape(marker) for marker in _JS_WALL_MARKERS), re.IGNORECASE)
+# Empty mount point of a client-side rendered application
+_SPA_ROOT_PATTERN = re.compile(
+    r"<div[^>]+id=[\"'](?:root|app|__next|__nuxt|svelte)[\"'][^>]*>\s*</div>", re.IGNORECASE
+)
+_HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+
+def html_to_markdown(html: str, url: str) -> str:
+    """
+    Convert an HTML page to markdown in process, with the same scraping and markdown
+    generation strategies crawl4ai applies to browser-rendered pages.
+    """
+    scraped = LXMLWebScrapingStrategy().scrap(url, html)
+    return DefaultMarkdownGenerator().generate_markdown(scraped.cleaned_html, base_url=url).raw_markdown
+
+
+class FetchTierStats:
+    """Attempts, hits, latency percentiles and escalation reasons of every fetch tier."""
+
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self):
+        self.attempts: Counter = Counter()
+        self.hits: Counter = Counter()
+        self.escalations: Counter = Counter()
+        self.seconds: Dict[str, float] = {}
+        self._latency: Dict[str, LogHistogram] = {}
+
+    def record(self, tier: str, seconds: float, hit: bool, reason: Optional[str] = None):
+        self.attempts[tier] += 1
+        if hit:
+            self.hits[tier] += 1
+        elif reason is not None:
+            self.escalations[reason] += 1
+        self.seconds[tier] = self.seconds.get(tier, 0.0) + seconds
+        self._latency.setdefault(tier, LogHistogram(growth=1.05, max_value=1e7)).add(seconds * 1000)
+
+    def hit_rate(self, tier: str) -> float:
+        return self.hits[tier] / self.attempts[tier] if self.attempts[tier] else 0.0
+
+    def summary(self) -> str:
+        parts = []
+        for tier in self.attempts:
+            latency = "/".join(
+                f"{self._latency[tier].percentile(q) / 1000:.2f}" for q in self.PERCENTILES
+            )
+            parts.append(
+                f"{tier}: {self.hits[tier]}/{self.attempts[tier]} hits ({self.hit_rate(tier):.0%}), "
+                f"latency p50/p90/p99={latency}s"
+            )
+        if self.escalations:
+            reasons = ", ".join(f"{reason}={count}" for reason, count in self.escalations.most_common())
+            parts.append(f"escalations: {reasons}")
+        return "; ".join(parts) if parts else "no fetches"
+
+
+class HttpFetcher:
+    """
+    Browserless fast path of the crawler: a pooled async HTTP GET followed by in-process
+    HTML to markdown conversion.
+
+    `fetch` returns the markdown only when it looks usable, otherwise the reason the page
+    should be escalated: a PDF response (handled by the PDF tier), or for the browser an error
+    status, a non-HTML response, a page too large, too little text, a JavaScript or bot-check
+    wall, or an empty client-side application shell.
+    """
+
+    MIN_MARKDOWN_CHARS = 500
+    JS_WALL_MAX_CHARS = 5000  # longer pages mentioning JavaScript usually render their content anyway
+    MAX_RESPONSE_BYTES = 5 * 1024 * 1024
+    USER_AGENT = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    )
+
+    def __init__(
+        self,
+        timeout: float = 20.0,
+        max_connections: int = 50,
+        min_markdown_chars: int = MIN_MARKDOWN_CHARS,
+        max_response_bytes: int = MAX_RESPONSE_BYTES,
+    ):
+        """
+        Args:
+            timeout (float): Connect and read timeout of a request in seconds
+            max_connections (int): Size of the connection pool
+            min_markdown_chars (int): Shortest markdown accepted without escalation
+            max_response_bytes (int): Responses above this size are not downloaded further
+        """
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.min_markdown_chars = min_markdown_chars
+        self.max_response_bytes = max_response_bytes
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
+
+    async def fetch(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Returns:
+            (markdown, None) when the page is usable, otherwise (None, escalation reason)
+
+        Raises:
+            HostThrottled: The host answered 429, a browser would be throttled as well
+        """
+        try:
+            async with self._get_client().stream("GET", url) as response:
+                if response.status_code == 429:
+                    raise HostThrottled(url, 429, parse_retry_after(response.headers.get("retry-after")))
+                if response.status_code != 200:
+                    return None, f"status_{response.status_code}"
+                content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                if content_type == "application/pdf":
+                    return None, "pdf"
+                if content_type and content_type not in _HTML_CONTENT_TYPES:
+                    return None, "content_type"
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > self.max_response_bytes:
+                        return None, "too_large"
+                html = bytes(body).decode(response.encoding or "utf-8", errors="replace")
+        except httpx.TimeoutException:
+            return None, "timeout"
+        except httpx.HTTPError as e:
+            logger.debug(f"HTTP fetch failed for URL={url}: {e}")
+            return None, "http_error"
+
+        try:
+            markdown = await asyncio.to_thread(html_to_markdown, html, str(response.url))
+        except Exception as e:
+            logger.warning(f"HTML to markdown conversion failed for URL={url}: {e}")
+            return None, "convert_error"
+        reason = self.unusable_reason(markdown, html)
+        if reason is not None:
+            return None, reason
+        return markdown, None
+
+    def unusable_reason(self, markdown: str, html: str) -> Optional[str]:
+        """Why the markdown of a statically fetched page cannot be used, None when it can."""
+        text_length = len(markdown.strip())
+        if text_length < self.JS_WALL_MAX_CHARS and _JS_WALL_PATTERN.search(markdown):
+            return "js_wall"
+        if text_length < self.min_markdown_chars:
+            return "spa_shell" if _SPA_ROOT_PATTERN.search(html) else "too_short"
+        return None
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # httpx的连接池绑定在event loop上, loop变化时重新创建client
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                follow_redirects=True,
+                headers={"User-Agent": self.USER_AGENT, "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8"},
+            )
+            self._client_loop = loop
+        return self._client
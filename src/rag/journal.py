@@ -0,0 +1,156 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Iterable, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Per-item states in pipeline order, a later state implies the earlier ones
+JOURNAL_STATES = ("crawled", "refined", "scored")
+STATE_KEY = "journal_state"
+
+
+def state_rank(state: Optional[str]) -> int:
+    return JOURNAL_STATES.index(state) + 1 if state in JOURNAL_STATES else 0
+
+
+class RunJournal:
+    """
+    Append-only JSONL journal of per-item pipeline progress, used to resume an interrupted run.
+
+    Every line records that one (topic, url) item reached a state together with the fields
+    produced by that state, e.g. the raw markdown once crawled or the similarity once scored.
+    Lines are written as soon as an item advances, but flushed and fsynced only every
+    `fsync_every` records or `fsync_interval` seconds, so the journal costs little throughput
+    and a crash loses at most the last unsynced batch. A torn last line is ignored on load.
+    Inside an event loop the fsync runs in a background task on a worker thread, so recording
+    never blocks the loop on the disk; use `aclose` there.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        resume: bool = False,
+        fsync_every: int = 64,
+        fsync_interval: float = 1.0,
+    ):
+        """
+        Args:
+            path (str): Journal file path
+            resume (bool): Append to an existing journal instead of starting a new one
+            fsync_every (int): Number of records between two fsyncs
+            fsync_interval (float): Maximum time in seconds between a record and its fsync
+        """
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.records = 0
+        self.syncs = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._sync_task: Optional[asyncio.Task] = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def load(self) -> Dict[Tuple[str, str], dict]:
+        """
+        Replay the journal into the latest known data of every item.
+
+        Returns:
+            Dict mapping (topic, url) to the merged fields of all its records, with the
+            furthest reached state stored under STATE_KEY
+        """
+        items: Dict[Tuple[str, str], dict] = {}
+        if not os.path.exists(self.path):
+            return items
+        with open(self.path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable journal line {line_number} in {self.path}")
+                    continue
+                key = (record["topic"], record["url"])
+                data = items.setdefault(
+                    key, {"topic": record["topic"], "url": record["url"], "error": False}
+                )
+                data.update(record.get("fields", {}))
+                if state_rank(record["state"]) > state_rank(data.get(STATE_KEY)):
+                    data[STATE_KEY] = record["state"]
+        return items
+
+    def record(self, data: dict, state: str, fields: Iterable[str]):
+        """Append that `data` reached `state`, keeping only the given fields of it."""
+        line = json.dumps(
+            {
+                "topic": data["topic"],
+                "url": data["url"],
+                "state": state,
+                "fields": {field: data.get(field) for field in fields},
+                "ts": time.time(),
+            },
+            ensure_ascii=False,
+        )
+        self._file.write(line + "\n")
+        self.records += 1
+        self._pending += 1
+        if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.sync()
+                return
+            if self._sync_task is None or self._sync_task.done():
+                self._sync_task = loop.create_task(self._sync_in_thread())
+
+    def sync(self):
+        if self._pending == 0 or self._file.closed:
+            return
+        self._take_pending()
+        os.fsync(self._file.fileno())
+        self.syncs += 1
+
+    async def _sync_in_thread(self):
+        if self._pending == 0 or self._file.closed:
+            return
+        # flush在loop线程中进行, 避免与record并发写缓冲区, 只有fsync在工作线程中执行
+        self._take_pending()
+        try:
+            await asyncio.to_thread(os.fsync, self._file.fileno())
+        except OSError as e:
+            logger.warning(f"Failed to fsync journal {self.path}: {e}")
+            return
+        self.syncs += 1
+
+    def _take_pending(self):
+        self._file.flush()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
+
+    async def aclose(self):
+        """`close` for use inside an event loop: waits for the running fsync, then syncs and closes in a worker thread."""
+        if self._sync_task is not None:
+            await self._sync_task
+            self._sync_task = None
+        if not self._file.closed:
+            await asyncio.to_thread(self.close)
+
+    @staticmethod
+    def summarize(items: Dict[Tuple[str, str], dict]) -> Dict[str, int]:
+        """Number of loaded items whose furthest state is each of JOURNAL_STATES."""
+        counts = {state: 0 for state in JOURNAL_STATES}
+        for data in items.values():
+            if data.get(STATE_KEY) in counts:
+                counts[data[STATE_KEY]] += 1
+        return counts
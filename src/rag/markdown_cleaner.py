@@ -0,0 +1,162 @@
+import re
+from typing import List
+
+# 正则只用互斥的字符类和占有量词(possessive), 不会回溯, 处理时间随页面长度线性增长
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_REFERENCE_HEADING = re.compile(
+    r"^(?:\d+(?:\.\d+)*\.?\s+)?(?:references?|bibliography|works cited|citations|notes and references|"
+    r"external links|see also|further reading)\s*$",
+    re.IGNORECASE,
+)
+# Link text may hold one level of brackets, e.g. the citation link [[1]](#cite-1), and the target
+# escaped characters and one level of parentheses, e.g. (/wiki/Attention_\(ML\) "Attention (ML)")
+_LINK_TEXT = r"\[((?:[^\[\]\n]++|\[[^\[\]\n]*+\])*+)\]"
+_LINK_TARGET = r"\((?:[^()\\\n]++|\\.|\([^()\n]*+\))*+\)"
+_IMAGE = re.compile(r"!\[[^\]\n]*+\]" + _LINK_TARGET)
+_HTML_IMAGE = re.compile(r"<img\b[^>\n]*+>", re.IGNORECASE)
+_LINK = re.compile(_LINK_TEXT + _LINK_TARGET)
+_URL = re.compile(r"https?://[^\s)\]>]*(?<![.,;:!?'\"])")
+# Leftovers of wiki markup: edit links, empty brackets and "Jump up" footnote back-links
+_EMPTY_BRACKETS = re.compile(r"\[(?:edit|\s*+)\]")
+_JUMP_UP = re.compile(r"\^\s*+Jump up(?: to:?(?:\s+[a-z](?=\s))*)?")
+_LEFTOVERS = ("↩︎", "↩", "<>")  # back-link arrows, brackets of removed autolinks
+_REPEATED_PUNCTUATION = re.compile(r"([-=_*~.!?#+/\\|<>])\1{3,}")
+_MARKUP_ONLY = re.compile(r"^[\s*+\-=_~•·|>#,;:/()]*$")
+# What separates the links of a navigation line, commas and words make it a sentence or an author list
+_NAV_SEPARATORS = re.compile(r"^[\s*+\-•·|>/!]*$")
+_NAV_START = re.compile(r"[\s*+\-•·|>/!\[]")
+_BLANK_LINES = re.compile(r"\n\n\n+")
+# Short lines of cookie banners, consent dialogs and footers
+_BOILERPLATE_KEYWORDS = ("cookie", "©", "(c)", "copyright", "rights reserved", "terms ", "privacy", "accept all", "reject all", "preferences")
+_BOILERPLATE_LINE = re.compile(
+    r"\bwe use cookies\b(?!-)|\buses cookies\b(?!-)|\bcookie (?:policy|settings|preferences)\b|\baccept (?:all )?cookies\b|"
+    r"\baccept all\b|\breject all\b|\bmanage (?:cookie )?preferences\b|©|\(c\)\s*\d{4}|\bcopyright \d{4}\b|"
+    r"\ball rights reserved\b|\bterms (?:of|and) (?:use|service|conditions)\b|\bprivacy policy\b",
+    re.IGNORECASE,
+)
+# Short lines starting with an interface label, possibly as a link or list item
+_UI_LINE = re.compile(
+    r"^[\s*+\-\[]*(?:sign (?:in|up)|log ?in|register|subscribe\b|share (?:on|this)|follow us|"
+    r"(?:skip|jump) to (?:main )?content|back to top)",
+    re.IGNORECASE,
+)
+
+
+class MarkdownCleaner:
+    """
+    Deterministic removal of web page boilerplate from crawled markdown before it is sent to
+    the LLM for refinement.
+
+    A first pass over the lines drops navigation (lines holding two or more links and nothing
+    else, and runs of `nav_run_lines` link-only lines), short cookie banner, sign-in, sharing
+    and footer lines, and reference sections such as "References" or "External links" up to the
+    next heading of the same or a higher level. A second pass removes images, link targets
+    (the anchor text is kept), bare URLs and wiki markup, and shortens runs of the same
+    punctuation character. A last pass drops repeated lines and collapses blank lines.
+    Every pass is a compiled regular expression or a single scan over the lines, so cleaning
+    is linear in the page size.
+    """
+
+    NAV_RUN_LINES = 3
+    MAX_BOILERPLATE_LINE_CHARS = 160  # longer lines mentioning cookies or copyright are body text
+
+    def __init__(
+        self,
+        drop_reference_sections: bool = True,
+        nav_run_lines: int = NAV_RUN_LINES,
+        max_boilerplate_line_chars: int = MAX_BOILERPLATE_LINE_CHARS,
+    ):
+        """
+        Args:
+            drop_reference_sections (bool): Drop reference lists, "See also" and "External links" sections
+            nav_run_lines (int): Consecutive link-only lines treated as a navigation block
+            max_boilerplate_line_chars (int): Longest line that may be dropped as UI boilerplate
+        """
+        self.drop_reference_sections = drop_reference_sections
+        self.nav_run_lines = nav_run_lines
+        self.max_boilerplate_line_chars = max_boilerplate_line_chars
+
+    def clean(self, markdown: str) -> str:
+        text = "\n".join(self._drop_blocks(markdown.splitlines()))
+        text = _HTML_IMAGE.sub("", _IMAGE.sub("", text))
+        text = _LINK.sub(r"\1", text)
+        text = _URL.sub("", text)
+        text = _JUMP_UP.sub("", _EMPTY_BRACKETS.sub("", text))
+        for leftover in _LEFTOVERS:
+            text = text.replace(leftover, "")
+        text = _REPEATED_PUNCTUATION.sub(r"\1\1\1", text)
+        return _BLANK_LINES.sub("\n\n", "\n".join(self._drop_repeats(text.split("\n")))).strip()
+
+    def _drop_blocks(self, lines: List[str]) -> List[str]:
+        kept = []
+        link_run = []  # pending link-only lines, with the blank lines between them
+        section_level = 0  # level of the heading of the dropped section, 0 outside of one
+        for line in lines:
+            stripped = line.strip()
+            heading = _HEADING.match(stripped)
+            if section_level:
+                if heading is None or len(heading.group(1)) > section_level:
+                    continue
+                section_level = 0
+            if heading is not None and self.drop_reference_sections and _REFERENCE_HEADING.match(
+                _EMPTY_BRACKETS.sub("", _LINK.sub(r"\1", heading.group(2))).strip()
+            ):
+                section_level = len(heading.group(1))
+                continue
+
+            if not stripped:
+                if link_run:
+                    link_run.append(line)
+                else:
+                    kept.append(line)
+                continue
+            if len(stripped) <= self.max_boilerplate_line_chars and self._boilerplate(stripped):
+                continue
+            links = self._link_only(stripped)
+            if links >= 2:
+                # A menu bar on a single line
+                continue
+            if links == 1:
+                link_run.append(line)
+                continue
+            self._flush_links(link_run, kept)
+            kept.append(line)
+        self._flush_links(link_run, kept)
+        return kept
+
+    def _flush_links(self, link_run: List[str], kept: List[str]):
+        if sum(1 for line in link_run if line.strip()) < self.nav_run_lines:
+            kept.extend(link_run)
+        link_run.clear()
+
+    @staticmethod
+    def _boilerplate(stripped: str) -> bool:
+        if _UI_LINE.match(stripped):
+            return True
+        # 先用子串检查过滤, 大多数行不需要执行完整的正则
+        lowered = stripped.lower()
+        return any(keyword in lowered for keyword in _BOILERPLATE_KEYWORDS) and _BOILERPLATE_LINE.search(stripped) is not None
+
+    @staticmethod
+    def _link_only(stripped: str) -> int:
+        """Number of links and images of a line holding nothing else but list markup, otherwise 0."""
+        if "](" not in stripped or not _NAV_START.match(stripped):
+            return 0
+        rest, links = _LINK.subn("", stripped)
+        return links if links and _NAV_SEPARATORS.match(rest) else 0
+
+    @staticmethod
+    def _drop_repeats(lines: List[str]) -> List[str]:
+        kept, seen = [], set()
+        for line in lines:
+            stripped = line.rstrip()
+            if _MARKUP_ONLY.match(stripped) and not stripped.lstrip().startswith("|"):
+                # 去掉链接后只剩列表符号的行
+                kept.append("")
+                continue
+            key = stripped.strip().lower()
+            if key in seen and not key.startswith("|"):
+                continue
+            seen.add(key)
+            kept.append(stripped)
+        return kept
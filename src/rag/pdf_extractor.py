@@ -0,0 +1,176 @@
+import asyncio
+import importlib.util
+import io
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+_ARXIV_ABS_PATTERN = re.compile(r"^https?://(?:www\.|export\.)?arxiv\.org/abs/([^?#]+?)/?(?:[?#].*)?$", re.IGNORECASE)
+
+
+class PdfTooLarge(Exception):
+    """The PDF exceeds the download size limit."""
+
+
+def arxiv_pdf_url(url: str) -> Optional[str]:
+    """PDF link of an arXiv abstract page, e.g. https://arxiv.org/abs/2401.00001v2 -> https://arxiv.org/pdf/2401.00001v2"""
+    match = _ARXIV_ABS_PATTERN.match(url.strip())
+    return f"https://arxiv.org/pdf/{match.group(1)}" if match else None
+
+
+def looks_like_pdf_url(url: str) -> bool:
+    path = urlsplit(url).path.lower()
+    return path.endswith(".pdf") or "arxiv.org/pdf/" in url.lower()
+
+
+def pdf_support_available() -> bool:
+    return importlib.util.find_spec("pypdf") is not None
+
+
+def extract_pdf_text(data: bytes, max_pages: int, max_chars: int) -> Tuple[str, int, int]:
+    """
+    Extract the text of a PDF page by page, stopping after `max_pages` pages or once
+    `max_chars` characters have been collected, and cut the text to `max_chars` characters
+    at a line break. Runs in a worker process.
+
+    Returns:
+        (text, pages read, total pages)
+    """
+    # pypdf是可选依赖, 只在真正解析PDF时导入
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    total_pages = len(reader.pages)
+    pages, chars = [], 0
+    for page in reader.pages[:max_pages]:
+        try:
+            text = page.extract_text() or ""
+        except Exception as e:
+            # 单页解析失败不影响其他页
+            text = ""
+            logger.debug(f"Failed to extract a PDF page: {e}")
+        pages.append(text.strip())
+        chars += len(text)
+        if chars >= max_chars:
+            break
+    text = "\n\n".join(p for p in pages if p)
+    if len(text) > max_chars:
+        # 尽量在换行处截断, 不切断句子
+        cut = text.rfind("\n", 0, max_chars + 1)
+        text = text[: cut if cut > max_chars // 2 else max_chars].rstrip()
+    return text, len(pages), total_pages
+
+
+class PdfExtractor:
+    """
+    Downloads PDFs with streaming I/O and extracts their text in a process pool.
+
+    Downloads stop as soon as the declared or received size exceeds `max_bytes`. Extraction
+    stops after `max_pages` pages or `max_chars` characters, so a long thesis costs no more
+    than a paper. Text extraction is CPU-bound and runs in `workers` separate processes, so it
+    blocks neither the event loop nor the other crawl consumers. Requires the optional
+    `pypdf` package, see `pdf_support_available`.
+    """
+
+    MAX_BYTES = 30 * 1024 * 1024
+    MAX_PAGES = 40
+    MAX_CHARS = 200000
+
+    def __init__(
+        self,
+        max_bytes: int = MAX_BYTES,
+        max_pages: int = MAX_PAGES,
+        max_chars: int = MAX_CHARS,
+        workers: int = 2,
+        timeout: float = 60.0,
+        max_connections: int = 20,
+    ):
+        """
+        Args:
+            max_bytes (int): Largest PDF downloaded
+            max_pages (int): Pages extracted at most per PDF
+            max_chars (int): Characters extracted at most per PDF
+            workers (int): Number of extraction processes
+            timeout (float): Connect and read timeout of a download in seconds
+            max_connections (int): Size of the download connection pool
+        """
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.workers = workers
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.truncated = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
+
+    async def fetch(self, url: str) -> str:
+        """
+        Download a PDF and extract its text.
+
+        Raises:
+            PdfTooLarge: The PDF exceeds `max_bytes`
+            httpx.HTTPError: The download failed
+            ValueError: The response is not a PDF
+        """
+        data = await self.download(url)
+        loop = asyncio.get_running_loop()
+        text, pages_read, total_pages = await loop.run_in_executor(
+            self._get_executor(), extract_pdf_text, data, self.max_pages, self.max_chars
+        )
+        if pages_read < total_pages:
+            self.truncated += 1
+            logger.info(f"PDF truncated to {pages_read}/{total_pages} pages, URL={url}")
+        return text
+
+    async def download(self, url: str) -> bytes:
+        async with self._get_client().stream("GET", url) as response:
+            response.raise_for_status()
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                raise PdfTooLarge(f"PDF of {int(declared)} bytes exceeds {self.max_bytes} bytes")
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body.extend(chunk)
+                if len(body) > self.max_bytes:
+                    raise PdfTooLarge(f"PDF exceeds {self.max_bytes} bytes")
+        if not body.lstrip()[:5].startswith(b"%PDF"):
+            raise ValueError(f"Response is not a PDF, content type={response.headers.get('content-type')}")
+        return bytes(body)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn避免fork带着浏览器和event loop的线程状态
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # httpx的连接池绑定在event loop上, loop变化时重新创建client
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_connections),
+                follow_redirects=True,
+            )
+            self._client_loop = loop
+        return self._client
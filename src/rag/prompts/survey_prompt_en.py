@@ -0,0 +1,64 @@
+# survey generation prompts
+PAPER_NOTES_PROMPT = """You are preparing to write a survey on '{topic}'. Read the following part of a document and take structured notes about it for the survey.
+
+Document title: {title}
+Document content:
+{content}
+
+Write concise notes covering, when present: the problem addressed, the proposed method or idea, datasets and experimental results, conclusions, and limitations. Keep numbers, names and claims exact. Do not add information that is not in the document.
+
+[Output requirements]
+- Notes: <NOTES>Your notes as bullet points</NOTES>
+"""
+
+OUTLINE_PROMPT = """You are writing a survey on '{topic}'. Below are notes on several papers, each introduced by its identifier in square brackets.
+
+{notes}
+
+Propose an outline of at most {max_sections} sections that organizes these papers for the survey. Every section has a title, a one or two sentence description of what it covers, and the identifiers of the papers it should discuss. A paper may appear in several sections.
+
+[Output requirements]
+Repeat the following block for every section, in reading order:
+<SECTION>
+<TITLE>Section title</TITLE>
+<DESCRIPTION>What the section covers</DESCRIPTION>
+<PAPERS>Comma separated paper identifiers, e.g. 1, 4, 7</PAPERS>
+</SECTION>
+"""
+
+OUTLINE_MERGE_PROMPT = """You are writing a survey on '{topic}'. Several partial outlines were drafted from different subsets of the papers:
+
+{outlines}
+
+Merge them into a single coherent outline of at most {max_sections} sections. Combine sections that cover the same subject, keep the union of their paper identifiers, and order the sections so the survey reads from foundations to open problems.
+
+[Output requirements]
+Repeat the following block for every section, in reading order:
+<SECTION>
+<TITLE>Section title</TITLE>
+<DESCRIPTION>What the section covers</DESCRIPTION>
+<PAPERS>Comma separated paper identifiers, e.g. 1, 4, 7</PAPERS>
+</SECTION>
+"""
+
+SECTION_NOTES_PROMPT = """You are writing the section '{section}' of a survey on '{topic}'. The section covers: {description}
+
+Condense the following notes into the material needed for this section only. Keep the paper identifiers in square brackets next to every claim they support.
+
+{notes}
+
+[Output requirements]
+- Condensed notes: <NOTES>Your condensed notes as bullet points</NOTES>
+"""
+
+SECTION_WRITE_PROMPT = """You are writing the section '{section}' of a survey on '{topic}'. The section covers: {description}
+
+Notes on the papers to discuss, each claim followed by the identifier of its paper in square brackets:
+
+{notes}
+
+Write the section as flowing academic prose organized in paragraphs. Compare and connect the papers instead of listing them one by one, and cite them with their identifiers in square brackets, e.g. [3]. Only use information from the notes. Do not write the section title.
+
+[Output requirements]
+- Section text: <CONTENT>Your section text</CONTENT>
+"""
@@ -0,0 +1,227 @@
+import re
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 判定语言只看开头部分, 足够可靠且与页面长度无关
+_LANGUAGE_SAMPLE_CHARS = 20000
+_SCRIPTS = {
+    "latin": re.compile(r"[A-Za-zÀ-ɏ]"),
+    "han": re.compile(r"[一-鿿㐀-䶿]"),
+    "kana": re.compile(r"[぀-ヿ]"),
+    "hangul": re.compile(r"[가-힯]"),
+    "cyrillic": re.compile(r"[Ѐ-ӿ]"),
+    "arabic": re.compile(r"[؀-ۿ]"),
+}
+_LATIN_WORD = re.compile(r"[a-zÀ-ɏ]+")
+_WORD = re.compile(r"[^\W\d_]{2,}")
+_TERM = re.compile(r"[^\W_]{2,}")  # words and numbers, e.g. the cells of a result table
+_CJK_CHAR = re.compile(r"[一-鿿㐀-䶿぀-ヿ가-힯]")
+_JUNK_CHAR = re.compile(r"[�\x00-\x08\x0B\x0C\x0E-\x1F\x7F]")
+
+# Most frequent function words, which make up a large share of any running text
+_STOPWORDS = {
+    "en": frozenset(
+        "the of and to a in is that for it as was with be by on not this are or from at which an have "
+        "we can has been their more these also such our they its than other but used between when both".split()
+    ),
+    "de": frozenset("der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es an werden aus".split()),
+    "fr": frozenset("le la les de des et en un une du est que pour dans qui par sur au pas ce sont avec plus ou".split()),
+    "es": frozenset("el la los las de del y en que un una por con para es se no al lo como más pero sus".split()),
+    "it": frozenset("il di che la in un una per non del della sono con si gli le da nel alla anche come".split()),
+    "pt": frozenset("o a os as de do da dos das e em um uma para com não que se por mais ao pelo".split()),
+    "nl": frozenset("de het een en van in is dat op te zijn met voor niet aan er die ook als bij".split()),
+}
+
+# Phrases of bot checks, login and paywalls, and cookie consent, matched on the lowercased raw page
+_CAPTCHA_SIGNATURES = (
+    "complete the captcha",
+    "solve the captcha",
+    "captcha-delivery",
+    "enter the characters you see below",
+    "are you a robot",
+    "verify you are human",
+    "verify that you are human",
+    "unusual traffic",
+    "checking your browser",
+    "ddos protection",
+    "cloudflare ray id",
+    "access denied",
+    "request blocked",
+    "press and hold",
+)
+_LOGIN_WALL_SIGNATURES = (
+    "sign in to continue",
+    "log in to continue",
+    "login to continue",
+    "please sign in",
+    "please log in",
+    "to continue reading",
+    "subscribe to read",
+    "access through your institution",
+    "purchase this article",
+    "buy this article",
+    "rent this article",
+    "get full access",
+    "for subscribers only",
+    "create a free account to",
+    "reached your article limit",
+)
+_COOKIE_SIGNATURES = ("cookie", "consent")
+
+
+def detect_language(text: str) -> str:
+    """
+    Identify the language of a text from its scripts and, for Latin script, its function words.
+
+    Returns:
+        "en", "de", "fr", "es", "it", "pt" or "nl" for Latin script, "zh", "ja", "ko", "ru" or "ar"
+        for the other scripts, and "unknown" when the text has too few letters or no clear language
+    """
+    sample = text[:_LANGUAGE_SAMPLE_CHARS]
+    counts = {script: len(pattern.findall(sample)) for script, pattern in _SCRIPTS.items()}
+    letters = sum(counts.values())
+    if letters < 20:
+        return "unknown"
+    script = max(counts, key=counts.get)
+    if script in ("han", "kana"):
+        # 日文混用汉字和假名
+        return "ja" if counts["kana"] > 0.1 * letters else "zh"
+    if script != "latin":
+        return {"hangul": "ko", "cyrillic": "ru", "arabic": "ar"}[script]
+
+    words = _LATIN_WORD.findall(sample.lower())
+    if len(words) < 10:
+        return "unknown"
+    hits = Counter()
+    for word in words:
+        for language, stopwords in _STOPWORDS.items():
+            if word in stopwords:
+                hits[language] += 1
+    if not hits:
+        return "unknown"
+    language, count = hits.most_common(1)[0]
+    if count < 0.1 * len(words):
+        return "unknown"
+    # Short words such as "a", "in" or "de" are shared between languages, ties go to English
+    if language != "en" and hits["en"] >= 0.8 * count:
+        return "en"
+    return language
+
+
+@dataclass
+class QualityGateStats:
+    """Pages checked by a PageQualityGate during a run, and the LLM calls the rejected ones did not cost."""
+
+    passed: int = 0
+    flagged: int = 0
+    rejected: Dict[str, int] = field(default_factory=dict)  # pages per reject reason
+    llm_calls_saved: int = 0  # estimated refine and similarity calls, see AsyncCrawler
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        reasons = ", ".join(f"{reason}={count}" for reason, count in sorted(self.rejected.items()))
+        return (
+            f"passed={self.passed}, flagged={self.flagged}, rejected={sum(self.rejected.values())}"
+            f"{f' ({reasons})' if reasons else ''}, LLM calls saved~{self.llm_calls_saved}"
+        )
+
+
+class PageQualityGate:
+    """
+    Cheap local checks rejecting crawled pages that are not worth any LLM call: binary or
+    garbled text, pages in a language the survey is not written in, bot checks, login and
+    paywalls, cookie-only pages, and pages with too little text.
+
+    `check` looks at the raw markdown for the wall signatures, which the boilerplate
+    cleaner would otherwise remove, and at the cleaned text for everything else. A wall
+    signature on a page with at least `wall_max_words` words is only flagged, since real
+    articles mention logins and captchas too (and some are about captchas).
+    """
+
+    MIN_WORDS = 60
+    WALL_MAX_WORDS = 200
+    MAX_JUNK_RATIO = 0.02  # replacement and control characters
+    MIN_WORD_RATIO = 0.4  # tokens outside of tables holding a word, of those holding a word or number
+
+    def __init__(
+        self,
+        languages: Iterable[str] = ("en",),
+        min_words: int = MIN_WORDS,
+        wall_max_words: int = WALL_MAX_WORDS,
+        max_junk_ratio: float = MAX_JUNK_RATIO,
+        min_word_ratio: float = MIN_WORD_RATIO,
+    ):
+        """
+        Args:
+            languages (Iterable[str]): Accepted languages, see `detect_language`. Pages whose language
+                is unknown are always accepted, an empty list accepts every language
+            min_words (int): Fewest words and numbers of an informative page. CJK characters count as half a word
+            wall_max_words (int): Pages with a wall signature and fewer words are rejected, longer ones flagged
+            max_junk_ratio (float): Largest share of replacement and control characters
+            min_word_ratio (float): Smallest share of the whitespace-separated tokens outside of tables that
+                hold a word, among those holding a word or a number
+        """
+        self.languages = set(languages)
+        self.min_words = min_words
+        self.wall_max_words = wall_max_words
+        self.max_junk_ratio = max_junk_ratio
+        self.min_word_ratio = min_word_ratio
+        self.stats = QualityGateStats()
+
+    def reset_stats(self):
+        self.stats = QualityGateStats()
+
+    def check(self, text: str, raw: Optional[str] = None) -> Tuple[Optional[str], List[str]]:
+        """
+        Args:
+            text (str): Cleaned page text
+            raw (str, optional): Page before cleaning, defaults to `text`
+
+        Returns:
+            (reason, flags): The reason the page is rejected, or None when it passes, and the wall
+                signatures found on a page that passes
+        """
+        reason, flags = self._check(text, text if raw is None else raw)
+        if reason is not None:
+            self.stats.rejected[reason] = self.stats.rejected.get(reason, 0) + 1
+        else:
+            self.stats.passed += 1
+            self.stats.flagged += bool(flags)
+        return reason, flags
+
+    def _check(self, text: str, raw: str) -> Tuple[Optional[str], List[str]]:
+        if text and len(_JUNK_CHAR.findall(text)) > self.max_junk_ratio * len(text):
+            return "binary", []
+        # 表格行和纯符号不参与判断; 中日韩文本没有空格, 整段算作一个词
+        tokens = [
+            token
+            for line in text.split("\n")
+            if not line.lstrip().startswith("|")
+            for token in line.split()
+            if _TERM.search(token)
+        ]
+        wordlike = sum(1 for token in tokens if _WORD.search(token))
+        if wordlike < self.min_word_ratio * len(tokens):
+            return "garbled", []
+
+        language = detect_language(text)
+        if self.languages and language != "unknown" and language not in self.languages:
+            return "language", []
+
+        words = len(_TERM.findall(text)) + len(_CJK_CHAR.findall(text)) // 2
+        lowered = raw.lower()
+        walls = [
+            wall
+            for wall, signatures in (("captcha", _CAPTCHA_SIGNATURES), ("login_wall", _LOGIN_WALL_SIGNATURES))
+            if any(signature in lowered for signature in signatures)
+        ]
+        if walls and words < self.wall_max_words:
+            return walls[0], []
+        if words < self.min_words:
+            if any(signature in lowered for signature in _COOKIE_SIGNATURES):
+                return "cookie_wall", []
+            return "too_short", []
+        return None, walls
@@ -0,0 +1,116 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingRelevanceScorer:
+    """
+    Cheap topic relevance scorer based on sentence embeddings.
+
+    Topics and documents are embedded in batches on CPU and compared with cosine similarity
+    in a single NumPy pass. Documents whose cosine falls outside the uncertain band
+    [`low`, `high`] get a similarity score directly, the others are left to the LLM scorer.
+    """
+
+    DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        low: float = 0.25,
+        high: float = 0.55,
+        similarity_threshold: int = 80,
+        batch_size: int = 32,
+        device: str = "cpu",
+    ):
+        """
+        Args:
+            model_name (str): sentence-transformers model used for the embeddings
+            low (float): Cosine below which a document is confidently irrelevant
+            high (float): Cosine above which a document is confidently relevant
+            similarity_threshold (int): Similarity threshold used by AsyncCrawler._filter_papers.
+                Confidently relevant documents are mapped to [threshold, 100], confidently
+                irrelevant ones to [0, threshold)
+            batch_size (int): Encoding batch size
+            device (str): Torch device of the embedding model
+        """
+        if not 0 < low < high < 1:
+            raise ValueError(f"Expected 0 < low < high < 1, got low={low}, high={high}")
+        self.model_name = model_name
+        self.low = low
+        self.high = high
+        self.similarity_threshold = similarity_threshold
+        self.batch_size = batch_size
+        self.device = device
+
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._topic_embeddings: Dict[str, np.ndarray] = {}
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into L2-normalized float32 vectors of shape (len(texts), dim)."""
+        embeddings = self._get_model().encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def cosine(self, topics: List[str], texts: List[str]) -> np.ndarray:
+        """
+        Cosine similarity between each text and its topic.
+
+        Args:
+            topics (List[str]): Topic of each text, repeated topics are embedded once
+            texts (List[str]): Documents to score
+
+        Returns:
+            np.ndarray: Cosine similarity per text
+        """
+        if len(topics) != len(texts):
+            raise ValueError("topics and texts must have the same length")
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+
+        missing = [t for t in dict.fromkeys(topics) if t not in self._topic_embeddings]
+        if missing:
+            for topic, embedding in zip(missing, self.embed(missing)):
+                self._topic_embeddings[topic] = embedding
+
+        topic_matrix = np.stack([self._topic_embeddings[t] for t in topics])
+        doc_matrix = self.embed(texts)
+        return np.einsum("ij,ij->i", doc_matrix, topic_matrix)
+
+    def score(self, topics: List[str], texts: List[str]) -> List[Tuple[float, Optional[int]]]:
+        """
+        Returns:
+            List of (cosine, similarity) per text, where similarity is None when the
+            cosine lies in the uncertain band and the LLM has to decide
+        """
+        return [(float(c), self.to_similarity(c)) for c in self.cosine(topics, texts)]
+
+    def to_similarity(self, cosine: float) -> Optional[int]:
+        """Map a cosine outside the uncertain band onto the 0-100 similarity scale."""
+        threshold = self.similarity_threshold
+        if cosine >= self.high:
+            return int(round(threshold + (100 - threshold) * (cosine - self.high) / (1 - self.high)))
+        if cosine <= self.low:
+            return int((threshold - 1) * max(cosine, 0.0) / self.low)
+        return None
+
+    def _get_model(self):
+        # sentence-transformers pulls in torch, so it is only imported when first needed
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+
+                    logger.info(f"Loading embedding model {self.model_name} on {self.device}")
+                    self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
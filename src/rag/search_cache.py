@@ -0,0 +1,190 @@
+import hashlib
+import json
+import threading
+import time
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from src.utils.sqlite_store import LRUBudget, SQLiteDatabase
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _normalize_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {str(k): _normalize_value(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_value(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_normalize_value(v) for v in value)
+    return value
+
+
+class SearchResultCache:
+    """
+    基于SQLite的搜索结果持久化缓存
+
+    key由(引擎类型, 规范化后的query, 规范化后的参数)哈希得到, value是JSON序列化后的结果列表。
+    缓存文件可能被多个进程共享, 因此不使用pickle, 读取缓存不会执行任何代码; metadata中的元组读回后是列表,
+    无法用JSON表示的值保存为字符串。无法解析的记录(例如旧版本用pickle写入的)视为未命中并删除。
+    每条记录的有效期由调用方按引擎传入, 缓存总条数和总大小超过上限时按最近访问时间(LRU)淘汰。
+    SQLite使用WAL模式, 多个线程或进程可以共享同一个缓存文件。
+    """
+
+    def __init__(
+        self,
+        path: str = ".cache/search_cache.sqlite",
+        max_entries: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        """
+        Args:
+            path: SQLite文件路径
+            max_entries: 最多缓存的查询数
+            max_bytes: 缓存结果的最大总字节数
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.writes = 0
+        self.evictions = 0
+        self.api_calls_avoided = 0
+        self._stats_lock = threading.Lock()
+        self._db = SQLiteDatabase(path)
+        self._budget = LRUBudget(self._db, "search_results", max_entries, max_bytes)
+
+        with self._db.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_results (
+                    key TEXT PRIMARY KEY,
+                    engine_type TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    results TEXT NOT NULL,
+                    api_calls INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_search_results_accessed_at ON search_results (accessed_at)"
+            )
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """合并多余的空白字符; 不改变大小写, 因为arXiv等引擎的查询语法(AND/OR)区分大小写"""
+        return " ".join(query.split())
+
+    @classmethod
+    def make_key(cls, engine_type: str, query: str, params: Dict[str, Any]) -> str:
+        """
+        Args:
+            engine_type: 搜索引擎类型
+            query: 查询语句
+            params: 影响搜索结果的参数, 值为None的参数会被忽略
+        """
+        payload = json.dumps(
+            {
+                "engine_type": engine_type,
+                "query": cls.normalize_query(query),
+                "params": _normalize_value({k: v for k, v in params.items() if v is not None}),
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, ttl: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Args:
+            key: make_key生成的key
+            ttl: 记录的有效期(秒), None表示永不过期
+
+        Returns:
+            缓存的结果列表, 不存在或已过期时返回None
+        """
+        now = time.time()
+        expired = False
+        with self._db.connect() as conn:
+            row = conn.execute(
+                "SELECT results, api_calls, created_at, size FROM search_results WHERE key = ?",
+                (key,),
+            ).fetchone()
+            results = None
+            if row is not None and ttl is not None and now - row[2] > ttl:
+                self._delete(conn, key, row[3])
+                row, expired = None, True
+            if row is not None:
+                try:
+                    results = json.loads(row[0])
+                except (TypeError, ValueError):
+                    logger.warning(f"Unreadable search cache entry dropped, key={key}")
+                    self._delete(conn, key, row[3])
+                    row = None
+        if row is not None:
+            self._budget.touch(key)
+
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+                self.expired += expired
+            else:
+                self.hits += 1
+                self.api_calls_avoided += row[1]
+        return results
+
+    def _delete(self, conn, key: str, size: int):
+        conn.execute("DELETE FROM search_results WHERE key = ?", (key,))
+        self._budget.removed(size)
+
+    def put(self, key: str, engine_type: str, query: str, results: List[Dict[str, Any]], api_calls: int = 1):
+        """
+        Args:
+            results: 结果列表, 每个元素是SearchResult的字段字典
+            api_calls: 得到这批结果所花费的API请求数, 命中时计入api_calls_avoided
+        """
+        now = time.time()
+        blob = json.dumps(results, ensure_ascii=False, default=str)
+        size = len(blob.encode("utf-8"))
+        with self._db.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_results "
+                "(key, engine_type, query, results, api_calls, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, engine_type, query, blob, api_calls, size, now, now),
+            )
+            evicted = self._budget.added(conn, size)
+        with self._stats_lock:
+            self.writes += 1
+            self.evictions += evicted
+
+    def clear(self, engine_type: Optional[str] = None):
+        """清空缓存, 指定engine_type时只清空该引擎的记录"""
+        with self._db.connect() as conn:
+            if engine_type is None:
+                conn.execute("DELETE FROM search_results")
+            else:
+                conn.execute("DELETE FROM search_results WHERE engine_type = ?", (engine_type,))
+        self._budget.cleared()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "api_calls_avoided": self.api_calls_avoided,
+        }
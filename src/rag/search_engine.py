@@ -1,13 +1,19 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional, Union
-from dataclasses import dataclass
+from typing import Dict, Iterator, List, Any, Optional, Union
+from dataclasses import asdict, dataclass
 
 import arxiv
 from src.utils.logger import SearchLogger
-from rag.config import ArxivConfig, GoogleScholarConfig, ConfigFactory, SearchEngineType
+from src.utils.rate_limiter import TokenBucket
+from src.rag.crawl_cache import normalize_url
+from src.rag.config import ArxivConfig, BaseEngineConfig, GoogleScholarConfig, ConfigFactory, SearchEngineType
+from src.rag.search_cache import SearchResultCache
 import requests
 import json
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
 
 
 @dataclass
@@ -20,6 +26,18 @@ class SearchResult:
     metadata: Dict[str, Any] = None
 
 
+class IncompleteSearchResults(list):
+    """
+    搜索中途出错(例如某一页请求失败)时返回的部分结果
+
+    本身就是结果列表, 调用方可以照常使用; 额外的error记录出错原因, CachedSearchEngine不会缓存这类结果
+    """
+
+    def __init__(self, results: List[SearchResult] = (), error: str = ""):
+        super().__init__(results)
+        self.error = error
+
+
 class SearchEngine(ABC):
     
     @abstractmethod
@@ -55,15 +73,40 @@ class ArxivSearchEngine(SearchEngine, AcademicSearchStrategy):
         if max_results:
             self.config.max_results = max_results
         self.logger = SearchLogger("arxiv_engine")
+
+        # 每个引擎持有一个长期复用的client, client内部负责分页、请求间隔和重试
+        self.client = arxiv.Client(
+            page_size=self.config.page_size,
+            delay_seconds=self.config.delay_seconds,
+            num_retries=self.config.num_retries,
+        )
+        self.client.query_url_format = f"{self.config.base_url}?{{}}"
     
     def search(self, query: str, **kwargs) -> List[SearchResult]:
         self.logger.info("开始Arxiv搜索", query=query, **kwargs)
         return self.search_papers(query, **kwargs)
     
     def search_papers(self, query: str, **kwargs) -> List[SearchResult]:
-        # 创建arxiv client
-        client = arxiv.Client()
+        papers = self.iter_papers(query, **kwargs)
 
+        results = []
+        try:
+            for search_result in papers:
+                results.append(search_result)
+            
+            self.logger.info(f"arXiv搜索完成", found_results=len(results))
+            return results
+        except Exception as e:
+            self.logger.error(f"arXiv搜索出错", error=str(e), query=query, found_results=len(results))
+            return IncompleteSearchResults(results, str(e))
+
+    def iter_papers(self, query: str, **kwargs) -> Iterator[SearchResult]:
+        """
+        以生成器的形式逐条返回搜索结果
+
+        client按page_size分页请求, 每页之间至少间隔delay_seconds, 因此较大的max_results(例如200+)
+        也只需要少量请求, 调用方可以在拿到第一页后就开始处理
+        """
         max_results = kwargs.get('max_results', self.config.max_results)
         sort_by = kwargs.get('sort_by', self.config.sort_by)
 
@@ -73,11 +116,62 @@ class ArxivSearchEngine(SearchEngine, AcademicSearchStrategy):
             error_msg = f"max_results必须是正整数，当前值: {max_results}, 类型: {type(max_results).__name__}"
             self.logger.error(error_msg)
             raise TypeError(error_msg)
+
+        sort_by = self._resolve_sort_by(sort_by)
         
-        if max_results > 10:
-            self.logger.warning(f"max_results超过最大限制，已自动调整为10，原值: {max_results}")
-            max_results = 10
-            
+        # 构建arXiv API请求
+        search = arxiv.Search(
+            query=query,
+            max_results=max_results,
+            sort_by=sort_by,
+        )
+        
+        self.logger.debug("执行arXiv搜索", query=query, max_results=max_results, sort_by=sort_by)
+        return self._iter_results(search)
+
+    def _iter_results(self, search: arxiv.Search) -> Iterator[SearchResult]:
+        for result in self.client.results(search):
+            yield self._to_search_result(result)
+
+    def fetch_by_ids(self, id_list: List[str]) -> List[SearchResult]:
+        """
+        按arXiv id批量查询论文, 每次请求最多包含id_batch_size个id
+
+        Args:
+            id_list: arXiv id列表, 例如["1706.03762", "2005.14165v4"]
+
+        Returns:
+            查询到的论文, 顺序与arXiv返回的顺序一致
+        """
+        results = []
+        batch_size = max(self.config.id_batch_size, 1)
+        for start in range(0, len(id_list), batch_size):
+            batch = id_list[start:start + batch_size]
+            search = arxiv.Search(id_list=batch, max_results=len(batch))
+            try:
+                for result in self.client.results(search):
+                    results.append(self._to_search_result(result))
+            except Exception as e:
+                self.logger.error("arXiv按id查询出错", error=str(e), batch_start=start, batch_size=len(batch))
+
+        self.logger.info("arXiv按id查询完成", requested_ids=len(id_list), found_results=len(results))
+        return results
+
+    def _to_search_result(self, result: arxiv.Result) -> SearchResult:
+        return SearchResult(
+            title=result.title,
+            url=result.entry_id,
+            snippet=result.summary,
+            source="arXiv",
+            metadata={
+                "authors": [author.name for author in result.authors],
+                "published": str(result.published),
+                "categories": result.categories,
+                "pdfUrl": result.pdf_url
+            }
+        )
+
+    def _resolve_sort_by(self, sort_by) -> arxiv.SortCriterion:
         # 检查 sort_by 类型
         if not sort_by: # 因为默认是没有排序规则的，所以这里需要加上一个arXiv的排序规则
             sort_by = arxiv.SortCriterion.Relevance
@@ -106,41 +200,15 @@ class ArxivSearchEngine(SearchEngine, AcademicSearchStrategy):
                 error_msg = f"sort_by必须是arxiv.SortCriterion类型或有效的字符串值，当前值: {sort_by}, 类型: {type(sort_by).__name__}"
                 self.logger.error(error_msg)
                 raise TypeError(error_msg)
-        
-        # 构建arXiv API请求
-        search = arxiv.Search(
-            query=query,
-            max_results=max_results,
-            sort_by=sort_by,
-        )
-        
-        self.logger.debug("执行arXiv搜索", query=query, max_results=max_results, sort_by=sort_by)
-        
-        try:
-            results = []
-            for result in client.results(search):
-                search_result = SearchResult(
-                    title=result.title,
-                    url=result.entry_id,
-                    snippet=result.summary,
-                    source="arXiv",
-                    metadata={
-                        "authors": [author.name for author in result.authors],
-                        "published": str(result.published),
-                        "categories": result.categories
-                    }
-                )
-                results.append(search_result)
-            
-            self.logger.info(f"arXiv搜索完成", found_results=len(results))
-            return results
-        except Exception as e:
-            self.logger.error(f"arXiv搜索出错", error=str(e), query=query)
-            return []
+        return sort_by
 
 
 class GoogleScholarSearchEngine(SearchEngine, AcademicSearchStrategy):
     """Google Scholar搜索引擎实现"""
+
+    # 进程内所有实例共享的限流器, 按API地址区分
+    _rate_limiters: Dict[str, TokenBucket] = {}
+    _rate_limiters_lock = threading.Lock()
     
     def __init__(
             self, 
@@ -154,6 +222,24 @@ class GoogleScholarSearchEngine(SearchEngine, AcademicSearchStrategy):
         if max_results:
             self.config.max_results = max_results
         self.logger = SearchLogger("google_scholar_engine")
+
+        # 复用连接的Session, 连接池大小与并发页数一致
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=max(self.config.max_concurrent_pages, 1)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.rate_limiter = self._get_rate_limiter(self.config)
+
+    @classmethod
+    def _get_rate_limiter(cls, config: GoogleScholarConfig) -> TokenBucket:
+        with cls._rate_limiters_lock:
+            if config.base_url not in cls._rate_limiters:
+                cls._rate_limiters[config.base_url] = TokenBucket(
+                    rate=config.requests_per_second, capacity=config.burst
+                )
+            return cls._rate_limiters[config.base_url]
     
     def search(self, query: str, **kwargs) -> List[SearchResult]:
         """实现基类的搜索方法，调用学术搜索策略"""
@@ -161,7 +247,12 @@ class GoogleScholarSearchEngine(SearchEngine, AcademicSearchStrategy):
         return self.search_papers(query, **kwargs)
     
     def search_papers(self, query: str, **kwargs) -> List[SearchResult]:
-        """实现Google Scholar搜索，支持分页获取多个结果"""
+        """
+        实现Google Scholar搜索，支持分页获取多个结果
+
+        各页在线程池中并发请求, 请求速率受共享令牌桶限制; 一旦连续的前若干页已凑够max_results,
+        或者某一页没有结果/请求失败, 就取消剩余尚未完成的页
+        """
         max_results = kwargs.get('max_results', self.config.max_results)
         timeout = kwargs.get('timeout', self.config.timeout)
         api_key = kwargs.get('api_key', self.config.api_key)
@@ -171,7 +262,6 @@ class GoogleScholarSearchEngine(SearchEngine, AcademicSearchStrategy):
             self.logger.error(error_msg)
             raise ValueError(error_msg)
               
-        url = self.config.base_url
         base_payload = {
             "q": query,
             "hl": self.config.hl,
@@ -191,112 +281,241 @@ class GoogleScholarSearchEngine(SearchEngine, AcademicSearchStrategy):
         
         self.logger.debug("准备执行Google Scholar分页搜索", query=query, max_results=max_results)
         
-        all_results = []
-        current_page = 1
         results_per_page = 10  # Google Scholar API通常每页返回10条结果
         
         # 计算需要请求的最大的页数
         max_pages = (max_results + results_per_page - 1) // results_per_page
-        
+
+        pages: Dict[int, Optional[List[SearchResult]]] = {}
+        errors: Dict[int, str] = {}
+        stop_event = threading.Event()
+        executor = ThreadPoolExecutor(
+            max_workers=max(min(self.config.max_concurrent_pages, max_pages), 1),
+            thread_name_prefix="google_scholar_page",
+        )
+        futures = {
+            executor.submit(self._fetch_page, page, base_payload, headers, timeout, stop_event): page
+            for page in range(1, max_pages + 1)
+        }
         try:
-            while len(all_results) < max_results and current_page <= max_pages:
-                payload = base_payload.copy()
-                payload["page"] = current_page
-                
-                self.logger.debug(f"请求第{current_page}页搜索结果", payload=payload)
-                
-                response = requests.request(
-                    "POST", 
-                    url, 
-                    headers=headers, 
-                    data=json.dumps(payload),
-                    timeout=timeout
-                )
-                response.raise_for_status()
-                response_data = response.json()
-                
-                papers = response_data.get('organic', [])
-                
-                # 如果返回的论文为空，说明没有更多结果了
-                if not papers:
-                    self.logger.debug(f"第{current_page}页无结果，停止请求")
+            for future in as_completed(futures):
+                page = futures[future]
+                try:
+                    pages[page] = future.result()
+                except requests.exceptions.Timeout:
+                    self.logger.error("Google Scholar搜索超时", timeout=timeout, query=query, current_page=page)
+                    pages[page] = None
+                    errors[page] = f"第{page}页请求超时"
+                except requests.exceptions.HTTPError as e:
+                    status_code = getattr(e.response, 'status_code', None)
+                    self.logger.error(f"Google Scholar HTTP错误", 
+                                     error=str(e), 
+                                     status_code=status_code, 
+                                     query=query,
+                                     current_page=page)
+                    pages[page] = None
+                    errors[page] = f"第{page}页HTTP错误: {e}"
+                except Exception as e:
+                    self.logger.error(f"Google Scholar搜索出错", 
+                                     error=str(e), 
+                                     query=query,
+                                     current_page=page)
+                    pages[page] = None
+                    errors[page] = f"第{page}页请求出错: {e}"
+
+                if self._pages_complete(pages, max_results, max_pages):
                     break
-                
-                # 处理搜索得到的结果
-                for paper in papers:
-                    metadata = {
-                        "year": paper.get("year"),
-                        "citedBy": paper.get("citedBy")
-                    }
-                    
-                    if "pdfUrl" in paper:
-                        metadata["pdfUrl"] = paper.get("pdfUrl")
-                    
-                    if "id" in paper:
-                        metadata["id"] = paper.get("id")
-                    
-                    if "publicationInfo" in paper:
-                        metadata["publicationInfo"] = paper.get("publicationInfo")
-                    
-                    search_result = SearchResult(
-                        title=paper.get("title", ""),
-                        url=paper.get("link", ""),
-                        snippet=paper.get("snippet", ""),
-                        source="Google Scholar",
-                        metadata=metadata
-                    )
-                    all_results.append(search_result)
-                    
-                    # 如果已经达到了请求的结果数量，就停止处理
-                    if len(all_results) >= max_results:
-                        break
-                
-                # 请求下一页
-                current_page += 1
-                
-                # 添加请求间隔，避免触发API限制
-                if current_page <= max_pages and len(all_results) < max_results:
-                    time.sleep(1)  # 每次请求间隔1秒
-            
-            self.logger.info("Google Scholar搜索完成", 
-                             found_results=len(all_results), 
-                             requested_pages=current_page-1,
-                             max_results=max_results)
-            
-            # 确保结果数量不超过max_results
-            return all_results[:max_results]
+        finally:
+            # 取消剩余的页: 未开始的直接取消, 正在等待令牌的在发请求前退出
+            stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        all_results = []
+        requested_pages = 0
+        error = None
+        for page in range(1, max_pages + 1):
+            papers = pages.get(page)
+            if not papers:
+                # 空页表示没有更多结果, 失败的页则意味着后面的结果缺失
+                error = errors.get(page)
+                break
+            requested_pages = page
+            all_results.extend(papers)
+            if len(all_results) >= max_results:
+                break
+
+        self.logger.info("Google Scholar搜索完成", 
+                         found_results=len(all_results), 
+                         requested_pages=requested_pages,
+                         max_results=max_results)
         
-        except requests.exceptions.Timeout:
-            self.logger.error("Google Scholar搜索超时", timeout=timeout, query=query)
-            return all_results if all_results else []
-            
-        except requests.exceptions.HTTPError as e:
-            status_code = getattr(e.response, 'status_code', None)
-            self.logger.error(f"Google Scholar HTTP错误", 
-                             error=str(e), 
-                             status_code=status_code, 
-                             query=query,
-                             current_page=current_page)
-            return all_results if all_results else []
-            
-        except Exception as e:
-            self.logger.error(f"Google Scholar搜索出错", 
-                             error=str(e), 
-                             query=query,
-                             current_page=current_page)
-            return all_results if all_results else []
+        # 确保结果数量不超过max_results
+        if error is not None:
+            return IncompleteSearchResults(all_results[:max_results], error)
+        return all_results[:max_results]
+
+    def _pages_complete(self, pages: Dict[int, Optional[List[SearchResult]]], max_results: int, max_pages: int) -> bool:
+        """连续的前若干页是否已经足够(凑够max_results, 或遇到空页/失败页)"""
+        collected = 0
+        for page in range(1, max_pages + 1):
+            if page not in pages:
+                return False
+            papers = pages[page]
+            if not papers:
+                # 如果返回的论文为空，说明没有更多结果了
+                return True
+            collected += len(papers)
+            if collected >= max_results:
+                return True
+        return True
+
+    def _fetch_page(
+            self,
+            page: int,
+            base_payload: Dict[str, Any],
+            headers: Dict[str, str],
+            timeout: int,
+            stop_event: threading.Event
+        ) -> Optional[List[SearchResult]]:
+        """请求单页搜索结果, 搜索已结束时返回None"""
+        if stop_event.is_set():
+            return None
+        self.rate_limiter.acquire()
+        if stop_event.is_set():
+            return None
+
+        payload = base_payload.copy()
+        payload["page"] = page
+        
+        self.logger.debug(f"请求第{page}页搜索结果", payload=payload)
+
+        response = self.session.post(
+            self.config.base_url,
+            headers=headers,
+            data=json.dumps(payload),
+            timeout=timeout
+        )
+        response.raise_for_status()
+        response_data = response.json()
+
+        return [self._parse_paper(paper) for paper in response_data.get('organic', [])]
+
+    def _parse_paper(self, paper: Dict[str, Any]) -> SearchResult:
+        metadata = {
+            "year": paper.get("year"),
+            "citedBy": paper.get("citedBy")
+        }
+        
+        if "pdfUrl" in paper:
+            metadata["pdfUrl"] = paper.get("pdfUrl")
+        
+        if "id" in paper:
+            metadata["id"] = paper.get("id")
+        
+        if "publicationInfo" in paper:
+            metadata["publicationInfo"] = paper.get("publicationInfo")
+        
+        return SearchResult(
+            title=paper.get("title", ""),
+            url=paper.get("link", ""),
+            snippet=paper.get("snippet", ""),
+            source="Google Scholar",
+            metadata=metadata
+        )
+
+
+class CachedSearchEngine(SearchEngine):
+    """
+    为任意搜索引擎加上持久化结果缓存的包装器
+
+    缓存key由(引擎类型, query, 规范化后的参数)组成, 参数包括本次调用的kwargs以及引擎配置中会影响结果的字段,
+    因此max_results、sort_by等配置不同的引擎不会共用缓存; api_key、超时以及分页/限流相关的字段不影响结果, 不计入key。
+    空结果和引擎中途出错时返回的IncompleteSearchResults不缓存, 避免残缺的结果在有效期内被反复使用。其余属性和方法(如iter_papers、fetch_by_ids)直接转发给被包装的引擎。
+    """
+
+    # 引擎配置中不影响搜索结果的字段
+    _NON_RESULT_FIELDS = {
+        "api_key", "timeout", "search_timeout", "cache_ttl", "page_size", "delay_seconds", "num_retries",
+        "id_batch_size", "max_concurrent_pages", "requests_per_second", "burst",
+    }
+
+    def __init__(
+            self,
+            engine: SearchEngine,
+            cache: SearchResultCache,
+            engine_type: str,
+            ttl: Optional[float] = None
+        ):
+        """
+        Args:
+            engine: 被包装的搜索引擎
+            cache: 搜索结果缓存, 可以被多个引擎共享
+            engine_type: 搜索引擎类型, 作为缓存key的一部分
+            ttl: 缓存有效期(秒), 默认使用引擎配置中的cache_ttl
+        """
+        self.engine = engine
+        self.cache = cache
+        self.engine_type = engine_type
+        self.config = getattr(engine, "config", None)
+        self.ttl = ttl if ttl is not None else getattr(self.config, "cache_ttl", None)
+        self.logger = SearchLogger(f"{engine_type}_cache")
+
+    def __getattr__(self, name: str):
+        # 只有在自身找不到属性时才会调用, 用于转发被包装引擎的其余方法
+        if name == "engine":
+            raise AttributeError(name)
+        return getattr(self.engine, name)
+
+    def search(self, query: str, **kwargs) -> List[SearchResult]:
+        key = self.cache.make_key(self.engine_type, query, self._cache_params(kwargs))
+        cached = self.cache.get(key, ttl=self.ttl)
+        if cached is not None:
+            self.logger.info("搜索结果缓存命中", query=query, results=len(cached))
+            return [SearchResult(**fields) for fields in cached]
+
+        results = self.engine.search(query, **kwargs)
+        if isinstance(results, IncompleteSearchResults):
+            self.logger.warning("搜索结果不完整, 不写入缓存", query=query, results=len(results), error=results.error)
+        elif results:
+            self.cache.put(
+                key,
+                self.engine_type,
+                query,
+                [asdict(result) for result in results],
+                api_calls=self._estimate_api_calls(len(results)),
+            )
+        return results
+
+    def _cache_params(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        params = {}
+        if self.config is not None:
+            params.update(
+                (k, v) for k, v in asdict(self.config).items() if k not in self._NON_RESULT_FIELDS
+            )
+        params.update((k, v) for k, v in kwargs.items() if k not in self._NON_RESULT_FIELDS)
+        return params
+
+    def _estimate_api_calls(self, result_count: int) -> int:
+        # arXiv每次请求返回page_size条结果, Google Scholar每页10条
+        per_request = getattr(self.config, "page_size", None) or 10
+        return max((result_count + per_request - 1) // per_request, 1)
 
 
 class SearchEngineFactory:
     """搜索引擎工厂，负责创建和管理搜索引擎实例"""
     
     @staticmethod
-    def create_engine(engine_type: str, **engine_config) -> SearchEngine:
+    def create_engine(
+            engine_type: str,
+            cache: Optional[SearchResultCache] = None,
+            **engine_config
+        ) -> SearchEngine:
         """
         创建搜索引擎实例
         
         Args:
             engine_type: 搜索引擎类型('arxiv', 'google_scholar'等)
+            cache: 搜索结果缓存, 提供时返回包装了缓存的引擎, 有效期取配置中的cache_ttl
             **engine_config: 搜索引擎具体配置参数
             
         Returns:
@@ -306,13 +525,13 @@ class SearchEngineFactory:
         config = ConfigFactory.create_config(engine_type, **engine_config)
         
         if engine_type == SearchEngineType.ARXIV.value:
-            return ArxivSearchEngine(
+            engine = ArxivSearchEngine(
                 config=config,
                 api_key=engine_config.get("api_key"),
                 max_results=engine_config.get("max_results")
             )
         elif engine_type == SearchEngineType.GOOGLE_SCHOLAR.value:
-            return GoogleScholarSearchEngine(
+            engine = GoogleScholarSearchEngine(
                 config=config,
                 api_key=engine_config.get("api_key"),
                 max_results=engine_config.get("max_results")
@@ -320,21 +539,234 @@ class SearchEngineFactory:
         else:
             raise ValueError(f"不支持的搜索引擎类型: {engine_type}")
 
+        if cache is not None:
+            return CachedSearchEngine(engine, cache, engine_type)
+        return engine
+
+
+_ARXIV_ID_PATTERN = re.compile(
+    r"arxiv\.org/(?:abs|pdf)/((?:\d{4}\.\d{4,5})|(?:[a-z\-]+(?:\.[a-z]{2})?/\d{7}))(?:v\d+)?",
+    re.IGNORECASE,
+)
+_DOI_PATTERN = re.compile(r"\b(10\.\d{4,9}/[^\s\"<>?#]+)", re.IGNORECASE)
+_YEAR_PATTERN = re.compile(r"\b(?:19|20)\d{2}\b")
+
+
+def normalize_title(title: str) -> str:
+    """标题归一化: 小写, 去掉标点和多余空白"""
+    return " ".join(re.sub(r"[^\w\s]", " ", (title or "").lower()).split())
+
+
+def result_identity_keys(result: SearchResult) -> List[str]:
+    """
+    提取一条搜索结果的身份标识, 用于跨引擎去重
+
+    依次尝试DOI、arXiv id、规范化url, 以及归一化标题加发表年份、归一化标题加第一作者姓氏,
+    任意一个标识相同的结果视为同一篇论文。标题不单独作为标识, 否则"Introduction"之类的通用标题
+    会把不同的论文合并在一起; 同一篇论文在不同引擎中的url往往不同(出版社页面和arXiv摘要页), 因此用年份和作者佐证
+    """
+    metadata = result.metadata or {}
+    keys = []
+
+    doi = metadata.get("doi")
+    if not doi:
+        match = _DOI_PATTERN.search(result.url or "")
+        doi = match.group(1) if match else None
+    if doi:
+        keys.append(f"doi:{doi.lower().rstrip('.')}")
+
+    for url in (result.url, metadata.get("pdfUrl")):
+        match = _ARXIV_ID_PATTERN.search(url or "")
+        if match:
+            keys.append(f"arxiv:{match.group(1).lower()}")
+            break
+
+    if result.url:
+        keys.append(f"url:{normalize_url(result.url)}")
+
+    title = normalize_title(result.title)
+    if title:
+        year = _publication_year(metadata)
+        if year:
+            keys.append(f"title:{title}|year:{year}")
+        author = _first_author_surname(metadata)
+        if author:
+            keys.append(f"title:{title}|author:{author}")
+    return keys
+
+
+def _publication_year(metadata: Dict[str, Any]) -> Optional[str]:
+    """发表年份: Google Scholar的year, 或arXiv的published日期"""
+    for value in (metadata.get("year"), metadata.get("published")):
+        match = _YEAR_PATTERN.search(str(value or ""))
+        if match:
+            return match.group(0)
+    return None
+
+
+def _first_author_surname(metadata: Dict[str, Any]) -> Optional[str]:
+    """
+    第一作者的姓氏(小写): arXiv的authors列表, 或Google Scholar的publicationInfo,
+    后者形如"A Vaswani, N Shazeer… - Advances in neural information processing systems, 2017 - neurips.cc"
+    """
+    authors = metadata.get("authors")
+    if authors:
+        first = authors[0]
+    else:
+        first = str(metadata.get("publicationInfo") or "").split(" - ")[0].split(",")[0]
+    words = re.sub(r"[^\w\s]|\d|_", " ", str(first or "")).lower().split()
+    return words[-1] if words else None
+
+
+def merge_search_results(results: List[SearchResult]) -> List[SearchResult]:
+    """
+    合并重复的搜索结果, 保持首次出现的顺序
+
+    同一篇论文的多条结果会融合为一条: 以第一条为基础, 补全空字段, 保留最长的摘要,
+    合并所有来源的metadata(已有的键不会被覆盖), 并在metadata中记录sources和urls
+    """
+    groups: List[List[SearchResult]] = []
+    group_of_key: Dict[str, int] = {}
+
+    for result in results:
+        keys = result_identity_keys(result)
+        matched = sorted({group_of_key[k] for k in keys if k in group_of_key})
+        if not matched:
+            index = len(groups)
+            groups.append([result])
+        else:
+            # 一条结果可能同时连接多个已有分组(例如DOI匹配一组, 标题匹配另一组), 将它们合并
+            index = matched[0]
+            for other in matched[1:]:
+                groups[index].extend(groups[other])
+                groups[other] = []
+                for key, value in group_of_key.items():
+                    if value == other:
+                        group_of_key[key] = index
+            groups[index].append(result)
+        for key in keys:
+            group_of_key[key] = index
+
+    return [_fuse_results(group) for group in groups if group]
+
+
+def collect_pdf_urls(results: List[SearchResult]) -> Dict[str, str]:
+    """
+    收集搜索结果中的PDF链接, 返回 {结果url: PDF链接}, 作为AsyncCrawler.run的pdf_urls参数
+    """
+    return {
+        result.url: result.metadata["pdfUrl"]
+        for result in results
+        if result.url and result.metadata and result.metadata.get("pdfUrl")
+    }
+
+
+def _fuse_results(group: List[SearchResult]) -> SearchResult:
+    if len(group) == 1:
+        return group[0]
+
+    base = group[0]
+    metadata = {}
+    sources, urls = [], []
+    for result in group:
+        for key, value in (result.metadata or {}).items():
+            if metadata.get(key) in (None, "", [], {}):
+                metadata[key] = value
+        if result.source not in sources:
+            sources.append(result.source)
+        if result.url and result.url not in urls:
+            urls.append(result.url)
+    metadata["sources"] = sources
+    metadata["urls"] = urls
+
+    return SearchResult(
+        title=base.title or next((r.title for r in group if r.title), ""),
+        url=base.url or next((r.url for r in group if r.url), ""),
+        snippet=max((r.snippet or "" for r in group), key=len),
+        source=base.source,
+        metadata=metadata,
+    )
+
 
 class CompositeSearchEngine(SearchEngine):
     """组合多个搜索引擎的复合引擎"""
     
-    def __init__(self, engines: List[SearchEngine] = None):
+    def __init__(
+            self,
+            engines: List[SearchEngine] = None,
+            timeout: Optional[float] = None,
+            deduplicate: bool = True
+        ):
+        """
+        Args:
+            engines: 搜索引擎列表
+            timeout: 每个引擎完成整个搜索(包括所有分页请求)的时间预算(秒), 默认使用引擎配置中的search_timeout。
+                引擎配置中的timeout是单次HTTP请求的超时, 不用作整个搜索的预算
+            deduplicate: 是否按DOI/arXiv id/url/标题加年份或第一作者对合并后的结果去重
+        """
         self.engines = engines or []
+        self.timeout = timeout
+        self.deduplicate = deduplicate
+        self.logger = SearchLogger("composite_engine")
     
     def add_engine(self, engine: SearchEngine):
         """添加搜索引擎"""
         self.engines.append(engine)
     
     def search(self, query: str, **kwargs) -> List[SearchResult]:
-        """从所有添加的引擎中获取并合并搜索结果"""
-        all_results = []
-        for engine in self.engines:
-            results = engine.search(query, **kwargs)
-            all_results.extend(results)
-        return all_results
\ No newline at end of file
+        """
+        并发地从所有添加的引擎中获取并合并搜索结果
+
+        每个引擎有独立的超时时间, 超时或出错的引擎会被跳过, 只返回其余引擎的结果(partial results),
+        此时以及任一引擎的结果不完整时, 返回IncompleteSearchResults
+        """
+        if not self.engines:
+            return []
+
+        start_time = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=len(self.engines), thread_name_prefix="composite_search")
+        futures = [executor.submit(engine.search, query, **kwargs) for engine in self.engines]
+
+        results_per_engine = []
+        errors = []
+        try:
+            for engine, future in zip(self.engines, futures):
+                engine_name = type(engine).__name__
+                remaining = self._engine_timeout(engine) - (time.monotonic() - start_time)
+                try:
+                    results = future.result(timeout=max(remaining, 0))
+                    results_per_engine.append(results)
+                    if isinstance(results, IncompleteSearchResults):
+                        errors.append(f"{engine_name}: {results.error}")
+                except FuturesTimeoutError:
+                    future.cancel()
+                    errors.append(f"{engine_name}: 超时")
+                    self.logger.warning("搜索引擎超时, 跳过其结果", engine=engine_name, query=query)
+                except Exception as e:
+                    errors.append(f"{engine_name}: {e}")
+                    self.logger.error("搜索引擎出错, 跳过其结果", engine=engine_name, error=str(e), query=query)
+        finally:
+            # 不等待超时的引擎线程结束
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        all_results = [result for results in results_per_engine for result in results]
+        if self.deduplicate:
+            merged = merge_search_results(all_results)
+        else:
+            merged = all_results
+
+        self.logger.info("复合搜索完成",
+                         engines=len(self.engines),
+                         succeeded_engines=len(results_per_engine),
+                         raw_results=len(all_results),
+                         merged_results=len(merged),
+                         elapsed=f"{time.monotonic() - start_time:.2f}s")
+        if errors:
+            return IncompleteSearchResults(merged, "; ".join(errors))
+        return merged
+
+    def _engine_timeout(self, engine: SearchEngine) -> float:
+        if self.timeout is not None:
+            return self.timeout
+        config = getattr(engine, "config", None)
+        return getattr(config, "search_timeout", None) or BaseEngineConfig.search_timeout
@@ -0,0 +1,456 @@
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+from src.request import CompletionCache, RequestWrapper
+from src.request.token_counter import usage_stage
+from src.rag.chunking import TokenChunker
+from src.rag.prompts.survey_prompt_en import (
+    OUTLINE_MERGE_PROMPT,
+    OUTLINE_PROMPT,
+    PAPER_NOTES_PROMPT,
+    SECTION_NOTES_PROMPT,
+    SECTION_WRITE_PROMPT,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SECTION_PATTERN = re.compile(r"<SECTION>(.*?)</SECTION>", re.DOTALL)
+_CITATION_PATTERN = re.compile(r"\[(\d+(?:\s*,\s*\d+)*)\]")
+
+
+class SurveyGenerator:
+    """
+    MapReduce survey generation over the crawl output of AsyncCrawler.
+
+    For every topic line of the crawl output file:
+    1. Map: every paper (or every chunk of a long paper) is turned into structured notes,
+       all papers in parallel. Notes are appended to `<name>.notes.jsonl` as they finish.
+    2. Reduce to an outline: notes are packed into groups that fit one prompt, each group is
+       drafted into a partial outline, and partial outlines are merged level by level until a
+       single outline remains. It is saved to `<name>.outline.json`.
+    3. Reduce to sections: the notes cited by each section are condensed level by level until
+       they fit one prompt, then the sections are written in parallel. Sections are appended to
+       `<name>.md` in outline order as soon as all sections before them are done.
+
+    Every prompt is measured with TokenChunker and kept under `max_prompt_tokens`. Calls share
+    one RequestWrapper, are bounded by `max_concurrency`, and are attributed to the usage stages
+    "map", "outline", "condense" and "section".
+    """
+
+    # Configuration constants
+    MAX_CONCURRENT_CALLS = 20
+    MAX_PROMPT_TOKENS = 16000
+    MAP_CHUNK_TOKENS = 6000  # papers above this are mapped in overlapping chunks
+    MAP_CHUNK_OVERLAP_TOKENS = 200
+    MAX_SECTIONS = 8
+    OUTLINE_NOTE_TOKENS = 500  # notes of a paper shown to the outline calls, sections see them in full
+    MAX_CONDENSE_ROUNDS = 4
+
+    def __init__(
+        self,
+        model="gemini-2.0-flash-thinking-exp-01-21",
+        infer_type="OpenAI",
+        port: Optional[int] = None,
+        completion_cache: Optional[CompletionCache] = None,
+        max_concurrency: int = MAX_CONCURRENT_CALLS,
+        max_prompt_tokens: int = MAX_PROMPT_TOKENS,
+        map_chunk_tokens: int = MAP_CHUNK_TOKENS,
+        max_sections: int = MAX_SECTIONS,
+    ):
+        """
+        Args:
+            model (str): Model identifier used for every call
+            infer_type (str): Inference type, e.g., "OpenAI" or "local"
+            port (int, optional): Port of the local inference server when infer_type is "local"
+            completion_cache (CompletionCache, optional): Persistent completion cache, so a rerun
+                over the same crawl output only pays for the calls that changed
+            max_concurrency (int): Maximum number of calls in flight
+            max_prompt_tokens (int): Token budget of every prompt
+            map_chunk_tokens (int): Maximum tokens of paper content mapped in one call
+            max_sections (int): Maximum number of sections of the survey
+        """
+        self.request_pool = RequestWrapper(
+            model=model, infer_type=infer_type, port=port, cache=completion_cache
+        )
+        self.chunker = TokenChunker(model=model)
+        self.max_concurrency = max_concurrency
+        self.max_prompt_tokens = max_prompt_tokens
+        self.map_chunk_tokens = map_chunk_tokens
+        self.max_sections = max_sections
+        self.call_stats = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def generate(
+        self,
+        crawl_output_file_path: str,
+        output_dir: str,
+        topics: Optional[List[str]] = None,
+    ) -> Dict[str, dict]:
+        """
+        Generate a survey for every topic of a crawl output file, all topics in parallel.
+
+        Args:
+            crawl_output_file_path (str): JSONL file written by AsyncCrawler, one topic per line
+            output_dir (str): Directory receiving the surveys and their intermediate files
+            topics (List[str], optional): Only generate these topics. Defaults to all topics
+
+        Returns:
+            Dict[str, dict]: Summary of every generated topic, see `generate_topic`
+        """
+        process_start_time = time.time()
+        self.call_stats = {}
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        os.makedirs(output_dir, exist_ok=True)
+
+        records = []
+        with open(crawl_output_file_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if topics is None or record["title"] in topics:
+                        records.append(record)
+
+        names = set()
+        jobs = []
+        for record in records:
+            if not record.get("papers"):
+                logger.warning(f"No papers collected for topic, skipped: {record['title']}")
+                continue
+            name = self._file_name(record["title"], names)
+            jobs.append((record["title"], record["papers"], os.path.join(output_dir, name)))
+
+        results = await asyncio.gather(
+            *(self.generate_topic(topic, papers, path) for topic, papers, path in jobs),
+            return_exceptions=True,
+        )
+        summaries = {}
+        for (topic, _, _), result in zip(jobs, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to generate survey for topic {topic}: {result}")
+            else:
+                summaries[topic] = result
+
+        logger.info(f"Generated {len(summaries)}/{len(jobs)} surveys in {time.time() - process_start_time:.2f} seconds")
+        for stage, stats in self.call_stats.items():
+            logger.info(
+                f"Stage {stage}: calls={stats['calls']}, failed={stats['failed']}, "
+                f"prompt tokens={stats['prompt_tokens']}, largest prompt={stats['max_prompt_tokens']}"
+            )
+        logger.info(f"Completion usage:\n{RequestWrapper.usage_summary()}")
+        return summaries
+
+    async def generate_topic(self, topic: str, papers: List[dict], output_path: str) -> dict:
+        """
+        Generate the survey of one topic.
+
+        Args:
+            topic (str): Survey topic
+            papers (List[dict]): Papers with "title", "url" and "txt", as written by AsyncCrawler
+            output_path (str): Markdown file of the survey, intermediate files are written next to it
+
+        Returns:
+            dict: Output path, numbers of papers, notes and sections, and the seconds spent per phase
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        stem = os.path.splitext(output_path)[0]
+        titles = {paper_id: paper.get("title", "") for paper_id, paper in enumerate(papers, 1)}
+        timings = {}
+
+        phase_start = time.time()
+        with open(f"{stem}.notes.jsonl", "w", encoding="utf-8") as notes_file:
+            paper_notes = await self._map_papers(topic, papers, notes_file)
+        timings["map"] = time.time() - phase_start
+        if not paper_notes:
+            raise ValueError("No paper could be mapped to notes")
+        logger.info(f"Mapped {len(paper_notes)}/{len(papers)} papers to notes in {timings['map']:.2f} seconds: {topic}")
+
+        phase_start = time.time()
+        outline = await self._build_outline(topic, paper_notes, titles)
+        timings["outline"] = time.time() - phase_start
+        with open(f"{stem}.outline.json", "w", encoding="utf-8") as f:
+            json.dump({"title": topic, "sections": outline}, f, ensure_ascii=False, indent=2)
+        logger.info(f"Outline with {len(outline)} sections built in {timings['outline']:.2f} seconds: {topic}")
+
+        phase_start = time.time()
+        written = await self._write_sections(topic, outline, paper_notes, titles, papers, output_path)
+        timings["sections"] = time.time() - phase_start
+        logger.info(f"{written}/{len(outline)} sections written in {timings['sections']:.2f} seconds: {output_path}")
+
+        return {
+            "path": output_path,
+            "papers": len(papers),
+            "notes": len(paper_notes),
+            "sections": len(outline),
+            "written_sections": written,
+            "timings": timings,
+        }
+
+    async def _map_papers(self, topic: str, papers: List[dict], notes_file) -> Dict[int, str]:
+        """
+        Map every paper to notes, chunk by chunk for long papers.
+
+        Returns:
+            Dict[int, str]: Notes of every successfully mapped paper, keyed by its 1-based identifier
+        """
+        jobs = []
+        for paper_id, paper in enumerate(papers, 1):
+            title = paper.get("title", "")
+            budget = self._payload_budget(PAPER_NOTES_PROMPT, topic=topic, title=title, content="")
+            chunk_tokens = max(min(self.map_chunk_tokens, budget), 1)
+            overlap = min(self.MAP_CHUNK_OVERLAP_TOKENS, chunk_tokens // 4)
+            for chunk_index, chunk in enumerate(self.chunker.split(paper.get("txt", ""), chunk_tokens, overlap)):
+                jobs.append((paper_id, chunk_index, title, chunk))
+
+        async def map_chunk(paper_id, chunk_index, title, chunk):
+            notes = await self._complete(
+                "map", PAPER_NOTES_PROMPT.format(topic=topic, title=title, content=chunk), "NOTES"
+            )
+            json.dump({"paper": paper_id, "chunk": chunk_index, "title": title, "notes": notes}, notes_file, ensure_ascii=False)
+            notes_file.write("\n")
+            notes_file.flush()
+            return notes
+
+        results = await asyncio.gather(*(map_chunk(*job) for job in jobs), return_exceptions=True)
+        chunk_notes: Dict[int, List[str]] = {}
+        for (paper_id, _, _, _), result in zip(jobs, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to map paper {paper_id} of topic {topic}: {result}")
+                continue
+            chunk_notes.setdefault(paper_id, []).append(result)
+        return {paper_id: "\n".join(notes) for paper_id, notes in sorted(chunk_notes.items())}
+
+    async def _build_outline(self, topic: str, paper_notes: Dict[int, str], titles: Dict[int, str]) -> List[dict]:
+        """
+        Draft partial outlines from groups of notes, then merge them level by level.
+        """
+        budget = self._payload_budget(OUTLINE_PROMPT, topic=topic, notes="", max_sections=self.max_sections)
+        entries = [
+            self._truncate(self._format_notes(paper_id, titles[paper_id], notes), min(budget, self.OUTLINE_NOTE_TOKENS))
+            for paper_id, notes in paper_notes.items()
+        ]
+        prompts = [
+            OUTLINE_PROMPT.format(topic=topic, notes=self._join(entries, group), max_sections=self.max_sections)
+            for group in self._pack(entries, budget)
+        ]
+        outlines = await self._reduce("outline", prompts, paper_notes)
+
+        level = 1
+        while len(outlines) > 1:
+            budget = self._payload_budget(OUTLINE_MERGE_PROMPT, topic=topic, outlines="", max_sections=self.max_sections)
+            # 每个大纲不超过预算的一半, 保证每组至少合并两个, 层数按对数下降
+            texts = [self._truncate(self._format_outline(outline), budget // 2 - 2) for outline in outlines]
+            groups = self._pack(texts, budget)
+            merged = [outlines[group[0]] for group in groups if len(group) == 1]
+            prompts = [
+                OUTLINE_MERGE_PROMPT.format(topic=topic, outlines=self._join(texts, group), max_sections=self.max_sections)
+                for group in groups if len(group) > 1
+            ]
+            logger.info(f"Merging {len(outlines)} partial outlines in {len(prompts)} calls, level {level}: {topic}")
+            outlines = await self._reduce("outline", prompts, paper_notes) + merged
+            level += 1
+
+        if not outlines:
+            raise ValueError("No outline could be built from the notes")
+        return outlines[0]
+
+    async def _reduce(self, stage: str, prompts: List[str], paper_notes: Dict[int, str]) -> List[List[dict]]:
+        results = await asyncio.gather(*(self._complete(stage, prompt) for prompt in prompts), return_exceptions=True)
+        outlines = []
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to build outline: {result}")
+                continue
+            outline = self._parse_outline(result, paper_notes)
+            if not outline:
+                self.call_stats[stage]["failed"] += 1
+                logger.error(f"Invalid outline format, response: {result}")
+                continue
+            outlines.append(outline)
+        return outlines
+
+    async def _write_sections(
+        self,
+        topic: str,
+        outline: List[dict],
+        paper_notes: Dict[int, str],
+        titles: Dict[int, str],
+        papers: List[dict],
+        output_path: str,
+    ) -> int:
+        """
+        Write all sections in parallel and stream them to `output_path` in outline order.
+
+        Returns:
+            int: Number of sections written
+        """
+        finished: Dict[int, Optional[str]] = {}
+        next_index = 0
+        written_texts = []
+
+        with open(output_path, "w", encoding="utf-8") as outfile:
+            outfile.write(f"# {topic}\n\n")
+            outfile.flush()
+
+            async def write(index: int, section: dict):
+                nonlocal next_index
+                try:
+                    finished[index] = await self._write_section(topic, section, paper_notes, titles)
+                except Exception as e:
+                    logger.error(f"Failed to write section {section['title']} of topic {topic}: {e}")
+                    finished[index] = None
+                # 只按大纲顺序输出, 后面的章节等待前面的章节完成
+                while next_index in finished:
+                    text = finished.pop(next_index)
+                    if text is not None:
+                        outfile.write(f"## {outline[next_index]['title']}\n\n{text}\n\n")
+                        outfile.flush()
+                        written_texts.append(text)
+                    next_index += 1
+
+            await asyncio.gather(*(write(index, section) for index, section in enumerate(outline)))
+
+            cited = sorted({
+                int(paper_id)
+                for text in written_texts
+                for group in _CITATION_PATTERN.findall(text)
+                for paper_id in group.split(",")
+                if int(paper_id) in titles
+            })
+            if cited:
+                outfile.write("## References\n\n")
+                for paper_id in cited:
+                    outfile.write(f"[{paper_id}] {titles[paper_id]}. {papers[paper_id - 1].get('url', '')}\n\n")
+        return len(written_texts)
+
+    async def _write_section(
+        self, topic: str, section: dict, paper_notes: Dict[int, str], titles: Dict[int, str]
+    ) -> str:
+        """
+        Condense the notes of the section's papers until they fit one prompt, then write it.
+        Sections citing no known paper are written from the notes of all papers.
+        """
+        fields = {"topic": topic, "section": section["title"], "description": section["description"]}
+        paper_ids = [paper_id for paper_id in section["papers"] if paper_id in paper_notes] or list(paper_notes)
+        entries = [self._format_notes(paper_id, titles[paper_id], paper_notes[paper_id]) for paper_id in paper_ids]
+
+        budget = self._payload_budget(SECTION_WRITE_PROMPT, notes="", **fields)
+        condense_budget = self._payload_budget(SECTION_NOTES_PROMPT, notes="", **fields)
+        rounds = 0
+        while self.chunker.count("\n\n".join(entries)) > budget and rounds < self.MAX_CONDENSE_ROUNDS:
+            entries = [self._truncate(entry, condense_budget // 2 - 2) for entry in entries]
+            groups = self._pack(entries, condense_budget)
+            condensed = await asyncio.gather(
+                *(
+                    self._complete("condense", SECTION_NOTES_PROMPT.format(notes=self._join(entries, group), **fields), "NOTES")
+                    for group in groups
+                ),
+                return_exceptions=True,
+            )
+            condensed_entries = []
+            for group, result in zip(groups, condensed):
+                if isinstance(result, BaseException):
+                    logger.warning(f"Failed to condense notes of section {section['title']}, keeping them: {result}")
+                    condensed_entries.extend(entries[i] for i in group)
+                else:
+                    condensed_entries.append(result)
+            entries = condensed_entries
+            rounds += 1
+
+        notes = self._truncate("\n\n".join(entries), budget)
+        return await self._complete("section", SECTION_WRITE_PROMPT.format(notes=notes, **fields), "CONTENT")
+
+    async def _complete(self, stage: str, prompt: str, tag: Optional[str] = None) -> str:
+        """
+        Run one call of a stage, returning the content of `tag` or the whole response without one.
+        """
+        prompt_tokens = self.chunker.count(prompt)
+        stats = self.call_stats.setdefault(stage, {"calls": 0, "failed": 0, "prompt_tokens": 0, "max_prompt_tokens": 0})
+        stats["calls"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["max_prompt_tokens"] = max(stats["max_prompt_tokens"], prompt_tokens)
+
+        try:
+            async with self._semaphore:
+                with usage_stage(stage):
+                    res = await self.request_pool.acompletion(prompt)
+        except Exception:
+            stats["failed"] += 1
+            raise
+        if tag is None:
+            return res
+        match = re.search(rf"<{tag}>(.*?)</{tag}>", res, re.DOTALL)
+        if not match:
+            stats["failed"] += 1
+            raise ValueError(f"Invalid response format, response: {res}")
+        return match.group(1).strip()
+
+    def _payload_budget(self, template: str, **fields) -> int:
+        """Tokens left for the variable payload of a prompt once its other fields are filled in."""
+        return max(self.max_prompt_tokens - self.chunker.count(template.format(**fields)), 1)
+
+    def _pack(self, texts: List[str], budget: int) -> List[List[int]]:
+        """Greedily pack texts in order into groups whose joined size fits `budget` tokens."""
+        groups, current, used = [], [], 0
+        for index, text in enumerate(texts):
+            tokens = self.chunker.count(text) + 2
+            if current and used + tokens > budget:
+                groups.append(current)
+                current, used = [], 0
+            current.append(index)
+            used += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    @staticmethod
+    def _join(texts: List[str], group: List[int]) -> str:
+        return "\n\n".join(texts[i] for i in group)
+
+    def _truncate(self, text: str, tokens: int) -> str:
+        if tokens < 1 or self.chunker.count(text) <= tokens:
+            return text
+        return self.chunker.split(text, tokens)[0]
+
+    def _parse_outline(self, text: str, paper_notes: Dict[int, str]) -> List[dict]:
+        sections = []
+        for block in _SECTION_PATTERN.findall(text):
+            title = re.search(r"<TITLE>(.*?)</TITLE>", block, re.DOTALL)
+            if not title or not title.group(1).strip():
+                continue
+            description = re.search(r"<DESCRIPTION>(.*?)</DESCRIPTION>", block, re.DOTALL)
+            paper_list = re.search(r"<PAPERS>(.*?)</PAPERS>", block, re.DOTALL)
+            paper_ids = [int(i) for i in re.findall(r"\d+", paper_list.group(1))] if paper_list else []
+            sections.append({
+                "title": title.group(1).strip(),
+                "description": description.group(1).strip() if description else "",
+                "papers": [paper_id for paper_id in dict.fromkeys(paper_ids) if paper_id in paper_notes],
+            })
+        return sections[:self.max_sections]
+
+    @staticmethod
+    def _format_notes(paper_id: int, title: str, notes: str) -> str:
+        return f"[{paper_id}] {title}\n{notes}"
+
+    @staticmethod
+    def _format_outline(outline: List[dict]) -> str:
+        return "\n".join(
+            f"<SECTION>\n<TITLE>{section['title']}</TITLE>\n<DESCRIPTION>{section['description']}</DESCRIPTION>\n"
+            f"<PAPERS>{', '.join(str(paper_id) for paper_id in section['papers'])}</PAPERS>\n</SECTION>"
+            for section in outline
+        )
+
+    @staticmethod
+    def _file_name(topic: str, used: set) -> str:
+        name = re.sub(r"[^\w\-]+", "_", topic).strip("_")[:80] or "survey"
+        candidate, suffix = name, 1
+        while candidate in used:
+            suffix += 1
+            candidate = f"{name}_{suffix}"
+        used.add(candidate)
+        return f"{candidate}.md"
@@ -6,4 +6,5 @@ logger = logging.getLogger(__name__)
 from .openai import OpenAIRequest
 from .local import LocalRequest
 from .wrapper import RequestWrapper
+from .completion_cache import CompletionCache
 
@@ -0,0 +1,126 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MicroBatchDispatcher:
+    """
+    Coalesces concurrent single-conversation calls into batched requests.
+
+    Every `submit` enqueues one conversation and returns a Future. A background thread waits
+    for the first pending conversation, keeps collecting for at most `max_wait` seconds or
+    until `max_batch_size` conversations are pending, then sends them with `send_batch`.
+    Conversations with different sampling params never share a request, since params are
+    sent once per request. Up to `max_inflight` batches are in flight at the same time.
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[Any], Dict[str, Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait: float = 0.01,
+        max_inflight: int = 4,
+    ):
+        """
+        Args:
+            send_batch: Sends (list of messages, params) in one request and returns one answer per message
+            max_batch_size: Maximum number of conversations per request
+            max_wait: Maximum time in seconds the first conversation of a batch waits for others
+            max_inflight: Maximum number of batches sent concurrently
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be positive, got {max_batch_size}")
+        self.send_batch = send_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self.batches = 0
+        self.items = 0
+        self._stats_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="micro_batch")
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="micro_batch_dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, messages: Any, params: Dict[str, Any]) -> Future:
+        if self._closed:
+            raise RuntimeError("MicroBatchDispatcher is closed")
+        future = Future()
+        self._queue.put((messages, params, future))
+        return future
+
+    def close(self):
+        """Send the pending conversations and stop the dispatcher thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            pending = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                pending.append(item)
+
+            for batch in self._group_by_params(pending):
+                self._executor.submit(self._send, batch)
+
+    def _group_by_params(self, pending: List[Tuple[Any, Dict[str, Any], Future]]):
+        groups: Dict[str, List[Tuple[Any, Dict[str, Any], Future]]] = {}
+        for item in pending:
+            key = json.dumps(item[1], sort_keys=True, default=str)
+            groups.setdefault(key, []).append(item)
+        return list(groups.values())
+
+    def _send(self, batch: List[Tuple[Any, Dict[str, Any], Future]]):
+        # 已被调用方取消的请求不再发送
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+        try:
+            answers = self.send_batch([messages for messages, _, _ in batch], batch[0][1])
+            if len(answers) != len(batch):
+                # 答案与对话无法一一对应时整批失败, 不让任何调用方一直等待
+                raise ValueError(f"Expected {len(batch)} answers for the batch, got {len(answers)}")
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, _, future), answer in zip(batch, answers):
+            future.set_result(answer)
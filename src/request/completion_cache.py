@@ -0,0 +1,153 @@
+import hashlib
+import json
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Optional, Tuple
+
+from src.utils.sqlite_store import LRUBudget, SQLiteDatabase
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class CompletionCache:
+    """
+    Persistent, content-addressed cache of completion results backed by SQLite.
+
+    Entries are keyed by a hash of (model, messages, sampling kwargs) and store the answer
+    together with its token usage. The cache is bounded by entry count and total answer size
+    with LRU eviction, and entries older than `ttl` seconds are treated as misses.
+    SQLite runs in WAL mode, so several threads or processes can share one cache file.
+    Lookups and writes block on SQLite, so async callers run them in a worker thread.
+    """
+
+    def __init__(
+        self,
+        path: str = ".cache/completion_cache.sqlite",
+        max_entries: int = 100000,
+        max_bytes: int = 1024 * 1024 * 1024,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Args:
+            path: SQLite file path
+            max_entries: Maximum number of cached completions
+            max_bytes: Maximum total size of cached answers in bytes
+            ttl: Time to live of an entry in seconds, None means entries never expire
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+        self._db = SQLiteDatabase(path)
+        self._budget = LRUBudget(self._db, "completions", max_entries, max_bytes)
+
+        with self._db.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS completions (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    answer TEXT NOT NULL,
+                    token_usage TEXT,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_completions_accessed_at ON completions (accessed_at)"
+            )
+
+    @staticmethod
+    def make_key(model: str, messages, kwargs: dict) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": messages, "kwargs": kwargs},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, Any]]:
+        """
+        Returns:
+            (answer, token_usage) if a fresh entry exists, otherwise None
+        """
+        now = time.time()
+        with self._db.connect() as conn:
+            row = conn.execute(
+                "SELECT answer, token_usage, created_at, size FROM completions WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None and self.ttl is not None and now - row[2] > self.ttl:
+                conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._budget.removed(row[3])
+                row = None
+        if row is not None:
+            self._budget.touch(key)
+
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            return None
+        return row[0], self._load_token_usage(row[1])
+
+    def put(self, key: str, model: str, answer: str, token_usage: Any):
+        now = time.time()
+        size = len(answer.encode("utf-8"))
+        with self._db.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO completions "
+                "(key, model, answer, token_usage, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, answer, self._dump_token_usage(token_usage), size, now, now),
+            )
+            evicted = self._budget.added(conn, size)
+        with self._stats_lock:
+            self.writes += 1
+            self.evictions += evicted
+
+    def clear(self):
+        with self._db.connect() as conn:
+            conn.execute("DELETE FROM completions")
+        self._budget.cleared()
+
+    def flush(self):
+        """Write the buffered access times of hits, which decide the eviction order, to the cache file."""
+        self._budget.flush()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
+
+    @staticmethod
+    def _dump_token_usage(token_usage: Any) -> str:
+        if hasattr(token_usage, "model_dump"):
+            token_usage = token_usage.model_dump()
+        return json.dumps(token_usage, default=str)
+
+    @staticmethod
+    def _load_token_usage(raw: Optional[str]) -> Any:
+        token_usage = json.loads(raw) if raw else None
+        if isinstance(token_usage, dict):
+            # 保持与OpenAI usage对象一致的属性访问方式
+            return SimpleNamespace(**token_usage)
+        return token_usage
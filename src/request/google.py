@@ -7,8 +7,9 @@ from tenacity import (
     retry,
     stop_after_attempt,
     wait_random_exponential,
-    retry_if_exception_type
+    retry_if_exception
 )
+from .limiter import is_overload_error
 
 logger = logging.getLogger(__name__)
 
@@ -31,22 +32,37 @@ class GoogleRequest:
     @retry(
         wait=wait_random_exponential(multiplier=2, max=60),
         stop=stop_after_attempt(10),
-        retry=retry_if_exception_type(Exception)  # 网络、限流、服务端错误等都重试
+        retry=retry_if_exception(lambda e: not is_overload_error(e))  # 限流和5xx交给RequestWrapper的限制器处理, 其余错误都重试
     )
     def completion(self, messages, **kwargs) -> str:
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=self._format_contents(messages)
+        )
+        return self._parse_response(response)
+
+    @retry(
+        wait=wait_random_exponential(multiplier=2, max=60),
+        stop=stop_after_attempt(10),
+        retry=retry_if_exception(lambda e: not is_overload_error(e))
+    )
+    async def acompletion(self, messages, **kwargs) -> str:
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=self._format_contents(messages)
+        )
+        return self._parse_response(response)
 
-        contents = [
+    def _format_contents(self, messages):
+        return [
             {"role": m["role"], "parts": [types.Part.from_text(text=m["content"])]}
             for m in messages
         ]
-            
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=contents
-        )
-        
+
+    def _parse_response(self, response):
         text = getattr(response, "text", None)
-        token_usage = response.usage_metadata.total_token_count
+        # 保留完整的usage_metadata, 以便区分prompt和completion的token数
+        token_usage = response.usage_metadata
         if not text:
             logger.error("GoogleRequest.completion: empty response.text")
             raise ValueError("Empty response from GoogleRequest")
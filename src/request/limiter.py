@@ -0,0 +1,311 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+# 表示服务端过载或限流的HTTP状态码
+_OVERLOAD_STATUS = {429, 500, 502, 503, 504, 529}
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """
+    Extract the HTTP status code of an error raised by the OpenAI, google-genai,
+    requests or httpx clients, or None when the error has no status.
+    """
+    for attr in ("status_code", "code"):
+        status = getattr(error, attr, None)
+        if isinstance(status, int):
+            return status
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Whether the error is a rate-limit or server-side overload response."""
+    return error_status(error) in _OVERLOAD_STATUS
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Read the delay requested by the server from the `retry-after-ms` or `retry-after`
+    response header of an error, which may be seconds or an HTTP date.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(float(value) / 1000, 0.0)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD (additive increase, multiplicative decrease) concurrency limiter for one model.
+
+    Every successful call raises the limit by `increase / limit`, i.e. by about `increase`
+    per round of `limit` calls. A rate-limit or 5xx response cuts the limit by `decrease`,
+    at most once per round: calls admitted before the last cut cannot cut it again, so a
+    burst of 429s from in-flight calls counts as one congestion signal. After an overload
+    new calls wait for the server's Retry-After, or an exponential backoff without one.
+
+    Optional requests-per-minute and tokens-per-minute budgets are enforced over a sliding
+    window. Tokens are only known after a call, so admission uses the measured usage of the
+    window plus the mean usage of past calls for every call in flight.
+
+    The limiter is thread-safe and can be shared by synchronous threads and coroutines
+    running in any event loop.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 20,
+        min_limit: float = 1,
+        max_limit: float = 200,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_backoff: float = 60.0,
+        window: float = 60.0,
+    ):
+        """
+        Args:
+            initial_limit: Concurrency limit before any feedback
+            min_limit: Lower bound of the limit
+            max_limit: Upper bound of the limit
+            increase: Additive increase of the limit per round of successful calls
+            decrease: Factor applied to the limit on overload
+            requests_per_minute: Optional budget of calls started per window
+            tokens_per_minute: Optional budget of tokens used per window
+            max_backoff: Maximum pause after repeated overloads without Retry-After, in seconds
+            window: Length of the budget window in seconds
+        """
+        if not 0 < decrease < 1:
+            raise ValueError(f"decrease must be in (0, 1), got {decrease}")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.initial_limit = self.limit
+        self.increase = increase
+        self.decrease = decrease
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_backoff = max_backoff
+        self.window = window
+
+        self.inflight = 0
+        self.waiting = 0
+        self.successes = 0
+        self.overloads = 0
+        self.cuts = 0
+        self.peak_limit = self.limit
+
+        self._epoch = 0
+        self._blocked_until = 0.0
+        self._consecutive_overloads = 0
+        self._request_starts: deque = deque()
+        self._token_log: deque = deque()
+        self._window_tokens = 0
+        self._total_tokens = 0
+        self._measured_calls = 0
+
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._async_waiters = []
+
+    def acquire(self) -> int:
+        """
+        Block until a slot is free and the budgets allow another call.
+
+        Returns:
+            Ticket to pass to `release`
+        """
+        with self._condition:
+            self.waiting += 1
+            try:
+                while True:
+                    wait = self._try_acquire_locked(time.monotonic())
+                    if wait == 0:
+                        return self._epoch
+                    self._condition.wait(timeout=wait)
+            finally:
+                self.waiting -= 1
+
+    async def acquire_async(self) -> int:
+        """Coroutine version of `acquire`, which never blocks the event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_acquire_locked(time.monotonic())
+                    if wait == 0:
+                        return self._epoch
+                    waiter = loop.create_future()
+                    self._async_waiters.append((loop, waiter))
+                try:
+                    await asyncio.wait_for(waiter, timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    with self._lock:
+                        if (loop, waiter) in self._async_waiters:
+                            self._async_waiters.remove((loop, waiter))
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def release(self, ticket: int, error: Optional[BaseException] = None, tokens: int = 0) -> bool:
+        """
+        Free the slot of a finished call and feed its outcome back into the limit.
+
+        Args:
+            ticket: Value returned by `acquire`
+            error: Exception raised by the call, None on success
+            tokens: Tokens used by the call, counted against the token budget
+
+        Returns:
+            True when the call failed because the server is overloaded and may be retried
+        """
+        overloaded = error is not None and is_overload_error(error)
+        retry_after = retry_after_seconds(error) if overloaded else None
+        now = time.monotonic()
+        with self._condition:
+            self.inflight -= 1
+            if tokens:
+                self._record_tokens_locked(now, tokens)
+
+            if overloaded:
+                self.overloads += 1
+                self._consecutive_overloads += 1
+                if ticket == self._epoch:
+                    # 同一轮内的多个过载信号只降低一次
+                    self.limit = max(self.min_limit, self.limit * self.decrease)
+                    self._epoch += 1
+                    self.cuts += 1
+                if retry_after is None:
+                    backoff = min(2 ** (self._consecutive_overloads - 1), self.max_backoff)
+                    retry_after = backoff * random.uniform(0.5, 1.0)
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+                logger.warning(
+                    f"Overload response, concurrency limit cut to {self.limit:.1f}, "
+                    f"pausing new calls for {retry_after:.1f}s: {error}"
+                )
+            elif error is None:
+                self.successes += 1
+                self._consecutive_overloads = 0
+                self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+                self.peak_limit = max(self.peak_limit, self.limit)
+            self._notify_locked()
+        return overloaded
+
+    def tighten(
+        self,
+        max_limit: Optional[float] = None,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ) -> dict:
+        """
+        Apply the bounds another user of this limiter asks for, where they are stricter
+        than the current ones. Looser bounds are ignored, the users share one quota.
+
+        Returns:
+            The bounds that changed, mapped to their new values
+        """
+        changed = {}
+        with self._lock:
+            if max_limit is not None and max_limit < self.max_limit:
+                self.max_limit = changed["max_limit"] = max(max_limit, self.min_limit)
+                self.limit = min(self.limit, self.max_limit)
+            if requests_per_minute and (not self.requests_per_minute or requests_per_minute < self.requests_per_minute):
+                self.requests_per_minute = changed["requests_per_minute"] = requests_per_minute
+            if tokens_per_minute and (not self.tokens_per_minute or tokens_per_minute < self.tokens_per_minute):
+                self.tokens_per_minute = changed["tokens_per_minute"] = tokens_per_minute
+        return changed
+
+    def metrics(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self._expire_locked(now)
+            return {
+                "limit": round(self.limit, 2),
+                "peak_limit": round(self.peak_limit, 2),
+                "inflight": self.inflight,
+                "queue_depth": self.waiting,
+                "successes": self.successes,
+                "overloads": self.overloads,
+                "cuts": self.cuts,
+                "paused_for": round(max(self._blocked_until - now, 0.0), 2),
+                "window_requests": len(self._request_starts),
+                "window_tokens": self._window_tokens,
+            }
+
+    def _try_acquire_locked(self, now: float) -> Optional[float]:
+        """
+        Returns:
+            0 when a slot was taken, otherwise the seconds to wait before trying again,
+            None meaning until another call is released
+        """
+        self._expire_locked(now)
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self.inflight >= max(int(self.limit), 1):
+            return None
+        if self.requests_per_minute and len(self._request_starts) >= self.requests_per_minute:
+            return self._request_starts[0] + self.window - now
+        if self.tokens_per_minute and self._window_tokens > 0:
+            mean_tokens = self._total_tokens / max(self._measured_calls, 1)
+            if self._window_tokens + mean_tokens * (self.inflight + 1) > self.tokens_per_minute:
+                if self._token_log:
+                    return self._token_log[0][0] + self.window - now
+                return None
+        self.inflight += 1
+        if self.requests_per_minute:
+            self._request_starts.append(now)
+        return 0
+
+    def _record_tokens_locked(self, now: float, tokens: int):
+        self._total_tokens += tokens
+        self._measured_calls += 1
+        if self.tokens_per_minute:
+            self._token_log.append((now, tokens))
+            self._window_tokens += tokens
+
+    def _expire_locked(self, now: float):
+        while self._request_starts and self._request_starts[0] <= now - self.window:
+            self._request_starts.popleft()
+        while self._token_log and self._token_log[0][0] <= now - self.window:
+            self._window_tokens -= self._token_log.popleft()[1]
+
+    def _notify_locked(self):
+        self._condition.notify_all()
+        for loop, waiter in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(self._wake, waiter)
+            except RuntimeError:
+                # 等待者所在的event loop已经关闭
+                pass
+        self._async_waiters.clear()
+
+    @staticmethod
+    def _wake(waiter: asyncio.Future):
+        if not waiter.done():
+            waiter.set_result(None)
@@ -1,3 +1,5 @@
+import asyncio
+import httpx
 import requests
 from requests.exceptions import HTTPError
 import json
@@ -8,31 +10,76 @@ from tenacity import (
     retry,
     stop_after_attempt,
     wait_random_exponential,
-    retry_if_exception_type
+    retry_if_exception
 )
+from .batching import MicroBatchDispatcher
+from .limiter import is_overload_error
 import logging
 logger = logging.getLogger(__name__)
 
 
 class LocalRequest:
-    def __init__(self, port):
+    def __init__(self, port, max_batch_size=16, batch_window=None, pool_size=32):
+        """
+        Args:
+            port: 本地推理服务的端口
+            max_batch_size: 每个/infer请求最多包含的对话数
+            batch_window: 不为None时启用micro-batching, 在该时间窗口(秒)内并发到达的单条请求会合并成一个batch
+            pool_size: requests.Session连接池大小
+        """
         self.url = f"http://localhost:{port}/infer"
+        self.max_batch_size = max_batch_size
+        self._async_client = None
+        self._async_client_loop = None
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+
+        self.dispatcher = None
+        if batch_window is not None:
+            self.dispatcher = MicroBatchDispatcher(
+                self._post_batch, max_batch_size=max_batch_size, max_wait=batch_window
+            )
         logger.warning(f"Token counter is not supported in LocalRequest, each request will be counted as 1 token")
 
+    def completion(self, messages, **kwargs):
+        config = self._format_config_params(kwargs)
+        if self.dispatcher is not None:
+            answer = self.dispatcher.submit(messages, config).result()
+        else:
+            answer = self._post_batch([messages], config)[0]
+        return answer, 1
+
+    def batch_completion(self, list_of_messages, **kwargs):
+        """
+        每个/infer请求发送最多max_batch_size条对话
+
+        Returns:
+            与list_of_messages一一对应的(answer, token_usage)列表
+        """
+        config = self._format_config_params(kwargs)
+        results = []
+        for start in range(0, len(list_of_messages), self.max_batch_size):
+            batch = list_of_messages[start:start + self.max_batch_size]
+            results.extend((answer, 1) for answer in self._post_batch(batch, config))
+        return results
+
     @retry(
         wait=wait_random_exponential(multiplier=2, max=60),
         stop=stop_after_attempt(30),
-        retry=retry_if_exception_type((JSONDecodeError, HTTPError)) # 如果不是这几个错就不retry了
+        # 如果不是这几个错就不retry了, 限流和5xx交给RequestWrapper的限制器处理
+        retry=retry_if_exception(lambda e: isinstance(e, (JSONDecodeError, HTTPError)) and not is_overload_error(e))
     )
-    def completion(self, messages, **kwargs):
+    def _post_batch(self, list_of_messages, config):
+        result = None
         try:
-            config = self._format_config_params(kwargs)
-            data = {"instances": [messages], "params": config}
-            result = requests.post(
+            data = {"instances": list_of_messages, "params": config}
+            result = self.session.post(
                 self.url, json=data, headers={"Content-Type": "application/json"}
             )
             result.raise_for_status()
-            answer = json.loads(result.content)[0]
+            answers = json.loads(result.content)
         except JSONDecodeError as e:
             logger.error(
                 f"JSONDecodeError in LocalRequest.completion: {e}\nResult: {result.content}"
@@ -44,8 +91,72 @@ class LocalRequest:
         except Exception as e:
             logger.error(f"Unexpected Error in LocalRequest.completion: {e}\n")
             raise
+        if len(answers) != len(list_of_messages):
+            raise ValueError(
+                f"LocalRequest expected {len(list_of_messages)} answers, got {len(answers)}"
+            )
+        return answers
+
+    async def acompletion(self, messages, **kwargs):
+        if self.dispatcher is not None:
+            config = self._format_config_params(kwargs)
+            answer = await asyncio.wrap_future(self.dispatcher.submit(messages, config))
+            return answer, 1
+        return await self._apost(messages, **kwargs)
+
+    @retry(
+        wait=wait_random_exponential(multiplier=2, max=60),
+        stop=stop_after_attempt(30),
+        retry=retry_if_exception(
+            lambda e: isinstance(e, (JSONDecodeError, httpx.HTTPStatusError, httpx.TransportError))
+            and not is_overload_error(e)
+        )
+    )
+    async def _apost(self, messages, **kwargs):
+        result = None
+        try:
+            config = self._format_config_params(kwargs)
+            data = {"instances": [messages], "params": config}
+            result = await self._get_async_client().post(
+                self.url, json=data, headers={"Content-Type": "application/json"}
+            )
+            result.raise_for_status()
+            answer = json.loads(result.content)[0]
+        except JSONDecodeError as e:
+            logger.error(
+                f"JSONDecodeError in LocalRequest.acompletion: {e}\nResult: {result.content}"
+            )
+            raise
+        except httpx.HTTPStatusError as e:
+            logger.warning(f"HTTPError in LocalRequest.acompletion: {e}\nResult: {result.content}")
+            raise
+        except httpx.TransportError as e:
+            logger.warning(f"TransportError in LocalRequest.acompletion: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected Error in LocalRequest.acompletion: {e}\n")
+            raise
         return answer, 1
 
+    def close(self):
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+        self.session.close()
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_client_loop = None
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # httpx的连接池绑定在event loop上, loop变化时重新创建client
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = httpx.AsyncClient(timeout=None)
+            self._async_client_loop = loop
+        return self._async_client
+
     def _format_config_params(self, kwargs):
         config = {}
         for key, value in kwargs.items():
@@ -1,5 +1,5 @@
 import os
-from openai import OpenAI, InternalServerError, RateLimitError, APIError
+from openai import OpenAI, AsyncOpenAI, InternalServerError, RateLimitError, APIConnectionError
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -12,29 +12,31 @@ logger = logging.getLogger(__name__)
 
 class OpenAIRequest:
     def __init__(self, model):
+        # 限流和5xx不在这里重试, 而是抛给RequestWrapper, 由自适应并发限制器降低并发并等待Retry-After后重试;
+        # SDK自带的重试也会吞掉这些信号, 因此关闭
         self.client = OpenAI(
             api_key=os.environ.get("OPENAI_API_KEY"),
             base_url=os.environ.get("OPENAI_API_BASE"),
+            max_retries=0,
+        )
+        self.async_client = AsyncOpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            base_url=os.environ.get("OPENAI_API_BASE"),
+            max_retries=0,
         )
         self.model = model
 
     @retry(
         wait=wait_random_exponential(multiplier=2, max=60),
-        stop=stop_after_attempt(100),
-        retry=retry_if_exception_type((RateLimitError, InternalServerError, APIError)) # 如果不是这几个错就不retry了
+        stop=stop_after_attempt(10),
+        retry=retry_if_exception_type(APIConnectionError) # 只重试网络错误
         )
     def completion(self, messages, **kwargs):
         try:
             response = self.client.chat.completions.create(
                 model=self.model, messages=messages, **kwargs
             )
-            # 新增检查：确保响应包含有效的 choices 数据
-            if not response.choices or len(response.choices) == 0:
-                error_msg = "OpenAI API returned empty choices in response"
-                logger.debug(error_msg)
-                raise ValueError(error_msg)
-            answer = response.choices[0].message.content
-            token_usage = response.usage
+            answer, token_usage = self._parse_response(response)
 
         except RateLimitError as e:
             logger.warning(f"Rate limit exceeded in OpenAIRequest.completion: {e}")
@@ -48,3 +50,37 @@ class OpenAIRequest:
             raise 
                 
         return answer, token_usage
+
+    @retry(
+        wait=wait_random_exponential(multiplier=2, max=60),
+        stop=stop_after_attempt(10),
+        retry=retry_if_exception_type(APIConnectionError)
+        )
+    async def acompletion(self, messages, **kwargs):
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model, messages=messages, **kwargs
+            )
+            answer, token_usage = self._parse_response(response)
+
+        except RateLimitError as e:
+            logger.warning(f"Rate limit exceeded in OpenAIRequest.acompletion: {e}")
+            raise
+        except InternalServerError as e:
+            logger.warning(f"Internal server error in OpenAIRequest.acompletion: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in OpenAIRequest.acompletion: {e}. messages: \n{messages}")
+            raise
+
+        return answer, token_usage
+
+    def _parse_response(self, response):
+        # 新增检查：确保响应包含有效的 choices 数据
+        if not response.choices or len(response.choices) == 0:
+            error_msg = "OpenAI API returned empty choices in response"
+            logger.debug(error_msg)
+            raise ValueError(error_msg)
+        answer = response.choices[0].message.content
+        token_usage = response.usage
+        return answer, token_usage
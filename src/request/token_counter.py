@@ -1,37 +1,246 @@
+import contextlib
+import contextvars
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
 import logging
 from tabulate import tabulate
 
 logger = logging.getLogger(__name__)
 
+# 当前调用所属的流水线阶段, asyncio task和线程各自继承/持有自己的值
+_current_stage: contextvars.ContextVar = contextvars.ContextVar("usage_stage", default="default")
+
+
+@contextlib.contextmanager
+def usage_stage(stage: str):
+    """
+    Attribute the completions made inside the block to a pipeline stage.
+
+    Example:
+        with usage_stage("refine"):
+            await request_pool.acompletion(prompt)
+    """
+    token = _current_stage.set(stage)
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+
+
+def current_stage() -> str:
+    return _current_stage.get()
+
+
+@dataclass
+class TokenUsage:
+    """Token usage of one completion, normalized across backends."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+
+
+def _read(usage: Any, *names: str) -> Optional[int]:
+    for name in names:
+        value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+        if isinstance(value, (int, float)):
+            return int(value)
+    return None
+
+
+def normalize_usage(token_usage: Any) -> TokenUsage:
+    """
+    Normalize the usage returned by a backend into a TokenUsage.
+
+    Supports OpenAI `CompletionUsage` (prompt_tokens/completion_tokens/total_tokens),
+    google-genai `usage_metadata` (prompt_token_count/candidates_token_count/total_token_count),
+    their dict or SimpleNamespace forms restored from the completion cache, and the plain
+    integer counts returned by the local backend, which only know a total.
+    """
+    if token_usage is None:
+        return TokenUsage()
+    if isinstance(token_usage, TokenUsage):
+        return token_usage
+    if isinstance(token_usage, (int, float)):
+        return TokenUsage(total_tokens=int(token_usage))
+    prompt = _read(token_usage, "prompt_tokens", "prompt_token_count") or 0
+    completion = _read(token_usage, "completion_tokens", "candidates_token_count") or 0
+    total = _read(token_usage, "total_tokens", "total_token_count")
+    return TokenUsage(prompt, completion, total if total is not None else prompt + completion)
+
+
+class LogHistogram:
+    """
+    Constant-memory histogram over log-spaced buckets for approximate percentiles.
+
+    Bucket bounds grow by `growth`, so a percentile is reported within a relative error of
+    about (growth - 1) / 2, and values up to `max_value` need only log(max_value) / log(growth)
+    buckets whatever the number of samples.
+    """
+
+    def __init__(self, growth: float = 1.05, max_value: float = 1e7):
+        self._log_growth = math.log(growth)
+        self.growth = growth
+        self._max_bucket = int(math.log(max_value) / self._log_growth) + 1
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.max = 0.0
 
-def track_completion_calls(cls):
-    original_completion = cls.completion
-
-    def _completion_counter():
-        cls._calls_count += 1
-        logger.info(f"Current total count of openai api calls: {cls._calls_count}")
-        return
-    
-    def token_logger(self, *args, **kwargs):
-        answer = original_completion(self, *args, **kwargs)
-        _completion_counter()
-        table_data = []
-        for count, token_usage in enumerate(cls._token_usage_history):
-            if token_usage is None:
-                token_usage_info = "missing"
+    def add(self, value: float):
+        # bucket 0 收集所有不大于1的值
+        bucket = 0 if value <= 1 else min(int(math.log(value) / self._log_growth) + 1, self._max_bucket)
+        self._counts[bucket] = self._counts.get(bucket, 0) + 1
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket in sorted(self._counts):
+            seen += self._counts[bucket]
+            if seen >= rank:
+                if bucket == 0:
+                    return min(self.max, 1.0)
+                # 取桶的几何中点, 但不超过观测到的最大值
+                return min(self.growth ** (bucket - 0.5), self.max)
+        return self.max
+
+
+class _UsageStats:
+    def __init__(self):
+        self.calls = 0
+        self.cached_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_tokens = 0
+        self.cached_tokens = 0
+        self.latency = 0.0
+        self.prompt_hist = LogHistogram()
+        self.completion_hist = LogHistogram()
+        self.latency_hist = LogHistogram(growth=1.05, max_value=1e6)
+
+
+class UsageAccumulator:
+    """
+    Thread- and asyncio-safe running totals of completion usage keyed by (model, stage).
+
+    Every key keeps call counts, token totals and constant-memory histograms of prompt
+    tokens, completion tokens and latency, so memory does not grow with the number of calls.
+    A summary table is logged every `log_interval` seconds while calls are recorded, and can
+    be requested at any time with `summary` / `format_summary`.
+    """
+
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, log_interval: Optional[float] = 300.0):
+        """
+        Args:
+            log_interval: Seconds between periodic summary logs, None disables them
+        """
+        self.log_interval = log_interval
+        self._stats: Dict[Tuple[str, str], _UsageStats] = {}
+        self._lock = threading.Lock()
+        self._last_log = time.monotonic()
+
+    def record(
+        self,
+        model: str,
+        token_usage: Any,
+        latency: Optional[float] = None,
+        stage: Optional[str] = None,
+        cached: bool = False,
+    ) -> TokenUsage:
+        """
+        Args:
+            model: Model name
+            token_usage: Usage as returned by the backend, normalized with `normalize_usage`
+            latency: Wall time of the call in seconds
+            stage: Pipeline stage, defaults to the stage set with `usage_stage`
+            cached: Whether the answer came from the completion cache without calling the model
+
+        Returns:
+            TokenUsage: The normalized usage
+        """
+        usage = normalize_usage(token_usage)
+        key = (model, stage or current_stage())
+        should_log = False
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _UsageStats()
+            if cached:
+                stats.cached_calls += 1
+                stats.cached_tokens += usage.total_tokens
             else:
-                token_usage_info = (
-                    f"(completion_tokens={token_usage.completion_tokens}, "
-                    f"prompt_tokens={token_usage.prompt_tokens}, "
-                    f"total_tokens={token_usage.total_tokens})"
-                )
-            table_data.append([count+1, token_usage_info])
-        logger.info(tabulate(
-            table_data, 
-            headers=["Index", "Token Usage"], 
-            tablefmt="grid"
-        ))
-        return answer
-
-    cls.completion = token_logger
-    return cls
+                stats.calls += 1
+                stats.prompt_tokens += usage.prompt_tokens
+                stats.completion_tokens += usage.completion_tokens
+                stats.total_tokens += usage.total_tokens
+                stats.prompt_hist.add(usage.prompt_tokens)
+                stats.completion_hist.add(usage.completion_tokens)
+                if latency is not None:
+                    stats.latency += latency
+                    stats.latency_hist.add(latency * 1000)
+
+            now = time.monotonic()
+            if self.log_interval is not None and now - self._last_log >= self.log_interval:
+                self._last_log = now
+                should_log = True
+        if should_log:
+            logger.info(f"Completion usage so far:\n{self.format_summary()}")
+        return usage
+
+    def summary(self) -> Dict[Tuple[str, str], dict]:
+        with self._lock:
+            return {key: self._summarize(stats) for key, stats in self._stats.items()}
+
+    def totals(self) -> TokenUsage:
+        with self._lock:
+            return TokenUsage(
+                sum(s.prompt_tokens for s in self._stats.values()),
+                sum(s.completion_tokens for s in self._stats.values()),
+                sum(s.total_tokens for s in self._stats.values()),
+            )
+
+    def format_summary(self) -> str:
+        rows = []
+        for (model, stage), s in sorted(self.summary().items()):
+            rows.append([
+                model, stage, s["calls"], s["cached_calls"],
+                s["prompt_tokens"], s["completion_tokens"], s["total_tokens"],
+                "/".join(f"{s['prompt_p'][q]:.0f}" for q in self.PERCENTILES),
+                "/".join(f"{s['completion_p'][q]:.0f}" for q in self.PERCENTILES),
+                "/".join(f"{s['latency_ms_p'][q] / 1000:.2f}" for q in self.PERCENTILES),
+            ])
+        quantiles = "/".join(f"p{q}" for q in self.PERCENTILES)
+        return tabulate(
+            rows,
+            headers=[
+                "Model", "Stage", "Calls", "Cached", "Prompt", "Completion", "Total",
+                f"Prompt {quantiles}", f"Completion {quantiles}", f"Latency(s) {quantiles}",
+            ],
+            tablefmt="grid",
+        )
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def _summarize(self, stats: _UsageStats) -> dict:
+        return {
+            "calls": stats.calls,
+            "cached_calls": stats.cached_calls,
+            "prompt_tokens": stats.prompt_tokens,
+            "completion_tokens": stats.completion_tokens,
+            "total_tokens": stats.total_tokens,
+            "cached_tokens": stats.cached_tokens,
+            "mean_latency": stats.latency / stats.calls if stats.calls else 0.0,
+            "prompt_p": {q: stats.prompt_hist.percentile(q) for q in self.PERCENTILES},
+            "completion_p": {q: stats.completion_hist.percentile(q) for q in self.PERCENTILES},
+            "latency_ms_p": {q: stats.latency_hist.percentile(q) for q in self.PERCENTILES},
+        }
@@ -1,5 +1,11 @@
-from typing import List, Dict
-from gevent.lock import Semaphore
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+from .completion_cache import CompletionCache
+from .limiter import AdaptiveConcurrencyLimiter
+from .token_counter import UsageAccumulator, normalize_usage
 from .local import LocalRequest
 from .openai import OpenAIRequest
 from .google import GoogleRequest
@@ -10,30 +16,243 @@ logger = logging.getLogger(__name__)
 
 
 class RequestWrapper:
-    _connection_semaphore = {}
-    _calls_count = 0 # 用来统计api的调用次数
-    _token_usage_history = [] # 用来统计每次调用时使用的token数
+    _limiters = {} # 自适应并发限制器, 按model共享, 同步和异步调用共用
+    _limiters_lock = threading.Lock()
+    usage = UsageAccumulator() # 按(model, 流水线阶段)汇总的token用量和延迟, 内存占用不随调用次数增长
 
-    def __init__(self, model="gemini-2.0-flash-thinking-exp-01-21", infer_type="OpenAI", connection=20, port=None):
+    def __init__(
+        self,
+        model="gemini-2.0-flash-thinking-exp-01-21",
+        infer_type="OpenAI",
+        connection=20,
+        port=None,
+        cache: Optional[CompletionCache] = None,
+        max_batch_size=16,
+        batch_window: Optional[float] = None,
+        max_connection=200,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_overload_retries=30,
+    ):
+        """
+        Args:
+            connection: 初始并发数, 之后按AIMD根据限流/5xx响应自动调整。同一model的限制器由所有实例共享,
+                已有限制器时沿用其学到的并发数, 并只采用更严格的max_connection和预算, 见`_merge_limits`
+            cache: 可选的持久化completion缓存, 相同的(model, messages, kwargs)直接返回缓存结果
+            max_batch_size: local推理时每个请求最多包含的对话数
+            batch_window: local推理时启用micro-batching的合并窗口(秒), None表示不合并单条请求
+            max_connection: 并发数上限
+            requests_per_minute: 可选的每分钟请求数预算
+            tokens_per_minute: 可选的每分钟token预算, 按实际返回的用量统计
+            max_overload_retries: 遇到限流/过载响应时的最大重试次数
+        """
         if not model:
             model = "gemini-2.0-flash-thinking-exp-01-21"
         
         self.request_pool = None
         self.model = model
-        self._connection_semaphore[model] = Semaphore(connection)
+        self.connection = connection
+        self.cache = cache
+        self.max_overload_retries = max_overload_retries
+        with self._limiters_lock:
+            # 同一model的所有实例共享限制器, 已学到的并发数在实例之间保留
+            if model not in self._limiters:
+                self._limiters[model] = AdaptiveConcurrencyLimiter(
+                    initial_limit=connection,
+                    max_limit=max_connection,
+                    requests_per_minute=requests_per_minute,
+                    tokens_per_minute=tokens_per_minute,
+                )
+            else:
+                self._merge_limits(self._limiters[model], connection, max_connection, requests_per_minute, tokens_per_minute)
+            self.limiter = self._limiters[model]
 
         if infer_type == "OpenAI":
             self.request_pool = OpenAIRequest(model=model)
         elif infer_type == "Google":
             self.request_pool = GoogleRequest(model=model)  
         elif infer_type == "local":
-            self.request_pool = LocalRequest(port=port)
+            self.request_pool = LocalRequest(
+                port=port, max_batch_size=max_batch_size, batch_window=batch_window
+            )
         else:
             raise ValueError(
                 f"Invalid infer_type: {infer_type}, should be OpenAI or local"
             )
 
-    def completion(self, message, **kwargs):
+    def _merge_limits(self, limiter, connection, max_connection, requests_per_minute, tokens_per_minute):
+        """
+        后创建的实例与已有实例共享限制器: 更严格的并发上限和预算会生效, 更宽松的被忽略,
+        初始并发数不再生效(沿用已学到的并发数), 与请求的值不一致时打印warning
+        """
+        changed = limiter.tighten(max_connection, requests_per_minute, tokens_per_minute)
+        if changed:
+            logger.warning(f"Stricter limits applied to the shared limiter of {self.model}: {changed}")
+        ignored = {
+            name: (requested, effective)
+            for name, requested, effective in (
+                ("connection", connection, limiter.initial_limit),
+                ("max_connection", max_connection, limiter.max_limit),
+                ("requests_per_minute", requests_per_minute, limiter.requests_per_minute),
+                ("tokens_per_minute", tokens_per_minute, limiter.tokens_per_minute),
+            )
+            if requested is not None and requested != effective
+        }
+        if ignored:
+            logger.warning(
+                f"The limiter of {self.model} is shared with an earlier RequestWrapper, "
+                f"(requested, effective) limits differ: {ignored}"
+            )
+
+    def completion(self, message, bypass_cache=False, **kwargs):
+        """
+        Args:
+            bypass_cache: 为True时不读取缓存, 但仍会用新的结果刷新缓存
+        """
+        message = self._format_message(message)
+        cache_key, cached = self._read_cache(message, kwargs, bypass_cache)
+        if cached is not None:
+            return cached
+
+        result, token_usage = self._call_with_limiter(self.request_pool.completion, message, **kwargs)
+
+        result = self._handle_result(message, result, token_usage)
+        self._write_cache(cache_key, result, token_usage)
+        return result
+
+    async def acompletion(self, message, bypass_cache=False, **kwargs):
+        """
+        Asynchronous counterpart of `completion`, which never blocks the event loop.
+        Concurrency per model is bounded by the same adaptive limiter as `completion`.
+        """
+        message = self._format_message(message)
+        cache_key, cached = None, None
+        if self.cache is not None:
+            # SQLite的读写是阻塞调用, 放到线程中执行
+            cache_key, cached = await asyncio.to_thread(self._read_cache, message, kwargs, bypass_cache)
+        if cached is not None:
+            return cached
+
+        result, token_usage = await self._acall_with_limiter(self.request_pool.acompletion, message, **kwargs)
+
+        result = self._handle_result(message, result, token_usage)
+        if self.cache is not None:
+            await asyncio.to_thread(self._write_cache, cache_key, result, token_usage)
+        return result
+
+    def batch_completion(self, list_of_messages, bypass_cache=False, **kwargs):
+        """
+        一次完成多条对话, 返回与输入顺序一致的结果列表
+
+        命中缓存的对话不再请求; 支持批量推理的后端(local)把其余对话按max_batch_size打包发送,
+        其他后端在线程池中逐条调用completion, 并发数由限制器控制
+        """
+        list_of_messages = [self._format_message(message) for message in list_of_messages]
+        results = [None] * len(list_of_messages)
+        pending = []
+        for i, message in enumerate(list_of_messages):
+            cache_key, cached = self._read_cache(message, kwargs, bypass_cache)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, message, cache_key))
+        if not pending:
+            return results
+
+        if hasattr(self.request_pool, "batch_completion"):
+            answers = self._call_with_limiter(
+                self.request_pool.batch_completion, [message for _, message, _ in pending], **kwargs
+            )
+            for (i, message, cache_key), (result, token_usage) in zip(pending, answers):
+                results[i] = self._handle_result(message, result, token_usage)
+                self._write_cache(cache_key, results[i], token_usage)
+        else:
+            workers = min(max(int(self.limiter.limit), 1), len(pending))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    i: executor.submit(self.completion, message, bypass_cache=True, **kwargs)
+                    for i, message, _ in pending
+                }
+                for i, future in futures.items():
+                    results[i] = future.result()
+        return results
+
+    def _read_cache(self, message, kwargs, bypass_cache):
+        if self.cache is None:
+            return None, None
+        cache_key = CompletionCache.make_key(self.model, message, kwargs)
+        if bypass_cache:
+            return cache_key, None
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return cache_key, None
+        logger.debug(f"Completion cache hit for {self.model}, key={cache_key}")
+        self.usage.record(self.model, cached[1], cached=True)
+        return cache_key, cached[0]
+
+    def _write_cache(self, cache_key, result, token_usage):
+        if self.cache is None or cache_key is None:
+            return
+        try:
+            self.cache.put(cache_key, self.model, result, token_usage)
+        except Exception as e:
+            # 缓存写入失败不影响正常的调用结果
+            logger.warning(f"Failed to write completion cache: {e}")
+
+    def limiter_metrics(self) -> dict:
+        """当前并发上限、排队数量等限制器指标"""
+        return self.limiter.metrics()
+
+    def _call_with_limiter(self, fn, *args, **kwargs):
+        # 限流/过载响应交给限制器处理(降低并发并等待Retry-After)后重试, 其他错误直接抛出
+        attempt = 0
+        while True:
+            attempt += 1
+            ticket = self.limiter.acquire()
+            start = time.monotonic()
+            try:
+                response = fn(*args, **kwargs)
+            except Exception as e:
+                if not self.limiter.release(ticket, error=e) or attempt > self.max_overload_retries:
+                    raise
+                continue
+            self.limiter.release(ticket, tokens=self._record_usage(response, time.monotonic() - start))
+            return response
+
+    async def _acall_with_limiter(self, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            attempt += 1
+            ticket = await self.limiter.acquire_async()
+            start = time.monotonic()
+            try:
+                response = await fn(*args, **kwargs)
+            except Exception as e:
+                if not self.limiter.release(ticket, error=e) or attempt > self.max_overload_retries:
+                    raise
+                continue
+            except BaseException:
+                # 被取消的调用只释放名额, 不影响并发上限
+                self.limiter.release(ticket, error=asyncio.CancelledError())
+                raise
+            self.limiter.release(ticket, tokens=self._record_usage(response, time.monotonic() - start))
+            return response
+
+    def _record_usage(self, response, latency) -> int:
+        """记录一次调用的用量, 返回消耗的总token数"""
+        # completion返回(answer, token_usage), batch_completion返回它们的列表
+        responses = response if isinstance(response, list) else [response]
+        return sum(
+            self.usage.record(self.model, token_usage, latency=latency).total_tokens
+            for _, token_usage in responses
+        )
+
+    @classmethod
+    def usage_summary(cls) -> str:
+        """所有model和流水线阶段的用量汇总表"""
+        return cls.usage.format_summary()
+
+    def _format_message(self, message):
         if isinstance(message, str):
             message = [{"role": "user", "content": message}]
         elif isinstance(message, List):
@@ -48,17 +267,9 @@ class RequestWrapper:
                 raise ValueError(
                     "message should be a List[Dict['role':str, 'content':str]]"
                 )
-                
-        if self.model in self._connection_semaphore:
-            with self._connection_semaphore[self.model]:
-                logger.debug(f"Acquired semaphore for {self.model} (remain={self._connection_semaphore[self.model].counter})")
-                result, token_usage = self.request_pool.completion(message, **kwargs)
-        else:
-            result, token_usage = self.request_pool.completion(message, **kwargs)
-            
-        self._calls_count += 1
-        self._token_usage_history.append(token_usage)
-            
+        return message
+
+    def _handle_result(self, message, result, token_usage):
         logger.debug(f"Requesting completion received")
         if not result:
             raise ValueError(
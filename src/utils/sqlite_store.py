@@ -0,0 +1,174 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class SQLiteDatabase:
+    """
+    多线程共享的SQLite文件
+
+    sqlite3连接不能跨线程使用, 每个线程持有自己的连接。使用WAL模式, 多个线程或进程可以同时读写同一个文件。
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite文件路径, 所在目录不存在时自动创建
+        """
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def connect(self) -> sqlite3.Connection:
+        """当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+class LRUBudget:
+    """
+    按条目数和总大小限制一张缓存表, 超出时按最近访问时间(LRU)淘汰
+
+    表需要有`key`、`size`和`accessed_at`三列。写入时只累加内存中的条目数和总大小计数, 仅在计数超出限制,
+    或每写入`resync_every`次(其他进程可能也在写同一个文件)时才扫描全表校准计数并淘汰。
+    命中时的访问时间先记在内存中, 攒够`flush_every`条或淘汰前再批量写回, 读缓存不再每次都写数据库。
+    """
+
+    def __init__(
+        self,
+        db: SQLiteDatabase,
+        table: str,
+        max_entries: int,
+        max_bytes: int,
+        flush_every: int = 256,
+        resync_every: int = 1000,
+    ):
+        """
+        Args:
+            db: 缓存表所在的数据库
+            table: 表名
+            max_entries: 最多保留的条目数
+            max_bytes: 所有条目size之和的上限
+            flush_every: 内存中积攒多少条访问时间后写回数据库
+            resync_every: 每写入多少次扫描一次全表, 校准计数
+        """
+        self.db = db
+        self.table = table
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self.resync_every = resync_every
+        self._count: Optional[int] = None  # None表示还未扫描过表
+        self._size = 0
+        self._writes = 0
+        self._accessed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, key: str):
+        """记录一次命中"""
+        with self._lock:
+            self._accessed[key] = time.time()
+            full = len(self._accessed) >= self.flush_every
+        if full:
+            self.flush()
+
+    def flush(self, conn: Optional[sqlite3.Connection] = None):
+        """把内存中的访问时间写回数据库"""
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+        if not accessed:
+            return
+        try:
+            if conn is not None:
+                self._write_accessed(conn, accessed)
+            else:
+                with self.db.connect() as conn:
+                    self._write_accessed(conn, accessed)
+        except sqlite3.Error as e:
+            # 访问时间只影响淘汰顺序, 写回失败不影响缓存结果
+            logger.warning(f"Failed to write the access times of {self.table}: {e}")
+
+    def added(self, conn: sqlite3.Connection, size: int) -> int:
+        """
+        在写入一条记录的事务中调用, 必要时淘汰旧条目
+
+        Args:
+            conn: 写入所用的连接
+            size: 新条目的大小
+
+        Returns:
+            淘汰的条目数
+        """
+        with self._lock:
+            self._writes += 1
+            if self._count is not None:
+                # 覆盖已有的key时会多算, 计数只会偏大, 偏大时的全表扫描会把它校准回来
+                self._count += 1
+                self._size += size
+            over_budget = (
+                self._count is None
+                or self._count > self.max_entries
+                or self._size > self.max_bytes
+                or self._writes % self.resync_every == 0
+            )
+        if not over_budget:
+            return 0
+        return self._evict(conn)
+
+    def removed(self, size: int = 0):
+        """记录一条被删除的记录"""
+        with self._lock:
+            if self._count is not None:
+                self._count = max(self._count - 1, 0)
+                self._size = max(self._size - size, 0)
+
+    def cleared(self):
+        """记录整表被清空, 下次写入时重新扫描"""
+        with self._lock:
+            self._count = None
+            self._size = 0
+            self._accessed = {}
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        self.flush(conn)
+        count, total_size = conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+        ).fetchone()
+        evicted = 0
+        # 按最近访问时间淘汰最旧的条目, 直到条目数和总大小都满足限制
+        while count > self.max_entries or total_size > self.max_bytes:
+            batch = max(count - self.max_entries, 1)
+            rows = conn.execute(
+                f"SELECT key, size FROM {self.table} ORDER BY accessed_at ASC LIMIT ?",
+                (batch,),
+            ).fetchall()
+            if not rows:
+                break
+            conn.executemany(
+                f"DELETE FROM {self.table} WHERE key = ?", [(key,) for key, _ in rows]
+            )
+            count -= len(rows)
+            total_size -= sum(size for _, size in rows)
+            evicted += len(rows)
+        with self._lock:
+            self._count = count
+            self._size = total_size
+        return evicted
+
+    def _write_accessed(self, conn: sqlite3.Connection, accessed: Dict[str, float]):
+        conn.executemany(
+            f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in accessed.items()],
+        )
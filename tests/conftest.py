@@ -0,0 +1,106 @@
+import functools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils import logger as log_module
+
+
+class LocalServer(ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+@pytest.fixture(autouse=True, scope="session")
+def log_files_in_tmp(tmp_path_factory):
+    """Write the log files of the search engine loggers to a temporary directory instead of logs/."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        log_dir = str(tmp_path_factory.mktemp("logs"))
+        monkeypatch.setattr(log_module, "LogConfig", functools.partial(log_module.LogConfig, log_dir=log_dir))
+        yield
+
+
+@pytest.fixture
+def serve():
+    """
+    Start local HTTP servers on free ports, each serving one request handler class
+    in a background thread, and shut them down after the test.
+    """
+    servers = []
+
+    def start(handler) -> ThreadingHTTPServer:
+        server = LocalServer(("localhost", 0), handler)
+        # 缩短轮询间隔, shutdown不必等待默认的0.5秒
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def refine_and_score(prompt: str) -> str:
+    """
+    Answer PAGE_REFINE_PROMPT with the page minus its image and ad lines, and every other
+    prompt, such as SIMILARITY_PROMPT, with a score of 90.
+    """
+    if "Original web page content:\n" not in prompt:
+        return "Relevant. <SCORE>90</SCORE>"
+    page = prompt.split("Original web page content:\n", 1)[1].split("\n\n[Output requirements]", 1)[0]
+    body = "\n".join(line for line in page.splitlines() if not line.startswith("!["))
+    return f"<TITLE>Refined page</TITLE><CONTENT>{body}</CONTENT>"
+
+
+class StubLLM:
+    """
+    Local stand-in for the `/infer` server of LocalRequest. Every conversation is answered with
+    `answer(prompt)`, the prompt being the content of its last message, after `delay` seconds.
+    """
+
+    def __init__(self, serve, answer=refine_and_score, delay=0.0):
+        self.answer = answer
+        self.delay = delay
+        self.prompts = []
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                instances = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["instances"]
+                prompts = [messages[-1]["content"] for messages in instances]
+                with stub.lock:
+                    stub.prompts.extend(prompts)
+                    stub.in_flight += 1
+                    stub.peak = max(stub.peak, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    body = json.dumps([stub.answer(prompt) for prompt in prompts]).encode("utf-8")
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.port = serve(Handler).server_address[1]
+
+
+@pytest.fixture
+def stub_llm(serve):
+    """Start `StubLLM` servers: `stub_llm(answer=refine_and_score, delay=0.0)`."""
+    def start(answer=refine_and_score, delay=0.0) -> StubLLM:
+        return StubLLM(serve, answer, delay)
+
+    return start
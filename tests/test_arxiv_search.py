@@ -0,0 +1,119 @@
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+from src.rag.config import ArxivConfig
+from src.rag.search_engine import ArxivSearchEngine, IncompleteSearchResults
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/"
+      xmlns:arxiv="http://arxiv.org/schemas/atom">
+  <title>arXiv Query</title>
+  <opensearch:totalResults>{total}</opensearch:totalResults>
+  <opensearch:startIndex>{start}</opensearch:startIndex>
+  <opensearch:itemsPerPage>{count}</opensearch:itemsPerPage>
+{entries}
+</feed>
+"""
+
+ENTRY = """  <entry>
+    <id>http://arxiv.org/abs/2401.{i:05d}v1</id>
+    <updated>2024-01-02T00:00:00Z</updated>
+    <published>2024-01-01T00:00:00Z</published>
+    <title>Paper {i}</title>
+    <summary>Abstract of paper {i}</summary>
+    <author><name>Author {i}</name></author>
+    <link href="http://arxiv.org/abs/2401.{i:05d}v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/2401.{i:05d}v1" rel="related" type="application/pdf"/>
+    <arxiv:primary_category term="cs.CL"/>
+    <category term="cs.CL"/>
+  </entry>"""
+
+
+class StubArxiv:
+    """Local stand-in for the arXiv API serving `total` results, with keep-alive connections."""
+
+    def __init__(self, serve, total, failing_starts=()):
+        self.total = total
+        self.failing_starts = set(failing_starts)
+        self.requests = []  # (client port, start, page size, time)
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                query = parse_qs(urlsplit(self.path).query)
+                start, size = int(query["start"][0]), int(query["max_results"][0])
+                stub.requests.append((self.client_address[1], start, size, time.perf_counter()))
+                if start in stub.failing_starts:
+                    self.send_response(500)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                indices = range(start, min(start + size, stub.total))
+                body = FEED.format(
+                    total=stub.total,
+                    start=start,
+                    count=len(indices),
+                    entries="\n".join(ENTRY.format(i=i) for i in indices),
+                ).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/atom+xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = serve(Handler)
+
+    def engine(self, **config):
+        config.setdefault("page_size", 10)
+        config.setdefault("delay_seconds", 0.1)
+        config.setdefault("num_retries", 0)
+        return ArxivSearchEngine(ArxivConfig(base_url=f"http://localhost:{self.server.server_address[1]}/api/query", **config))
+
+
+def test_results_are_paged_by_page_size(serve):
+    stub = StubArxiv(serve, total=40)
+
+    results = stub.engine().search("cat:cs.CL", max_results=25)
+
+    assert [r.title for r in results] == [f"Paper {i}" for i in range(25)]
+    assert [(start, size) for _, start, size, _ in stub.requests] == [(0, 10), (10, 10), (20, 10)]
+    assert results[0].metadata["pdfUrl"] == "http://arxiv.org/pdf/2401.00000v1"
+
+
+def test_paging_stops_at_the_total(serve):
+    stub = StubArxiv(serve, total=15)
+
+    results = stub.engine().search("cat:cs.CL", max_results=100)
+
+    assert len(results) == 15
+    assert len(stub.requests) == 2
+
+
+def test_long_lived_client_reuses_its_connection_and_spacing(serve):
+    stub = StubArxiv(serve, total=40)
+    engine = stub.engine(delay_seconds=0.2)
+
+    engine.search("cat:cs.CL", max_results=20)
+    engine.search("cat:cs.LG", max_results=20)
+
+    assert len(stub.requests) == 4
+    # 同一个client的所有请求复用一个keep-alive连接, 请求间隔跨越不同的搜索
+    assert len({port for port, _, _, _ in stub.requests}) == 1
+    starts = [started for _, _, _, started in stub.requests]
+    assert min(b - a for a, b in zip(starts, starts[1:])) >= 0.18
+
+
+def test_failed_page_returns_incomplete_results(serve):
+    stub = StubArxiv(serve, total=40, failing_starts={10})
+
+    results = stub.engine().search("cat:cs.CL", max_results=30)
+
+    assert isinstance(results, IncompleteSearchResults)
+    assert [r.title for r in results] == [f"Paper {i}" for i in range(10)]
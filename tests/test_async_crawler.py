@@ -0,0 +1,207 @@
+import asyncio
+import json
+
+import pytest
+
+from src.rag.async_crawler import AsyncCrawler
+from src.rag.crawl_cache import CrawlCache
+from src.rag.domain_health import DomainHealth
+
+
+def make_crawler(llm, **kwargs):
+    kwargs.setdefault("domain_health", DomainHealth(path=None))
+    kwargs.setdefault("http_fast_path", False)
+    kwargs.setdefault("pdf_extraction", False)
+    return AsyncCrawler(model="stub", infer_type="local", port=llm.port, **kwargs)
+
+
+def long_page(paragraphs=60, ads=1500):
+    text = [f"Paragraph {i}: attention lets every token of a transformer weigh every other token of the sequence." for i in range(paragraphs)]
+    noise = [f"![ad {i}](https://ads.example.com/banner/{i}.png?campaign=spring&slot={i * 7})" for i in range(ads)]
+    lines = []
+    for i, line in enumerate(noise):
+        lines.append(line)
+        if i % (ads // paragraphs) == 0 and text:
+            lines.append(text.pop(0))
+    return "\n".join(lines + text)
+
+
+def test_page_above_max_refine_tokens_is_refined_in_chunks(stub_llm):
+    llm = stub_llm()
+    crawler = make_crawler(llm, clean_markdown=False, quality_gate=False)
+    page = long_page()
+    assert crawler.chunker.count(page) > AsyncCrawler.MAX_REFINE_TOKENS
+    assert len(page) > AsyncCrawler.DEFAULT_MAX_LENGTH
+
+    data = asyncio.run(crawler._process_filter_and_title(
+        {"topic": "attention", "url": "https://example.org/long", "raw_content": page, "error": False}
+    ))
+
+    assert not data["error"]
+    assert crawler.refine_stats["chunked_pages"] == 1
+    assert crawler.refine_stats["chunks"] == len(llm.prompts) > 1
+    assert "![" not in data["filtered"]
+    assert data["filtered"].count("Paragraph ") == 60
+    assert len(data["filtered"]) <= AsyncCrawler.DEFAULT_MAX_LENGTH
+
+
+def test_only_short_and_oversized_pages_are_dropped_before_refinement(stub_llm):
+    llm = stub_llm()
+    crawler = make_crawler(llm, clean_markdown=False, quality_gate=False)
+    crawler.MAX_PAGE_TOKENS = 1000
+
+    for raw_content in ("too short", long_page(paragraphs=20, ads=200)):
+        data = asyncio.run(crawler._process_filter_and_title(
+            {"topic": "attention", "url": "https://example.org/page", "raw_content": raw_content, "error": False}
+        ))
+        assert data["error"]
+
+    assert crawler.refine_stats["dropped_pages"] == 2
+    assert llm.prompts == []
+
+
+def page_text(i):
+    return f"Page {i} explains how attention weighs the tokens of a sequence. " * 8
+
+
+def read_output(path):
+    return [json.loads(line) for line in open(path, encoding="utf-8")]
+
+
+def test_crawl_cache_hits_skip_the_crawl(stub_llm, tmp_path):
+    cache = CrawlCache(str(tmp_path / "crawl.sqlite"))
+    urls = [f"https://example.org/{i}" for i in range(3)]
+    for i, url in enumerate(urls[:2]):
+        cache.put(url, page_text(i))
+    crawler = make_crawler(stub_llm(), crawl_cache=cache, quality_gate=False)
+    crawled = []
+
+    async def crawl(url):
+        crawled.append(url)
+        return page_text(2)
+
+    crawler._simple_crawl = crawl
+    output = tmp_path / "out.jsonl"
+    asyncio.run(crawler.run("attention", urls, str(output), deduplicate=False))
+
+    assert crawled == [urls[2]]
+    assert crawler.crawl_stats["cache_hits"] == 2
+    assert crawler.crawl_stats["fetched"] == 1
+    assert cache.get(urls[2]) == page_text(2)
+    [topic] = read_output(output)
+    assert sorted(paper["url"] for paper in topic["papers"]) == urls
+
+
+def test_interrupted_run_resumes_from_the_journal(stub_llm, tmp_path):
+    # 每个页面在不同的host上, 不受同一host的请求间隔限制
+    urls = [f"https://site{i}.example.org/paper" for i in range(6)]
+    # 长度各不相同, 输出中的论文顺序与完成顺序无关
+    pages = {url: page_text(i) + "Details. " * i for i, url in enumerate(urls)}
+
+    def make(llm, name, crawled, stalled=()):
+        # 每次运行使用独立的空缓存, 页面都需要重新爬取, 且不预先启动浏览器
+        crawler = make_crawler(llm, crawl_cache=CrawlCache(str(tmp_path / f"{name}.sqlite")), quality_gate=False)
+
+        async def crawl(url):
+            crawled.append(url)
+            if url in stalled:
+                await asyncio.Event().wait()
+            return pages[url]
+
+        crawler._simple_crawl = crawl
+        return crawler
+
+    reference = make(stub_llm(), "reference", [])
+    asyncio.run(reference.run("attention", urls, str(tmp_path / "reference.jsonl"), deduplicate=False))
+
+    journal = str(tmp_path / "journal.jsonl")
+    interrupted = make(stub_llm(), "interrupted", [], stalled=urls[3:])
+
+    async def interrupt_after_three_pages():
+        task = asyncio.create_task(
+            interrupted.run("attention", urls, str(tmp_path / "out.jsonl"), deduplicate=False, journal_path=journal)
+        )
+        # 三个页面各自记录crawled, refined和scored后中断
+        while interrupted.journal is None or interrupted.journal.records < 9:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(interrupt_after_three_pages())
+    assert read_output(tmp_path / "out.jsonl") == []
+
+    llm = stub_llm()
+    crawled = []
+    resumed = make(llm, "resumed", crawled)
+    asyncio.run(resumed.run(
+        "attention", urls, str(tmp_path / "out.jsonl"), deduplicate=False, journal_path=journal, resume=True
+    ))
+
+    assert sorted(crawled) == urls[3:]
+    assert resumed.crawl_stats["resumed"] == 3
+    # 已打分的页面不再调用LLM, 其余页面各一次提炼和一次打分
+    assert len(llm.prompts) == 6
+    assert (tmp_path / "out.jsonl").read_bytes() == (tmp_path / "reference.jsonl").read_bytes()
+
+
+def score_prompts(llm, topic):
+    return [prompt for prompt in llm.prompts if f"Topic: {topic}" in prompt]
+
+
+def test_url_shared_by_two_topics_is_crawled_once_and_scored_per_topic(stub_llm, tmp_path):
+    shared = "https://shared.example.org/paper"
+    pages = {shared: page_text(0), "https://a.example.org/paper": page_text(1), "https://b.example.org/paper": page_text(2)}
+    llm = stub_llm()
+    crawler = make_crawler(llm, crawl_cache=CrawlCache(str(tmp_path / "crawl.sqlite")), quality_gate=False)
+    crawled = []
+
+    async def crawl(url):
+        crawled.append(url)
+        return pages[url]
+
+    crawler._simple_crawl = crawl
+    output = tmp_path / "out.jsonl"
+    asyncio.run(crawler.run_many(
+        {"attention": [shared, "https://a.example.org/paper"], "transformers": [shared, "https://b.example.org/paper"]},
+        str(output),
+        deduplicate=False,
+    ))
+
+    assert sorted(crawled) == sorted(pages)
+    for topic in ("attention", "transformers"):
+        prompts = score_prompts(llm, topic)
+        assert len(prompts) == 2
+        assert sum("Page 0 explains" in prompt for prompt in prompts) == 1
+    results = {line["title"]: sorted(paper["url"] for paper in line["papers"]) for line in read_output(output)}
+    assert results == {
+        "attention": ["https://a.example.org/paper", shared],
+        "transformers": ["https://b.example.org/paper", shared],
+    }
+
+
+def test_each_topic_is_written_as_soon_as_it_completes(stub_llm, tmp_path):
+    output = tmp_path / "out.jsonl"
+    seen_while_crawling = []
+
+    async def crawl(url):
+        if url.startswith("https://slow."):
+            # 慢主题的页面等到快主题的结果写入文件后才返回
+            for _ in range(500):
+                if output.exists() and output.read_text(encoding="utf-8"):
+                    break
+                await asyncio.sleep(0.01)
+            seen_while_crawling.append(read_output(output))
+        return page_text(len(url))
+
+    crawler = make_crawler(stub_llm(), crawl_cache=CrawlCache(str(tmp_path / "crawl.sqlite")), quality_gate=False)
+    crawler._simple_crawl = crawl
+    asyncio.run(crawler.run_many(
+        {"slow topic": ["https://slow.example.org/paper"], "fast topic": ["https://fast.example.org/paper"]},
+        str(output),
+        deduplicate=False,
+    ))
+
+    [written] = seen_while_crawling
+    assert [line["title"] for line in written] == ["fast topic"]
+    assert [line["title"] for line in read_output(output)] == ["fast topic", "slow topic"]
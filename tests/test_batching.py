@@ -0,0 +1,89 @@
+import threading
+from concurrent.futures import wait
+
+import pytest
+
+from src.request.batching import MicroBatchDispatcher
+
+
+class RecordingSender:
+    def __init__(self, fail=None, answers=None):
+        self.batches = []
+        self.fail = fail
+        self.answers = answers
+        self.lock = threading.Lock()
+
+    def __call__(self, messages, params):
+        with self.lock:
+            self.batches.append((list(messages), params))
+        if self.fail is not None:
+            raise self.fail
+        if self.answers is not None:
+            return self.answers
+        return [f"answer to {m}" for m in messages]
+
+
+def submit_all(dispatcher, conversations, params=None):
+    futures = [dispatcher.submit(m, params or {"temperature": 0}) for m in conversations]
+    wait(futures, timeout=5)
+    return futures
+
+
+def test_concurrent_calls_are_coalesced_into_one_request():
+    sender = RecordingSender()
+    dispatcher = MicroBatchDispatcher(sender, max_batch_size=16, max_wait=0.2)
+
+    futures = submit_all(dispatcher, [f"q{i}" for i in range(10)])
+    dispatcher.close()
+
+    assert [f.result() for f in futures] == [f"answer to q{i}" for i in range(10)]
+    assert sender.batches == [([f"q{i}" for i in range(10)], {"temperature": 0})]
+    assert dispatcher.stats() == {"batches": 1, "items": 10, "mean_batch_size": 10.0}
+
+
+def test_batches_are_split_by_size_and_params():
+    sender = RecordingSender()
+    dispatcher = MicroBatchDispatcher(sender, max_batch_size=4, max_wait=0.2)
+
+    futures = submit_all(dispatcher, [f"q{i}" for i in range(6)])
+    futures += [dispatcher.submit("hot", {"temperature": 1})]
+    wait(futures, timeout=5)
+    dispatcher.close()
+
+    assert all(f.result() == f"answer to {m}" for f, m in zip(futures, [f"q{i}" for i in range(6)] + ["hot"]))
+    assert sorted(len(messages) for messages, _ in sender.batches) == [1, 2, 4]
+    assert (["hot"], {"temperature": 1}) in sender.batches
+    assert all(params == {"temperature": 0} for messages, params in sender.batches if messages != ["hot"])
+
+
+def test_request_error_is_raised_by_every_call_of_the_batch():
+    error = RuntimeError("server error")
+    dispatcher = MicroBatchDispatcher(RecordingSender(fail=error), max_wait=0.2)
+
+    futures = submit_all(dispatcher, ["q0", "q1", "q2"])
+    dispatcher.close()
+
+    assert [f.exception() for f in futures] == [error] * 3
+
+
+def test_missing_answers_fail_the_whole_batch():
+    dispatcher = MicroBatchDispatcher(RecordingSender(answers=["only one"]), max_wait=0.2)
+
+    futures = submit_all(dispatcher, ["q0", "q1"])
+    dispatcher.close()
+
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=0)
+
+
+def test_close_sends_pending_calls_and_rejects_new_ones():
+    sender = RecordingSender()
+    dispatcher = MicroBatchDispatcher(sender, max_wait=10)
+
+    future = dispatcher.submit("q0", {})
+    dispatcher.close()
+
+    assert future.result(timeout=0) == "answer to q0"
+    with pytest.raises(RuntimeError):
+        dispatcher.submit("q1", {})
@@ -0,0 +1,47 @@
+import asyncio
+import sqlite3
+
+from src.request import CompletionCache, RequestWrapper
+
+
+def count_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+
+def test_eviction_keeps_the_budget(tmp_path):
+    path = str(tmp_path / "completions.sqlite")
+    cache = CompletionCache(path, max_entries=3)
+
+    for i in range(10):
+        cache.put(f"key{i}", "model", f"answer {i}", {"total_tokens": 1})
+
+    assert count_rows(path) == 3
+    assert cache.stats()["evictions"] == 7
+    assert cache.get("key9")[0] == "answer 9"
+    assert cache.get("key0") is None
+
+
+def test_hits_are_flushed_before_eviction(tmp_path):
+    path = str(tmp_path / "completions.sqlite")
+    cache = CompletionCache(path, max_entries=3)
+    for i in range(3):
+        cache.put(f"key{i}", "model", f"answer {i}", None)
+
+    # 命中只记在内存中, 淘汰前写回, 最近读过的key0不会被淘汰
+    assert cache.get("key0")[0] == "answer 0"
+    cache.put("key3", "model", "answer 3", None)
+
+    assert cache.get("key0") is not None
+    assert cache.get("key1") is None
+
+
+def test_acompletion_serves_cache_hits(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    cache = CompletionCache(str(tmp_path / "completions.sqlite"))
+    wrapper = RequestWrapper(model="cache-test-model", infer_type="OpenAI", cache=cache)
+    message = [{"role": "user", "content": "hello"}]
+    cache.put(CompletionCache.make_key(wrapper.model, message, {}), wrapper.model, "cached answer", {"total_tokens": 3})
+
+    assert asyncio.run(wrapper.acompletion("hello")) == "cached answer"
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,115 @@
+import time
+
+from src.rag.config import ArxivConfig
+from src.rag.search_engine import (
+    CompositeSearchEngine,
+    IncompleteSearchResults,
+    SearchEngine,
+    SearchResult,
+    merge_search_results,
+)
+
+
+def make_result(title, url, source="fake", **metadata):
+    return SearchResult(title=title, url=url, snippet="", source=source, metadata=metadata)
+
+
+class SlowEngine(SearchEngine):
+    """An engine whose search takes several requests, each well within the per-request timeout."""
+
+    def __init__(self, seconds, results, **config):
+        self.seconds = seconds
+        self.results = results
+        self.config = ArxivConfig(**config)
+
+    def search(self, query, **kwargs):
+        time.sleep(self.seconds)
+        return self.results
+
+
+def test_search_budget_is_not_the_request_timeout():
+    engine = SlowEngine(0.3, [make_result("Paper", "https://example.org/1")], timeout=0.1, search_timeout=5)
+
+    results = CompositeSearchEngine([engine]).search("query")
+
+    assert not isinstance(results, IncompleteSearchResults)
+    assert [r.url for r in results] == ["https://example.org/1"]
+
+
+def test_engine_over_the_search_budget_is_skipped():
+    slow = SlowEngine(1.0, [make_result("Slow", "https://example.org/slow")], search_timeout=0.2)
+    fast = SlowEngine(0.0, [make_result("Fast", "https://example.org/fast")])
+
+    results = CompositeSearchEngine([slow, fast]).search("query")
+
+    assert isinstance(results, IncompleteSearchResults)
+    assert [r.url for r in results] == ["https://example.org/fast"]
+
+
+def test_generic_titles_are_not_merged():
+    results = merge_search_results([
+        make_result("Introduction", "https://a.org/paper", year=2020),
+        make_result("Introduction", "https://b.org/other", year=2021),
+        make_result("Introduction", "https://c.org/third"),
+    ])
+
+    assert len(results) == 3
+
+
+def test_same_paper_is_merged_by_doi_arxiv_id_or_url():
+    results = merge_search_results([
+        make_result("Attention Is All You Need", "https://arxiv.org/abs/1706.03762", source="arxiv"),
+        make_result("Attention is all you need", "https://arxiv.org/pdf/1706.03762v5", source="google_scholar"),
+        make_result("A survey", "https://doi.org/10.1000/xyz", source="arxiv"),
+        make_result("A Survey.", "https://publisher.org/article", source="google_scholar", doi="10.1000/XYZ"),
+        make_result("Same page", "https://example.org/page/", source="arxiv"),
+        make_result("Same page", "http://example.org/page", source="google_scholar"),
+    ])
+
+    assert len(results) == 3
+    assert all(r.metadata["sources"] == ["arxiv", "google_scholar"] for r in results)
+
+
+class FixedEngine(SearchEngine):
+    def __init__(self, results):
+        self.results = results
+
+    def search(self, query, **kwargs):
+        return self.results
+
+
+def test_same_paper_from_two_engines_under_different_urls_is_merged():
+    # 没有DOI, 两个引擎给出的url也不同, 由标题加年份或第一作者识别为同一篇论文
+    scholar = FixedEngine([
+        make_result(
+            "Transformer in Transformer", "https://proceedings.neurips.cc/paper/2021/hash/854d9fca-Abstract.html",
+            source="Google Scholar", year=2021, publicationInfo="K Han, A Xiao, E Wu… - Advances in neural …, 2021 - neurips.cc",
+        ),
+        make_result(
+            "Image Transformer", "http://proceedings.mlr.press/v80/parmar18a.html",
+            source="Google Scholar", year=2018, publicationInfo="N Parmar, A Vaswani, J Uszkoreit… - International …, 2018",
+        ),
+    ])
+    arxiv = FixedEngine([
+        make_result(
+            "Transformer in transformer", "http://arxiv.org/abs/2103.00112v3", source="arXiv",
+            authors=["Kai Han", "An Xiao"], published="2021-02-27 07:25:29+00:00",
+        ),
+        make_result(
+            "Image Transformer", "http://arxiv.org/abs/1802.05751v3", source="arXiv",
+            authors=["Niki Parmar", "Ashish Vaswani"], published="2018-02-15 19:27:31+00:00",
+        ),
+        make_result(
+            "Image transformer", "http://arxiv.org/abs/2301.00001v1", source="arXiv",
+            authors=["Someone Else"], published="2023-01-01 00:00:00+00:00",
+        ),
+    ])
+
+    results = CompositeSearchEngine([scholar, arxiv]).search("transformer")
+
+    assert len(results) == 3
+    assert results[0].metadata["urls"] == [
+        "https://proceedings.neurips.cc/paper/2021/hash/854d9fca-Abstract.html", "http://arxiv.org/abs/2103.00112v3"
+    ]
+    assert results[1].metadata["sources"] == ["Google Scholar", "arXiv"]
+    assert results[2].url == "http://arxiv.org/abs/2301.00001v1"
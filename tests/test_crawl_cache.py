@@ -0,0 +1,25 @@
+from src.rag.crawl_cache import CrawlCache, normalize_url
+
+
+def test_urls_are_normalized_into_one_key():
+    assert normalize_url("HTTPS://Example.org:443/paper/?utm_source=x&b=2&a=1#intro") == "http://example.org/paper?a=1&b=2"
+
+
+def test_hit_and_miss(tmp_path):
+    cache = CrawlCache(str(tmp_path / "crawl.sqlite"))
+    cache.put("https://example.org/paper", "# Paper")
+
+    assert cache.get("http://example.org/paper/") == "# Paper"
+    assert cache.get("https://example.org/other") is None
+    assert cache.fresh_urls(["https://example.org/paper", "https://example.org/other"]) == {"https://example.org/paper"}
+
+
+def test_stale_entries_are_misses(tmp_path):
+    cache = CrawlCache(str(tmp_path / "crawl.sqlite"), max_age=60)
+    cache.put("https://example.org/paper", "# Paper")
+    with cache._db.connect() as conn:
+        conn.execute("UPDATE pages SET fetched_at = fetched_at - 120")
+
+    assert cache.get("https://example.org/paper") is None
+    assert not cache.contains("https://example.org/paper")
+    assert cache.get("https://example.org/paper", max_age=3600) == "# Paper"
@@ -0,0 +1,91 @@
+import numpy as np
+
+from src.rag.dedup import NearDuplicateDetector, optimal_bands, select_representatives, shingles
+
+
+def words(prefix, count):
+    return [f"{prefix}{i}" for i in range(count)]
+
+
+def pair_with_jaccard(seed, jaccard, count=200):
+    """Two texts of `count` distinct words whose word sets have the given Jaccard similarity."""
+    shared = round(2 * jaccard * count / (1 + jaccard))
+    first = words(f"a{seed}x", count)
+    second = first[:shared] + words(f"b{seed}x", count - shared)
+    return " ".join(first), " ".join(second)
+
+
+def candidate_rate(jaccard, pairs=200, threshold=0.8):
+    found = 0
+    for seed in range(pairs):
+        first, second = pair_with_jaccard(seed, jaccard)
+        detector = NearDuplicateDetector(threshold=threshold, shingle_size=1)
+        detector.add("first", first)
+        found += "first" in detector.index.query(detector.signature(second))
+    return found / pairs
+
+
+def test_shingles_are_unique_word_ngrams():
+    assert len(shingles("a b c d e f g", size=5)) == 3
+    assert len(shingles("a b a b a b", size=2)) == 2
+    assert shingles("", size=5).size == 0
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert np.array_equal(shingles("The quick, brown fox!", size=2), shingles("the quick brown fox", size=2))
+
+
+def test_short_text_yields_one_shingle():
+    assert len(shingles("only three words", size=5)) == 1
+    assert not np.array_equal(shingles("only three words", size=5), shingles("only three others", size=5))
+
+
+def test_lsh_bands_cross_half_at_the_threshold():
+    bands, rows = optimal_bands(0.8, 128)
+    assert bands * rows <= 128
+    assert abs(1 - (1 - 0.8 ** rows) ** bands - 0.5) < 0.1
+
+
+def test_lsh_recall_around_the_threshold():
+    # 阈值处是S曲线的中点, 约一半的候选被找到; 明显高于阈值的几乎全部找到, 明显低于的几乎没有
+    assert 0.35 <= candidate_rate(0.8) <= 0.65
+    assert candidate_rate(0.9) >= 0.9
+    assert candidate_rate(0.5) <= 0.02
+
+
+def test_add_drops_the_shorter_copy_that_arrives_later():
+    first, second = pair_with_jaccard(0, 0.95)
+    detector = NearDuplicateDetector()
+
+    assert detector.add("long", first, quality=10) == (None, None)
+    assert detector.add("short", second, quality=5) == ("long", None)
+
+
+def test_add_supersedes_the_shorter_copy_that_arrived_first():
+    first, second = pair_with_jaccard(0, 0.95)
+    detector = NearDuplicateDetector()
+
+    assert detector.add("short", first, quality=5) == (None, None)
+    assert detector.add("long", second, quality=10) == (None, "short")
+    # 之后的副本与新的代表比较
+    assert detector.add("longer", first, quality=20) == (None, "long")
+    assert detector.add("shortest", second, quality=1) == ("longer", None)
+
+
+def test_add_keeps_distinct_texts():
+    first, second = pair_with_jaccard(0, 0.3)
+    detector = NearDuplicateDetector()
+
+    assert detector.add("first", first) == (None, None)
+    assert detector.add("second", second) == (None, None)
+
+
+def test_select_representatives_keeps_the_best_of_each_cluster():
+    first, second = pair_with_jaccard(0, 0.95)
+    other = " ".join(words("c", 200))
+    items = [("a", first, 1), ("b", second, 2), ("c", other, 1)]
+
+    kept, dropped = select_representatives(items, text=lambda item: item[1], quality=lambda item: item[2])
+
+    assert [item[0] for item in kept] == ["b", "c"]
+    assert dropped == 1
@@ -0,0 +1,127 @@
+import hashlib
+import os
+
+import numpy as np
+
+from src.rag.document_store import DocumentStore
+
+
+class HashingEmbedder:
+    """Bag-of-words embedder: every word adds one to a hashed dimension."""
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.texts = 0
+
+    def embed(self, texts):
+        self.texts += len(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+SUBJECTS = ["attention", "convolution", "recurrence", "diffusion", "retrieval", "quantization"]
+
+
+def paper(subject, url=None):
+    text = " ".join(f"{subject} {subject}s improve {subject} models on benchmark {i}." for i in range(40))
+    return {"title": f"On {subject}", "url": url or f"https://example.org/{subject}", "txt": text, "similarity": 90}
+
+
+def open_store(directory, embedder, **kwargs):
+    return DocumentStore(str(directory), embedder=embedder, chunk_tokens=64, overlap_tokens=8, **kwargs)
+
+
+def test_papers_are_searchable_after_reopening(tmp_path):
+    embedder = HashingEmbedder()
+    with open_store(tmp_path, embedder) as store:
+        added = store.add_papers("deep learning", [paper(subject) for subject in SUBJECTS])
+    assert added > len(SUBJECTS)
+    embedded = embedder.texts
+
+    with open_store(tmp_path, embedder) as store:
+        assert len(store) == added
+        [best] = store.search("diffusion models", k=1)
+        assert best["url"] == "https://example.org/diffusion"
+        assert best["topic"] == "deep learning"
+        assert best["title"] == "On diffusion"
+        assert 0 < best["score"] <= 1.0
+    # 重新打开只加载索引, 不重新计算任何chunk的向量
+    assert embedder.texts == embedded + 1
+
+
+def test_duplicate_topic_and_url_pairs_are_skipped(tmp_path):
+    embedder = HashingEmbedder()
+    with open_store(tmp_path, embedder) as store:
+        added = store.add_papers("deep learning", [paper("attention"), paper("attention")])
+        assert added == store.add_papers("transformers", [paper("attention")])
+
+    with open_store(tmp_path, embedder) as store:
+        assert store.add_papers("deep learning", [paper("attention")]) == 0
+        assert len(store) == 2 * added
+        assert ("deep learning", "https://example.org/attention") in store
+        assert ("vision", "https://example.org/attention") not in store
+
+
+def test_search_is_restricted_to_a_topic(tmp_path):
+    with open_store(tmp_path, HashingEmbedder()) as store:
+        store.add_papers("language", [paper("attention"), paper("recurrence")])
+        store.add_papers("vision", [paper("convolution"), paper("diffusion")])
+
+        results = store.search("attention models", k=50, topic="vision")
+        assert results and {result["topic"] for result in results} == {"vision"}
+        assert store.search("attention models", k=1, topic="language")[0]["url"] == "https://example.org/attention"
+        assert store.search("attention models", topic="audio") == []
+
+
+def test_torn_writes_are_truncated_and_the_index_caught_up_on_open(tmp_path):
+    embedder = HashingEmbedder()
+    with open_store(tmp_path, embedder) as store:
+        added = store.add_papers("deep learning", [paper(subject) for subject in SUBJECTS[:3]])
+    # 崩溃时: 索引未保存, 元数据最后一行只写了一半
+    os.remove(tmp_path / DocumentStore.INDEX_FILE)
+    with open(tmp_path / DocumentStore.CHUNKS_FILE, "ab") as f:
+        f.write(b'{"topic": "deep learning", "url": "https://example.org/torn"')
+    embedded = embedder.texts
+
+    with open_store(tmp_path, embedder) as store:
+        assert len(store) == added
+        # 索引由已保存的向量重建, 不重新计算向量
+        assert store.index.ntotal == added
+        assert embedder.texts == embedded
+        assert ("deep learning", "https://example.org/torn") not in store
+        store.add_papers("deep learning", [paper("retrieval")])
+        assert store.search("retrieval models", k=1)[0]["url"] == "https://example.org/retrieval"
+    with open(tmp_path / DocumentStore.CHUNKS_FILE, "rb") as f:
+        assert all(line.endswith(b"\n") for line in f)
+
+
+def test_auto_index_migrates_from_flat_to_ivf(tmp_path):
+    import faiss
+
+    with open_store(tmp_path, HashingEmbedder(), flat_max=30, nprobe=64) as store:
+        store.add_papers("deep learning", [paper(subject) for subject in SUBJECTS[:2]])
+        assert isinstance(store.index, faiss.IndexFlatIP)
+        store.add_papers("deep learning", [paper(subject) for subject in SUBJECTS[2:]])
+        assert len(store) > 30
+        assert isinstance(store.index, faiss.IndexIVF)
+        assert store.index.ntotal == len(store)
+        assert store.search("quantization models", k=1)[0]["url"] == "https://example.org/quantization"
+
+    with open_store(tmp_path, HashingEmbedder(), flat_max=30) as store:
+        assert isinstance(store.index, faiss.IndexIVF)
+
+
+def test_ivf_index_is_retrained_once_the_store_outgrows_it(tmp_path):
+    with open_store(tmp_path, HashingEmbedder(), index_type="ivf", nprobe=64) as store:
+        store.add_papers("deep learning", [paper(f"subject{i}") for i in range(2)])
+        trained_cells = store.index.nlist
+        store.add_papers("deep learning", [paper(f"subject{i}") for i in range(2, 4)])
+        assert store.index.nlist == trained_cells
+
+        store.add_papers("deep learning", [paper(f"subject{i}") for i in range(4, 10)])
+        assert store.index.nlist >= DocumentStore.IVF_REBALANCE_FACTOR * trained_cells
+        assert store.index.ntotal == len(store)
+        assert store.search("subject7 models", k=1)[0]["url"] == "https://example.org/subject7"
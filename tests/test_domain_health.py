@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import pytest
+
+from src.rag.domain_health import DomainCircuitOpen, DomainHealth
+
+URL = "https://flaky.example.org/paper"
+
+
+def fail(health, times):
+    for _ in range(times):
+        health.check(URL)
+        health.record_failure(URL, 1.0)
+
+
+def test_circuit_opens_after_failure_threshold():
+    health = DomainHealth(path=None, failure_threshold=3)
+
+    fail(health, 2)
+    health.check(URL)
+    fail(health, 1)
+
+    with pytest.raises(DomainCircuitOpen):
+        health.check(URL)
+    assert health.stats.circuits_opened == 1
+    assert health.stats.skipped == 1
+    # 其他域名不受影响
+    health.check("https://healthy.example.org/paper")
+
+
+def test_single_probe_after_cooldown_then_closed_on_success():
+    health = DomainHealth(path=None, failure_threshold=2, cooldown=0.1)
+    fail(health, 2)
+    time.sleep(0.15)
+
+    health.check(URL)
+    with pytest.raises(DomainCircuitOpen):
+        health.check(URL)
+
+    health.record_success(URL)
+    health.check(URL)
+    health.check(URL)
+
+
+def test_failed_probe_opens_the_circuit_again():
+    health = DomainHealth(path=None, failure_threshold=2, cooldown=0.1)
+    fail(health, 2)
+    time.sleep(0.15)
+
+    fail(health, 1)
+
+    with pytest.raises(DomainCircuitOpen):
+        health.check(URL)
+    assert health.stats.circuits_opened == 2
+
+
+def test_state_is_reloaded_from_the_persisted_file(tmp_path):
+    path = str(tmp_path / "health.sqlite")
+    health = DomainHealth(path=path, failure_threshold=2, min_samples=2)
+    health.record_render("https://slow.example.org/a", 10.0)
+    health.record_render("https://slow.example.org/b", 20.0)
+    fail(health, 2)
+
+    # 写入是批量的, flush之前文件中还没有记录
+    assert DomainHealth(path=path).check(URL) is None
+    health.flush()
+
+    reloaded = DomainHealth(path=path, failure_threshold=2, min_samples=2, min_timeout=1.0)
+    with pytest.raises(DomainCircuitOpen):
+        reloaded.check(URL)
+    assert reloaded.timeout("https://slow.example.org/c") == 60.0
+
+
+def test_flush_is_due_after_flush_every_changes(tmp_path):
+    health = DomainHealth(path=str(tmp_path / "health.sqlite"), flush_every=2, flush_interval=3600)
+
+    health.record_success("https://a.example.org/")
+    assert not health.flush_due
+    health.record_success("https://b.example.org/")
+    assert health.flush_due
+
+    asyncio.run(health.aflush())
+
+    assert not health.flush_due
+    assert len(DomainHealth(path=str(tmp_path / "health.sqlite"))._domains) == 2
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from src.rag.fair_queue import FairQueue
+
+END = object()
+
+
+def test_items_are_served_round_robin_across_topics():
+    queue = FairQueue(key=lambda item: item[0], end_marker=END)
+    for item in [("a", 1), ("a", 2), ("a", 3), ("a", 4), ("b", 1), ("b", 2), ("c", 1)]:
+        queue.put_nowait(item)
+    queue.put_nowait(END)
+
+    served = []
+    while (item := queue.get_nowait()) is not END:
+        served.append(item)
+
+    assert served == [("a", 1), ("b", 1), ("c", 1), ("a", 2), ("b", 2), ("a", 3), ("a", 4)]
+    assert queue.get_nowait() is END
+
+
+def test_put_waits_for_room_and_end_marker_wakes_getters():
+    async def run():
+        queue = FairQueue(key=lambda item: item[0], end_marker=END, maxsize=1)
+        queue.put_nowait(("a", 1))
+        with pytest.raises(asyncio.QueueFull):
+            queue.put_nowait(("b", 1))
+        put = asyncio.create_task(queue.put(("b", 1)))
+        await asyncio.sleep(0)
+        assert not put.done()
+        assert await queue.get() == ("a", 1)
+        await put
+        assert await queue.get() == ("b", 1)
+
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        queue.put_nowait(END)
+        assert await getter is END
+
+    asyncio.run(run())
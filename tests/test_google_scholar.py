@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+from src.rag.config import GoogleScholarConfig
+from src.rag.search_engine import GoogleScholarSearchEngine, IncompleteSearchResults
+
+RESULTS_PER_PAGE = 10
+
+
+class StubScholar:
+    """Local stand-in for the serper.dev Scholar API, serving `total` results 10 per page."""
+
+    def __init__(self, serve, total, delay=0.0, failing_pages=()):
+        self.total = total
+        self.delay = delay
+        self.failing_pages = set(failing_pages)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.starts = {}
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                page = payload["page"]
+                with stub.lock:
+                    stub.starts[page] = time.perf_counter()
+                    stub.in_flight += 1
+                    stub.peak = max(stub.peak, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    if page in stub.failing_pages:
+                        self.send_response(500)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    first = (page - 1) * RESULTS_PER_PAGE
+                    organic = [
+                        {"title": f"Paper {i}", "link": f"https://example.org/{i}", "snippet": payload["q"], "year": 2024}
+                        for i in range(first, min(first + RESULTS_PER_PAGE, stub.total))
+                    ]
+                    body = json.dumps({"organic": organic}).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = serve(Handler)
+
+    def engine(self, **config):
+        # 令牌桶按base_url共享, 每个测试的服务器端口不同, 互不影响
+        config.setdefault("requests_per_second", 100.0)
+        config.setdefault("burst", 5)
+        return GoogleScholarSearchEngine(
+            GoogleScholarConfig(base_url=f"http://localhost:{self.server.server_address[1]}/scholar", **config),
+            api_key="test",
+        )
+
+
+def test_pages_are_fetched_concurrently_and_kept_in_order(serve):
+    stub = StubScholar(serve, total=100, delay=0.3)
+
+    start = time.perf_counter()
+    results = stub.engine(max_concurrent_pages=5).search("attention", max_results=50)
+    elapsed = time.perf_counter() - start
+
+    assert [r.title for r in results] == [f"Paper {i}" for i in range(50)]
+    assert not isinstance(results, IncompleteSearchResults)
+    assert stub.peak > 1
+    assert elapsed < 5 * stub.delay
+
+
+def test_requests_are_spaced_by_the_token_bucket(serve):
+    stub = StubScholar(serve, total=100)
+
+    results = stub.engine(max_concurrent_pages=5, requests_per_second=10.0, burst=1).search("attention", max_results=50)
+
+    starts = sorted(stub.starts.values())
+    assert len(results) == 50
+    # 5页请求, 每秒10个令牌, 桶容量1
+    assert starts[-1] - starts[0] >= 0.35
+
+
+def test_empty_page_ends_the_results(serve):
+    stub = StubScholar(serve, total=25)
+
+    results = stub.engine().search("attention", max_results=50)
+
+    assert len(results) == 25
+    assert not isinstance(results, IncompleteSearchResults)
+
+
+def test_failed_page_returns_incomplete_results(serve):
+    stub = StubScholar(serve, total=100, failing_pages={2})
+
+    results = stub.engine().search("attention", max_results=50)
+
+    assert isinstance(results, IncompleteSearchResults)
+    assert [r.title for r in results] == [f"Paper {i}" for i in range(10)]
+    assert "2" in results.error
@@ -0,0 +1,193 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import httpx
+
+from src.rag.host_scheduler import HostScheduler, HostThrottled, parse_retry_after
+
+END = object()
+
+
+class StubHost:
+    """
+    A local HTTP server acting as one host. It answers the first `throttled` requests
+    with 429 and `Retry-After`, and every other request with 200 after `delay` seconds.
+    """
+
+    def __init__(self, serve, delay=0.0, throttled=0, retry_after="0"):
+        self.delay = delay
+        self.throttled = throttled
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.requests = []  # (path, start time, status)
+        self.in_flight = 0
+        self.peak = 0
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub.lock:
+                    status = 429 if stub.throttled > 0 else 200
+                    stub.throttled -= 1
+                    stub.requests.append((self.path, time.monotonic(), status))
+                    stub.in_flight += 1
+                    stub.peak = max(stub.peak, stub.in_flight)
+                try:
+                    if status == 200:
+                        time.sleep(stub.delay)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", stub.retry_after)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.url = f"http://localhost:{serve(Handler).server_address[1]}"
+
+    def starts(self, status=None):
+        return [started for _, started, code in self.requests if status is None or code == status]
+
+
+def make_scheduler(**kwargs):
+    kwargs.setdefault("min_interval", 0.0)
+    return HostScheduler(lambda url: url, END, **kwargs)
+
+
+async def crawl(scheduler, urls, workers, dispatched=None):
+    """
+    Fetch `urls` through the scheduler, returning the URLs fetched successfully.
+    The time every URL is handed to a worker is appended to `dispatched` as (url, time).
+    """
+    for url in urls:
+        scheduler.put_nowait(url)
+    scheduler.put_nowait(END)
+    fetched = []
+
+    async def worker(client):
+        while (url := await scheduler.get()) is not END:
+            if dispatched is not None:
+                dispatched.append((url, time.monotonic()))
+            throttled = None
+            try:
+                response = await client.get(url)
+                if response.status_code == 429:
+                    throttled = HostThrottled(url, 429, parse_retry_after(response.headers.get("Retry-After")))
+                else:
+                    fetched.append(url)
+            finally:
+                scheduler.release(url, throttled)
+
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=workers)) as client:
+        await asyncio.gather(*(worker(client) for _ in range(workers)))
+    return fetched
+
+
+def test_hosts_are_served_round_robin():
+    scheduler = make_scheduler(per_host_concurrency=10)
+    for url in ["http://a/1", "http://a/2", "http://a/3", "http://b/1", "http://b/2", "http://b/3", "http://c/1"]:
+        scheduler.put_nowait(url)
+
+    async def drain():
+        return [await scheduler.get() for _ in range(7)]
+
+    assert asyncio.run(drain()) == [
+        "http://a/1", "http://b/1", "http://c/1", "http://a/2", "http://b/2", "http://a/3", "http://b/3"
+    ]
+
+
+def test_per_host_concurrency_and_spacing(serve):
+    hosts = [StubHost(serve, delay=0.3), StubHost(serve, delay=0.3)]
+    urls = [f"{host.url}/{i}" for host in hosts for i in range(6)]
+    scheduler = make_scheduler(per_host_concurrency=2, min_interval=0.1)
+
+    dispatched = []
+    fetched = asyncio.run(crawl(scheduler, urls, workers=8, dispatched=dispatched))
+
+    assert sorted(fetched) == sorted(urls)
+    for host in hosts:
+        assert host.peak == 2
+        # 间隔在派发时检查, 到达stub的时间还受连接建立的抖动影响
+        starts = [started for url, started in dispatched if url.startswith(host.url)]
+        assert min(b - a for a, b in zip(starts, starts[1:])) >= 0.099
+
+
+def test_throttled_host_is_parked_for_retry_after(serve):
+    throttled = StubHost(serve, throttled=1, retry_after="0.5")
+    healthy = StubHost(serve, delay=0.1)
+    urls = [f"{throttled.url}/0"] + [f"{healthy.url}/{i}" for i in range(4)]
+    scheduler = make_scheduler(per_host_concurrency=2)
+
+    fetched = asyncio.run(crawl(scheduler, urls, workers=4))
+
+    assert sorted(fetched) == sorted(urls)
+    [throttled_at], [retried_at] = throttled.starts(429), throttled.starts(200)
+    assert retried_at - throttled_at >= 0.45
+    # 另一个host不受影响, 在停放期间完成了它的全部请求
+    assert max(healthy.starts()) < retried_at
+    assert scheduler.stats.throttled == 1
+    assert scheduler.stats.requeued == 1
+
+
+def test_throttled_item_is_requeued_up_to_max_retries(serve):
+    host = StubHost(serve, throttled=100)
+    scheduler = make_scheduler(max_retries=2)
+
+    fetched = asyncio.run(crawl(scheduler, [f"{host.url}/0"], workers=2))
+
+    assert fetched == []
+    assert len(host.requests) == 3
+    assert scheduler.stats.requeued == 2
+    assert scheduler.stats.gave_up == 1
+
+
+def test_local_items_bypass_politeness():
+    scheduler = make_scheduler(per_host_concurrency=1, min_interval=60)
+
+    async def run():
+        scheduler.put_nowait("http://a/1")
+        scheduler.put_nowait("http://a/2")
+        first = await scheduler.get()
+        scheduler.put_local("http://a/cached")
+        local = await asyncio.wait_for(scheduler.get(), timeout=1)
+        scheduler.release(local)
+        blocked = asyncio.ensure_future(scheduler.get())
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        blocked.cancel()
+        return first, local
+
+    assert asyncio.run(run()) == ("http://a/1", "http://a/cached")
+    assert scheduler.stats.local == 1
+    assert scheduler.stats.dispatched == 1
+
+
+def test_end_marker_waits_for_items_in_flight():
+    scheduler = make_scheduler(backoff_base=0.0)
+
+    async def run():
+        scheduler.put_nowait("http://a/1")
+        scheduler.put_nowait(END)
+        item = await scheduler.get()
+        waiting = asyncio.ensure_future(scheduler.get())
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+
+        # 被限流的请求重新入队, 等待中的get拿到的是它而不是结束标记
+        assert scheduler.release(item, HostThrottled(item, 429))
+        assert await waiting == item
+        waiting = asyncio.ensure_future(scheduler.get())
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+
+        scheduler.release(item)
+        return await waiting
+
+    assert asyncio.run(run()) is END
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from src.rag.async_crawler import AsyncCrawler
+from src.rag.domain_health import DomainHealth
+from src.rag.host_scheduler import HostThrottled
+from src.rag.http_fetcher import HttpFetcher
+
+ARTICLE = "<html><body><article><h1>Attention</h1>" + "<p>Attention weighs every token of the sequence.</p>" * 30 + "</article></body></html>"
+
+# path -> (status, headers, body, delay)
+PAGES = {
+    "/article": (200, {"Content-Type": "text/html; charset=utf-8"}, ARTICLE, 0),
+    "/throttled": (429, {"Retry-After": "7"}, "", 0),
+    "/missing": (404, {"Content-Type": "text/html"}, ARTICLE, 0),
+    "/error": (500, {"Content-Type": "text/html"}, ARTICLE, 0),
+    "/short": (200, {"Content-Type": "text/html"}, "<html><body><p>Cookie settings</p></body></html>", 0),
+    "/spa": (200, {"Content-Type": "text/html"}, '<html><body><div id="root"></div><script src="/app.js"></script></body></html>', 0),
+    "/js-wall": (200, {"Content-Type": "text/html"}, "<html><body><p>Please enable JavaScript to continue.</p>" + "<p>Loading the page.</p>" * 40 + "</body></html>", 0),
+    "/paper.pdf": (200, {"Content-Type": "application/pdf"}, "%PDF-1.4", 0),
+    "/data": (200, {"Content-Type": "application/json"}, "{}", 0),
+    "/huge": (200, {"Content-Type": "text/html"}, "<p>" + "x" * 20000 + "</p>", 0),
+    "/slow": (200, {"Content-Type": "text/html"}, ARTICLE, 1.0),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, headers, body, delay = PAGES[self.path]
+        time.sleep(delay)
+        data = body.encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def site(serve):
+    return f"http://localhost:{serve(Handler).server_address[1]}"
+
+
+def fetch(url, **kwargs):
+    async def run():
+        fetcher = HttpFetcher(**kwargs)
+        try:
+            return await fetcher.fetch(url)
+        finally:
+            await fetcher.aclose()
+
+    return asyncio.run(run())
+
+
+def test_usable_page_is_converted_to_markdown(site):
+    markdown, reason = fetch(f"{site}/article")
+
+    assert reason is None
+    assert "# Attention" in markdown
+    assert markdown.count("Attention weighs every token") == 30
+
+
+def test_throttled_host_raises_with_retry_after(site):
+    with pytest.raises(HostThrottled) as caught:
+        fetch(f"{site}/throttled")
+
+    assert caught.value.status == 429
+    assert caught.value.retry_after == 7
+
+
+@pytest.mark.parametrize("path, reason", [
+    ("/missing", "status_404"),
+    ("/error", "status_500"),
+    ("/short", "too_short"),
+    ("/spa", "spa_shell"),
+    ("/js-wall", "js_wall"),
+    ("/paper.pdf", "pdf"),
+    ("/data", "content_type"),
+])
+def test_unusable_pages_are_escalated(site, path, reason):
+    assert fetch(f"{site}{path}") == (None, reason)
+
+
+def test_oversized_and_slow_responses_are_escalated(site):
+    assert fetch(f"{site}/huge", max_response_bytes=10000) == (None, "too_large")
+    assert fetch(f"{site}/slow", timeout=0.2) == (None, "timeout")
+
+
+def test_crawler_escalates_only_unusable_pages_to_the_browser(stub_llm, site):
+    crawler = AsyncCrawler(
+        model="stub", infer_type="local", port=stub_llm().port,
+        domain_health=DomainHealth(path=None), http_fast_path=True, pdf_extraction=False,
+    )
+    rendered = []
+
+    async def browser_crawl(url):
+        rendered.append(url)
+        return "rendered in the browser"
+
+    crawler._browser_crawl = browser_crawl
+
+    async def run():
+        try:
+            article = await crawler._tiered_crawl(f"{site}/article")
+            escalated = [await crawler._tiered_crawl(f"{site}{path}") for path in ("/missing", "/short", "/spa", "/js-wall")]
+            with pytest.raises(HostThrottled):
+                await crawler._tiered_crawl(f"{site}/throttled")
+            return article, escalated
+        finally:
+            await crawler.http_fetcher.aclose()
+
+    article, escalated = asyncio.run(run())
+
+    assert "Attention weighs every token" in article
+    assert escalated == ["rendered in the browser"] * 4
+    assert rendered == [f"{site}{path}" for path in ("/missing", "/short", "/spa", "/js-wall")]
+    assert crawler.fetch_stats.hits["http"] == 1
+    assert crawler.fetch_stats.escalations == {"status_404": 1, "too_short": 1, "spa_shell": 1, "js_wall": 1, "status_429": 1}
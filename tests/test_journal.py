@@ -0,0 +1,40 @@
+import asyncio
+import os
+import threading
+
+from src.rag.journal import STATE_KEY, RunJournal
+
+
+def record_pages(journal, pages):
+    for i in range(pages):
+        journal.record({"topic": "attention", "url": f"https://example.org/{i}", "similarity": i}, "scored", ("similarity",))
+
+
+def test_fsync_runs_off_the_event_loop(tmp_path, monkeypatch):
+    fsync_threads = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (fsync_threads.append(threading.current_thread()), real_fsync(fd)))
+    journal = RunJournal(str(tmp_path / "journal.jsonl"), fsync_every=2)
+
+    async def run():
+        record_pages(journal, 5)
+        await journal.aclose()
+
+    asyncio.run(run())
+
+    assert fsync_threads and threading.main_thread() not in fsync_threads
+    assert journal.syncs == len(fsync_threads)
+    items = RunJournal(journal.path, resume=True).load()
+    assert len(items) == 5
+    assert items[("attention", "https://example.org/4")] == {
+        "topic": "attention", "url": "https://example.org/4", "error": False, "similarity": 4, STATE_KEY: "scored",
+    }
+
+
+def test_fsync_outside_an_event_loop_is_synchronous(tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"), fsync_every=2)
+    record_pages(journal, 5)
+
+    assert journal.syncs == 2
+    journal.close()
+    assert journal.syncs == 3
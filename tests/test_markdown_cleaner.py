@@ -0,0 +1,27 @@
+"""
+Every `<name>.input.md` of `markdown_cleaner_golden` is cleaned and compared with
+`<name>.expected.md`. After a deliberate change of the cleaning rules, rewrite the expected
+files with `UPDATE_GOLDEN=1 python -m pytest tests/test_markdown_cleaner.py` and review their diff.
+"""
+import glob
+import os
+
+import pytest
+
+from src.rag.markdown_cleaner import MarkdownCleaner
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "markdown_cleaner_golden")
+INPUTS = sorted(glob.glob(os.path.join(GOLDEN_DIR, "*.input.md")))
+
+
+@pytest.mark.parametrize("input_path", INPUTS, ids=[os.path.basename(path)[:-len(".input.md")] for path in INPUTS])
+def test_golden_file(input_path):
+    expected_path = input_path.replace(".input.md", ".expected.md")
+    with open(input_path, encoding="utf-8") as f:
+        cleaned = MarkdownCleaner().clean(f.read()) + "\n"
+
+    if os.environ.get("UPDATE_GOLDEN"):
+        with open(expected_path, "w", encoding="utf-8") as f:
+            f.write(cleaned)
+    with open(expected_path, encoding="utf-8") as f:
+        assert cleaned == f.read()
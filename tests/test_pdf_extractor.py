@@ -0,0 +1,56 @@
+import pytest
+
+from src.rag.pdf_extractor import extract_pdf_text
+
+pytest.importorskip("pypdf")
+
+
+def make_pdf(pages, lines_per_page=20):
+    """A PDF with `pages` pages, every line of page i reading "Page i line j ..."."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for i in range(pages):
+        lines = " T* ".join(f"(Page {i} line {j} attention weighs the tokens.) Tj" for j in range(lines_per_page))
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td {lines} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    body, offsets = b"%PDF-1.4\n", []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return body
+
+
+def test_all_pages_are_extracted_within_the_limits():
+    text, pages_read, total_pages = extract_pdf_text(make_pdf(3), max_pages=10, max_chars=100000)
+
+    assert (pages_read, total_pages) == (3, 3)
+    assert "Page 0 line 0 attention" in text
+    assert "Page 2 line 19 attention" in text
+
+
+def test_extraction_stops_after_max_pages():
+    text, pages_read, total_pages = extract_pdf_text(make_pdf(5), max_pages=2, max_chars=100000)
+
+    assert (pages_read, total_pages) == (2, 5)
+    assert "Page 1 line 19" in text
+    assert "Page 2 " not in text
+
+
+def test_text_is_cut_to_max_chars_at_a_line_break():
+    text, pages_read, total_pages = extract_pdf_text(make_pdf(5), max_pages=10, max_chars=1500)
+
+    # 第一页约900个字符, 第二页之后达到max_chars, 不再解析后面的页
+    assert (pages_read, total_pages) == (2, 5)
+    assert len(text) <= 1500
+    assert text.splitlines()[-1].endswith("attention weighs the tokens.")
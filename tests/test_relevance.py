@@ -0,0 +1,92 @@
+import asyncio
+import json
+import re
+
+import numpy as np
+import pytest
+
+from src.rag.async_crawler import AsyncCrawler
+from src.rag.crawl_cache import CrawlCache
+from src.rag.domain_health import DomainHealth
+from src.rag.relevance import EmbeddingRelevanceScorer
+
+
+class StubModel:
+    """Embeds topics as [1, 0] and documents containing "cosine=x" at cosine x from their topic."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.append(list(texts))
+        vectors = []
+        for text in texts:
+            match = re.search(r"cosine=(-?[\d.]+)", text)
+            cosine = float(match.group(1)) if match else 1.0
+            vectors.append([cosine, np.sqrt(1 - cosine ** 2)])
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def stub_scorer(**kwargs):
+    scorer = EmbeddingRelevanceScorer(**kwargs)
+    scorer._model = StubModel()
+    return scorer
+
+
+@pytest.mark.parametrize("cosine, similarity", [
+    (1.0, 100),
+    (0.9, 96),
+    (0.55, 80),
+    (0.54, None),
+    (0.26, None),
+    (0.25, 79),
+    (0.1, 31),
+    (-0.3, 0),
+])
+def test_cosine_bands_map_to_similarity(cosine, similarity):
+    [(scored_cosine, scored_similarity)] = stub_scorer().score(["attention"], [f"cosine={cosine}"])
+
+    assert scored_cosine == pytest.approx(cosine, abs=1e-6)
+    assert scored_similarity == similarity
+
+
+def test_topics_are_embedded_once():
+    scorer = stub_scorer()
+
+    scorer.score(["attention", "attention", "diffusion"], ["cosine=0.9", "cosine=0.1", "cosine=0.4"])
+    scorer.score(["attention"], ["cosine=0.7"])
+
+    assert scorer._model.encoded == [
+        ["attention", "diffusion"], ["cosine=0.9", "cosine=0.1", "cosine=0.4"], ["cosine=0.7"],
+    ]
+
+
+def test_band_bounds_are_validated():
+    with pytest.raises(ValueError):
+        EmbeddingRelevanceScorer(low=0.6, high=0.5)
+
+
+def test_only_uncertain_pages_are_scored_by_the_llm(stub_llm, tmp_path):
+    llm = stub_llm()
+    crawler = AsyncCrawler(
+        model="stub", infer_type="local", port=llm.port, relevance_scorer=stub_scorer(),
+        crawl_cache=CrawlCache(str(tmp_path / "crawl.sqlite")), domain_health=DomainHealth(path=None),
+        http_fast_path=False, pdf_extraction=False, quality_gate=False,
+    )
+    cosines = {"https://high.example.org/": 0.9, "https://uncertain.example.org/": 0.4, "https://low.example.org/": 0.1}
+
+    async def crawl(url):
+        return f"This page on attention has cosine={cosines[url]} to its topic. " * 10
+
+    crawler._simple_crawl = crawl
+    output = tmp_path / "out.jsonl"
+    asyncio.run(crawler.run("attention", list(cosines), str(output), deduplicate=False))
+
+    score_prompts = [prompt for prompt in llm.prompts if "Topic: attention" in prompt]
+    assert len(score_prompts) == 1 and "cosine=0.4" in score_prompts[0]
+    assert crawler.similarity_stats["embedding_scored"] == 2
+    [line] = [json.loads(line) for line in open(output, encoding="utf-8")]
+    # 低分页面只用于补足top_n, 排在最后
+    assert [(paper["url"], paper["similarity"]) for paper in line["papers"]] == [
+        ("https://high.example.org/", 96), ("https://uncertain.example.org/", 90), ("https://low.example.org/", 31),
+    ]
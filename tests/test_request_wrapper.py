@@ -0,0 +1,47 @@
+import logging
+
+from src.request import RequestWrapper
+
+
+def make_wrapper(model, **kwargs):
+    return RequestWrapper(model=model, infer_type="local", port=1, **kwargs)
+
+
+def test_wrappers_of_a_model_share_one_limiter():
+    first = make_wrapper("shared-limiter-model")
+    second = make_wrapper("shared-limiter-model")
+
+    assert first.limiter is second.limiter
+
+
+def test_stricter_limits_of_a_later_wrapper_are_applied(caplog):
+    first = make_wrapper("stricter-limits-model", max_connection=100, requests_per_minute=600)
+
+    with caplog.at_level(logging.WARNING):
+        make_wrapper("stricter-limits-model", max_connection=50, requests_per_minute=300, tokens_per_minute=10000)
+
+    assert first.limiter.max_limit == 50
+    assert first.limiter.requests_per_minute == 300
+    assert first.limiter.tokens_per_minute == 10000
+    assert "Stricter limits applied" in caplog.text
+
+
+def test_looser_limits_of_a_later_wrapper_are_ignored_with_a_warning(caplog):
+    first = make_wrapper("looser-limits-model", connection=5, max_connection=50, requests_per_minute=300)
+
+    with caplog.at_level(logging.WARNING):
+        make_wrapper("looser-limits-model", connection=20, max_connection=100, requests_per_minute=600)
+
+    assert first.limiter.limit == 5
+    assert first.limiter.max_limit == 50
+    assert first.limiter.requests_per_minute == 300
+    assert "connection" in caplog.text and "requests_per_minute" in caplog.text
+
+
+def test_matching_limits_do_not_warn(caplog):
+    make_wrapper("matching-limits-model", requests_per_minute=300)
+
+    with caplog.at_level(logging.WARNING):
+        make_wrapper("matching-limits-model", requests_per_minute=300)
+
+    assert "limiter" not in caplog.text
@@ -0,0 +1,82 @@
+import json
+import pickle
+
+from src.rag.search_cache import SearchResultCache
+from src.rag.search_engine import CachedSearchEngine, IncompleteSearchResults, SearchEngine, SearchResult
+
+
+class FakeEngine(SearchEngine):
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def search(self, query, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+def make_result(i):
+    return SearchResult(title=f"Paper {i}", url=f"https://example.org/{i}", snippet="", source="fake", metadata={"year": 2024})
+
+
+def test_complete_results_are_served_from_cache(tmp_path):
+    engine = FakeEngine([[make_result(1), make_result(2)]])
+    cached = CachedSearchEngine(engine, SearchResultCache(str(tmp_path / "search.sqlite")), "fake", ttl=3600)
+
+    first = cached.search("attention")
+    second = cached.search("attention")
+
+    assert engine.calls == 1
+    assert [r.url for r in second] == [r.url for r in first]
+    assert second[0].metadata == {"year": 2024}
+
+
+def test_incomplete_results_are_returned_but_not_cached(tmp_path):
+    partial = IncompleteSearchResults([make_result(1)], "第2页请求超时")
+    engine = FakeEngine([partial, [make_result(1), make_result(2)]])
+    cache = SearchResultCache(str(tmp_path / "search.sqlite"))
+    cached = CachedSearchEngine(engine, cache, "fake", ttl=3600)
+
+    assert cached.search("attention") == [make_result(1)]
+    assert cache.writes == 0
+    assert len(cached.search("attention")) == 2
+    assert engine.calls == 2
+    assert len(cached.search("attention")) == 2
+    assert engine.calls == 2
+
+
+def test_empty_results_are_not_cached(tmp_path):
+    engine = FakeEngine([[], [make_result(1)]])
+    cached = CachedSearchEngine(engine, SearchResultCache(str(tmp_path / "search.sqlite")), "fake", ttl=3600)
+
+    assert cached.search("attention") == []
+    assert len(cached.search("attention")) == 1
+    assert engine.calls == 2
+
+
+def test_results_are_stored_as_json(tmp_path):
+    cache = SearchResultCache(str(tmp_path / "search.sqlite"))
+    result = SearchResult(
+        title="Paper", url="https://example.org/1", snippet="", source="fake",
+        metadata={"authors": ("A", "B"), "citedBy": 3, "published": None},
+    )
+    cached = CachedSearchEngine(FakeEngine([[result]]), cache, "fake")
+    cached.search("attention")
+
+    with cache._db.connect() as conn:
+        (blob,) = conn.execute("SELECT results FROM search_results").fetchone()
+    assert json.loads(blob)[0]["metadata"]["citedBy"] == 3
+    assert cached.search("attention")[0].metadata == {"authors": ["A", "B"], "citedBy": 3, "published": None}
+
+
+def test_pickled_entries_are_never_loaded(tmp_path):
+    cache = SearchResultCache(str(tmp_path / "search.sqlite"))
+    key = cache.make_key("fake", "attention", {})
+    cache.put(key, "fake", "attention", [])
+    with cache._db.connect() as conn:
+        conn.execute("UPDATE search_results SET results = ?", (pickle.dumps([{"title": "Paper"}]),))
+
+    assert cache.get(key) is None
+    assert cache.misses == 1
+    with cache._db.connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM search_results").fetchone()[0] == 0
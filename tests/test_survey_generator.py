@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import re
+import time
+
+from src.rag.survey_generator import SurveyGenerator
+
+SECTIONS = ["Background", "Methods", "Evaluation", "Open problems"]
+UNKNOWN_PAPER_ID = 999
+
+
+def survey_answer(prompt: str, notes_words: int = 150) -> str:
+    """
+    Answer the survey prompts in their expected format: notes for map calls, outlines built from
+    the paper identifiers of the prompt, condensed notes and section text citing those identifiers.
+    """
+    # 只解析提示词中的数据部分, 不解析输出格式说明里的示例
+    data = prompt.split("[Output requirements]", 1)[0]
+    paper_ids = sorted({int(i) for i in re.findall(r"^\[(\d+)\]", data, re.MULTILINE)})
+    if "take structured notes" in prompt:
+        title = re.search(r"Document title: (.*)", prompt).group(1)
+        filler = " ".join(f"detail{i}" for i in range(notes_words))
+        return f"<NOTES>- {title} proposes a method and reports results on a benchmark.\n- {filler}</NOTES>"
+    if "Merge them into a single coherent outline" in prompt:
+        sections = {}
+        for block in re.findall(r"<SECTION>(.*?)</SECTION>", data, re.DOTALL):
+            title = re.search(r"<TITLE>(.*?)</TITLE>", block).group(1)
+            ids = re.search(r"<PAPERS>(.*?)</PAPERS>", block).group(1)
+            sections.setdefault(title, set()).update(int(i) for i in re.findall(r"\d+", ids))
+        return "".join(
+            f"<SECTION><TITLE>{title}</TITLE><DESCRIPTION>Papers on {title.lower()}.</DESCRIPTION>"
+            f"<PAPERS>{', '.join(map(str, sorted(ids) + [UNKNOWN_PAPER_ID]))}</PAPERS></SECTION>"
+            for title, ids in sections.items()
+        )
+    if "Propose an outline" in prompt:
+        return "".join(
+            f"<SECTION><TITLE>{name}</TITLE><DESCRIPTION>Papers on {name.lower()}.</DESCRIPTION>"
+            f"<PAPERS>{', '.join(str(i) for i in paper_ids[k::len(SECTIONS)] + [UNKNOWN_PAPER_ID])}</PAPERS></SECTION>"
+            for k, name in enumerate(SECTIONS)
+        )
+    if "Condense the following notes" in prompt:
+        return "<NOTES>" + "\n".join(f"- Condensed finding [{i}]" for i in paper_ids) + "</NOTES>"
+    if "Write the section" in prompt:
+        notes = data.split("Notes on the papers to discuss", 1)[-1].split("Write the section as", 1)[0]
+        cited = sorted({int(i) for i in re.findall(r"\[(\d+)\]", notes)})
+        return f"<CONTENT>This section compares {len(cited)} papers " + " ".join(f"[{i}]" for i in cited) + ".</CONTENT>"
+    return "Unknown prompt"
+
+
+def write_crawl_output(path, papers=12, words=600):
+    records = [
+        {
+            "title": f"Paper {p}",
+            "url": f"https://example.org/{p}",
+            "txt": " ".join(f"term{(p * 31 + i) % 997}" for i in range(words)),
+            "similarity": 90,
+        }
+        for p in range(papers)
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"title": "Synthetic topic", "papers": records}) + "\n")
+
+
+def generate(llm, tmp_path, **kwargs):
+    crawl_output = tmp_path / "crawl_output.jsonl"
+    write_crawl_output(crawl_output)
+    generator = SurveyGenerator(model="stub", infer_type="local", port=llm.port, **kwargs)
+    summaries = asyncio.run(generator.generate(str(crawl_output), str(tmp_path / "surveys")))
+    return generator, summaries["Synthetic topic"]
+
+
+def test_prompts_stay_within_the_token_budget_and_map_calls_overlap(stub_llm, tmp_path):
+    llm = stub_llm(survey_answer, delay=0.05)
+    generator, summary = generate(llm, tmp_path, max_concurrency=8, max_prompt_tokens=1500, map_chunk_tokens=300)
+
+    assert summary["notes"] == 12
+    assert summary["written_sections"] == len(SECTIONS)
+    # 每篇论文超过map_chunk_tokens, 分块map, 并且大纲需要合并
+    assert generator.call_stats["map"]["calls"] > 12
+    assert generator.call_stats["outline"]["calls"] > 1
+    assert all(generator.chunker.count(prompt) <= 1500 for prompt in llm.prompts)
+    assert all(stats["max_prompt_tokens"] <= 1500 for stats in generator.call_stats.values())
+    assert llm.peak > 1
+    # 串行执行时仅map阶段就需要calls * delay秒
+    assert summary["timings"]["map"] < generator.call_stats["map"]["calls"] * 0.05 / 2
+
+
+def test_outline_only_cites_existing_papers(stub_llm, tmp_path):
+    generator, summary = generate(stub_llm(survey_answer), tmp_path, max_prompt_tokens=1500, map_chunk_tokens=300)
+
+    with open(tmp_path / "surveys" / "Synthetic_topic.outline.json", encoding="utf-8") as f:
+        outline = json.load(f)["sections"]
+    assert [section["title"] for section in outline] == SECTIONS
+    assert sorted(paper_id for section in outline for paper_id in section["papers"]) == list(range(1, 13))
+
+    with open(summary["path"], encoding="utf-8") as f:
+        survey = f.read()
+    cited = {int(i) for i in re.findall(r"\[(\d+)\]", survey)}
+    assert cited == set(range(1, 13))
+
+
+def test_sections_are_streamed_to_the_output_file(stub_llm, tmp_path):
+    output_path = tmp_path / "surveys" / "Synthetic_topic.md"
+    seen_before_last_section = []
+
+    def answer(prompt):
+        # 最后一节的写作调用等到前面的小节都已写入文件后再返回
+        if "Write the section" in prompt and f"section '{SECTIONS[-1]}'" in prompt:
+            deadline = time.time() + 5
+            while time.time() < deadline and f"## {SECTIONS[-2]}" not in output_path.read_text(encoding="utf-8"):
+                time.sleep(0.01)
+            seen_before_last_section.append(output_path.read_text(encoding="utf-8"))
+        return survey_answer(prompt)
+
+    generator, summary = generate(stub_llm(answer), tmp_path, max_prompt_tokens=1500, map_chunk_tokens=300)
+
+    [partial] = seen_before_last_section
+    assert [line[3:] for line in partial.splitlines() if line.startswith("## ")] == SECTIONS[:-1]
+    with open(summary["path"], encoding="utf-8") as f:
+        headings = [line[3:] for line in f.read().splitlines() if line.startswith("## ")]
+    assert headings == SECTIONS + ["References"]
+    assert os.path.exists(tmp_path / "surveys" / "Synthetic_topic.notes.jsonl")
@@ -0,0 +1,93 @@
+import asyncio
+import random
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.request.token_counter import LogHistogram, TokenUsage, UsageAccumulator, normalize_usage, usage_stage
+
+
+def test_histogram_percentiles_are_within_the_bucket_error():
+    rng = random.Random(0)
+    values = [rng.lognormvariate(6, 1.5) for _ in range(20000)]
+    histogram = LogHistogram(growth=1.05)
+    for value in values:
+        histogram.add(value)
+
+    for q in (50, 90, 99):
+        exact = np.percentile(values, q)
+        assert histogram.percentile(q) == pytest.approx(exact, rel=0.05)
+    assert histogram.percentile(100) == max(values)
+    # 桶的数量只取决于取值范围, 与样本数无关
+    assert len(histogram._counts) < 400
+
+
+def test_histogram_edge_values():
+    histogram = LogHistogram(max_value=1000)
+    assert histogram.percentile(50) == 0.0
+    histogram.add(0)
+    histogram.add(0.5)
+    assert histogram.percentile(99) == 0.5
+    histogram.add(1e9)
+    assert histogram.percentile(99) <= 1e9
+    assert histogram.max == 1e9
+
+
+@pytest.mark.parametrize("token_usage", [
+    SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15),
+    SimpleNamespace(prompt_token_count=10, candidates_token_count=5, total_token_count=15),
+    {"prompt_tokens": 10, "completion_tokens": 5},
+    TokenUsage(10, 5, 15),
+])
+def test_backend_usages_are_normalized(token_usage):
+    assert normalize_usage(token_usage) == TokenUsage(10, 5, 15)
+
+
+def test_local_usage_only_knows_a_total():
+    assert normalize_usage(3) == TokenUsage(total_tokens=3)
+    assert normalize_usage(None) == TokenUsage()
+
+
+def test_usage_is_accumulated_per_model_and_stage():
+    accumulator = UsageAccumulator(log_interval=None)
+
+    async def call(stage, prompt_tokens):
+        with usage_stage(stage):
+            await asyncio.sleep(0)
+            accumulator.record("model", {"prompt_tokens": prompt_tokens, "completion_tokens": 10}, latency=0.5)
+
+    async def run():
+        await asyncio.gather(*(call("refine", 100) for _ in range(3)), *(call("score", 1000) for _ in range(2)))
+
+    asyncio.run(run())
+    accumulator.record("model", {"prompt_tokens": 100, "completion_tokens": 10}, stage="refine", cached=True)
+
+    summary = accumulator.summary()
+    assert set(summary) == {("model", "refine"), ("model", "score")}
+    refine = summary[("model", "refine")]
+    assert (refine["calls"], refine["cached_calls"], refine["prompt_tokens"], refine["cached_tokens"]) == (3, 1, 300, 110)
+    assert refine["prompt_p"][50] == pytest.approx(100, rel=0.05)
+    assert refine["latency_ms_p"][99] == pytest.approx(500, rel=0.05)
+    assert summary[("model", "score")]["prompt_p"][90] == pytest.approx(1000, rel=0.05)
+    assert accumulator.totals() == TokenUsage(2300, 50, 2350)
+    assert "refine" in accumulator.format_summary()
+
+
+def test_concurrent_records_from_threads_are_all_counted():
+    accumulator = UsageAccumulator(log_interval=None)
+
+    def worker():
+        for _ in range(1000):
+            accumulator.record("model", 2, stage="map")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = accumulator.summary()[("model", "map")]
+    assert stats["calls"] == 8000
+    assert stats["total_tokens"] == 16000